@@ -0,0 +1,105 @@
+"""
+Recall@k vs. latency of approximate FAISS indexes, measured against the exact flat index.
+
+Runs on the vectors written by the embedding pipeline (``vectors.npy``) and
+holds out a sample of them as queries. Writes a markdown report so a
+trade-off can be picked from real numbers.
+
+Usage:
+    python -m benchmarks.bench_ann --vectors vector_store/vectors.npy --queries 1000 --k 5
+    python -m benchmarks.bench_ann --synthetic 200000      # no vectors at hand
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from src.embedding_pipeline import build_faiss_index
+
+# (index_type, build params, search knob, knob values)
+CONFIGS = [
+    ("ivf_flat", {}, "nprobe", [1, 4, 16, 64]),
+    ("ivf_pq", {"pq_m": 16}, "nprobe", [4, 16, 64]),
+    ("ivf_pq", {"pq_m": 48}, "nprobe", [16, 64]),
+    ("hnsw", {"hnsw_m": 32}, "efSearch", [16, 64, 256]),
+]
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    # Clustered, normalised vectors are closer to sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def search_latency(index, queries: np.ndarray, k: int) -> tuple:
+    # One query per call, as ComplaintRetriever.retrieve does
+    found, timings = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    return np.array(found), np.percentile(timings, 50), np.percentile(timings, 95)
+
+def index_megabytes(index) -> float:
+    return faiss.serialize_index(index).nbytes / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", default="vector_store/vectors.npy")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of --vectors")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--report", default="report/ann_recall_report.md")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic)
+        source = f"{args.synthetic} synthetic vectors"
+    else:
+        vectors = np.load(args.vectors, mmap_mode="r")
+        source = f"{len(vectors)} vectors from {args.vectors}"
+
+    # Hold out query vectors so no query is its own nearest neighbour
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(vectors), min(args.queries, len(vectors) // 10), replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[query_rows] = False
+    queries = np.ascontiguousarray(vectors[query_rows], dtype=np.float32)
+    base = np.ascontiguousarray(vectors[mask], dtype=np.float32)
+
+    flat = build_faiss_index(base, "flat")
+    truth, p50, p95 = search_latency(flat, queries, args.k)
+    rows = [("flat", "-", "-", 1.0, p50, p95, index_megabytes(flat))]
+    print(f"flat: p50 {p50:.3f} ms, p95 {p95:.3f} ms")
+
+    ps = faiss.ParameterSpace()
+    for index_type, params, knob, values in CONFIGS:
+        index = build_faiss_index(base, index_type, **params)
+        label = index_type + "".join(f" {k}={v}" for k, v in params.items())
+        size = index_megabytes(index)
+        for value in values:
+            ps.set_index_parameter(index, knob, value)
+            found, p50, p95 = search_latency(index, queries, args.k)
+            recall = recall_at_k(found, truth)
+            rows.append((label, knob, value, recall, p50, p95, size))
+            print(f"{label} {knob}={value}: recall@{args.k} {recall:.3f}, p50 {p50:.3f} ms, p95 {p95:.3f} ms")
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        f.write(f"# ANN recall vs. latency\n\n{source}, {len(queries)} held-out queries, k={args.k}, "
+                f"single-query search, {faiss.omp_get_max_threads()} FAISS threads.\n\n")
+        f.write(f"| Index | Knob | Value | Recall@{args.k} | p50 (ms) | p95 (ms) | Size (MB) |\n")
+        f.write("|---|---|---|---|---|---|---|\n")
+        for label, knob, value, recall, p50, p95, size in rows:
+            f.write(f"| {label} | {knob} | {value} | {recall:.3f} | {p50:.3f} | {p95:.3f} | {size:.1f} |\n")
+    print(f"📄 Report saved to: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Rows/sec of the per-row ``Series.apply`` cleaners vs. their vectorized variants.
+
+Usage:
+    python -m benchmarks.bench_data_processing --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_complaints
+from src.data_processing import (
+    clean_text,
+    clean_text_series,
+    numerical_data_standardizing,
+    product_filter,
+    product_filter_series,
+    word_count_series,
+)
+
+def _timed(fn, repeat: int = 3) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_complaints(args.rows)
+    narratives = df["Consumer complaint narrative"].dropna()
+    cleaned = narratives.apply(clean_text)
+    amounts = pd.DataFrame({"Amount": np.random.default_rng(0).normal(100, 200, args.rows)})
+
+    cases = [
+        ("clean_text", len(narratives),
+         lambda: narratives.apply(clean_text), lambda: clean_text_series(narratives)),
+        ("product_filter", len(df),
+         lambda: df["Product"].apply(product_filter), lambda: product_filter_series(df["Product"])),
+        ("word_count", len(cleaned),
+         lambda: cleaned.apply(lambda x: len(x.split())), lambda: word_count_series(cleaned, normalized=True)),
+        ("numerical_standardizing", len(amounts),
+         lambda: amounts["Amount"].apply(lambda x: np.sign(x) * np.log1p(abs(x)) if x > 0 else 0),
+         lambda: numerical_data_standardizing(amounts.copy(), ["Amount"])["Amount"]),
+    ]
+
+    print(f"{'stage':<26}{'apply rows/s':>16}{'vectorized rows/s':>20}{'speedup':>10}  identical")
+    for name, rows, legacy, vectorized in cases:
+        t_legacy, expected = _timed(legacy, args.repeat)
+        t_vector, result = _timed(vectorized, args.repeat)
+        identical = expected.tolist() == result.tolist()
+        print(f"{name:<26}{rows / t_legacy:>16,.0f}{rows / t_vector:>20,.0f}{t_legacy / t_vector:>9.1f}x  {identical}")
+
+if __name__ == "__main__":
+    main()
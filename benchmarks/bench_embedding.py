@@ -0,0 +1,48 @@
+"""
+Embedding throughput (chunks/sec) vs. number of worker processes.
+
+Each worker loads the model once and gets ``cpu_count // workers`` intra-op
+threads. Wall time includes worker start-up and model loading, as in a real
+index build.
+
+Usage:
+    python -m benchmarks.bench_embedding --chunks 20000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import synthetic_complaints
+from src.data_processing import clean_text_series
+from src.embedding_pipeline import EMBED_BATCH_SIZE, EMBEDDING_MODEL, chunk_narratives, embed_chunks
+
+def synthetic_chunks(n_chunks: int, seed: int = 0) -> list:
+    df = synthetic_complaints(n_chunks, seed=seed, missing_rate=0.0, duplicate_rate=0.0)
+    df["Cleaned_Narrative"] = clean_text_series(df["Consumer complaint narrative"])
+    chunks, _ = chunk_narratives(df, text_column="Cleaned_Narrative")
+    return chunks[:n_chunks]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    print(f"{len(chunks)} chunks, {os.cpu_count()} CPUs, model {args.model}")
+    print(f"{'workers':>8}{'threads/worker':>16}{'seconds':>10}{'chunks/s':>12}{'speedup':>10}")
+
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        embed_chunks(chunks, args.model, workers=workers, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        rate = len(chunks) / elapsed
+        baseline = baseline or rate
+        threads = "all" if workers <= 1 else max(1, (os.cpu_count() or 1) // workers)
+        print(f"{workers:>8}{threads:>16}{elapsed:>10.1f}{rate:>12.0f}{rate / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+BM25 query latency with and without MaxScore pruning, next to query embedding latency.
+
+The corpus has a Zipf-distributed vocabulary like real narratives, so a few
+terms have huge posting lists and most are rare.
+
+Usage:
+    python -m benchmarks.bench_lexical --docs 100000 --queries 200
+    python -m benchmarks.bench_lexical --model all-MiniLM-L6-v2   # also time query encoding
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.lexical_index import LexicalIndex, build_lexical_index
+
+def zipf_corpus(n_docs: int, vocab_size: int = 30_000, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    probs = 1.0 / np.arange(1, vocab_size + 1)
+    probs /= probs.sum()
+    vocab = np.array([f"term{i}" for i in range(vocab_size)])
+    lengths = rng.integers(40, 120, n_docs)
+    words = vocab[rng.choice(vocab_size, lengths.sum(), p=probs)]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    texts = [" ".join(words[offsets[i]:offsets[i + 1]]) for i in range(n_docs)]
+    return texts, vocab, probs
+
+def _ms_per_query(fn, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--terms", type=int, default=6, help="Terms per query")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--model", default=None, help="SentenceTransformer to time query encoding with")
+    args = parser.parse_args()
+
+    texts, vocab, probs = zipf_corpus(args.docs)
+    rng = np.random.default_rng(1)
+    queries = [" ".join(vocab[rng.choice(len(vocab), args.terms, p=probs)]) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_lexical_index(texts, f"{tmp}/lexical")
+        print(f"Build: {time.perf_counter() - start:.1f}s for {args.docs} docs")
+        index = LexicalIndex(f"{tmp}/lexical")
+
+        exhaustive = _ms_per_query(lambda q: index.search(q, args.k, prune=False), queries)
+        pruned = _ms_per_query(lambda q: index.search(q, args.k), queries)
+        same = all(np.array_equal(index.search(q, args.k)[0], index.search(q, args.k, prune=False)[0]) for q in queries)
+        print(f"BM25 exhaustive: {exhaustive:.2f} ms/query")
+        print(f"BM25 MaxScore:   {pruned:.2f} ms/query ({exhaustive / pruned:.1f}x, identical top-{args.k}: {same})")
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.model)
+        model.encode(["warm up"])
+        print(f"Query encoding:  {_ms_per_query(lambda q: model.encode([q]), queries):.2f} ms/query")
+
+if __name__ == "__main__":
+    main()
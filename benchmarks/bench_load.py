@@ -0,0 +1,137 @@
+"""
+Load test for the HTTP query service (``python -m src.service``).
+
+Runs ``--concurrency`` client threads that send requests back to back for
+``--duration`` seconds and reports latency percentiles, throughput and
+rejected (HTTP 503) requests.
+
+``--stub`` starts the service in-process over a stub pipeline whose batched
+retrieval costs a fixed overhead plus a small per-query cost (like one
+``encode`` + FAISS call) and whose generation sleeps, so micro-batching and
+backpressure can be measured without the model, index or Gemini.
+
+Usage:
+    python -m benchmarks.bench_load --url http://127.0.0.1:8000 --endpoint retrieve --concurrency 32
+    python -m benchmarks.bench_load --stub --concurrency 32 --window-ms 0 5
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+QUESTIONS = [
+    "Why are customers frustrated with credit card charges?",
+    "What issues do users report about loan applications?",
+    "Are there complaints about Buy Now, Pay Later?",
+    "Do customers complain about savings account closures?",
+    "How often do users face money transfer failures?",
+    "Are there any mentions of late fees?",
+]
+
+class StubPipeline:
+    """Pipeline stand-in with batch-friendly retrieval costs and a slow generator."""
+
+    def __init__(self, batch_cost: float = 0.008, query_cost: float = 0.0005, generation_time: float = 0.2):
+        self.batch_cost = batch_cost
+        self.query_cost = query_cost
+        self.generation_time = generation_time
+        self.retriever = self
+        self._lock = threading.Lock()
+
+    def retrieve_batch(self, queries: list, filters: dict = None) -> list:
+        # One model/index call at a time, as on a single CPU-bound process
+        with self._lock:
+            time.sleep(self.batch_cost + self.query_cost * len(queries))
+        return [[{"complaint_id": i, "text": f"chunk {i} for {q}"} for i in range(5)] for q in queries]
+
+    def answer(self, query: str, docs: list) -> tuple:
+        time.sleep(self.generation_time)
+        return f"answer to {query}", [doc["text"] for doc in docs[:2]]
+
+    def cache_stats(self) -> dict:
+        return {}
+
+def start_stub_server(window: float, max_generations: int) -> tuple:
+    from werkzeug.serving import make_server
+    from src.service import create_app
+
+    app = create_app(StubPipeline(), window=window, max_generations=max_generations)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no access log line per request
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def run_load(url: str, endpoint: str, concurrency: int, duration: float) -> dict:
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(worker: int):
+        session = requests.Session()
+        i = worker
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                status = session.post(f"{url}/{endpoint}", json={"query": QUESTIONS[i % len(QUESTIONS)]},
+                                      timeout=60).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(status)
+            i += concurrency
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    wall = time.perf_counter() - start
+
+    ok = np.array([lat for lat, status in zip(latencies, statuses) if status == 200])
+    return {
+        "requests": len(latencies),
+        "ok": len(ok),
+        "rejected": sum(status == 503 for status in statuses),
+        "errors": sum(status not in (200, 503) for status in statuses),
+        "qps": len(ok) / wall,
+        "p50": float(np.percentile(ok, 50)) if len(ok) else float("nan"),
+        "p95": float(np.percentile(ok, 95)) if len(ok) else float("nan"),
+        "p99": float(np.percentile(ok, 99)) if len(ok) else float("nan"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["retrieve", "answer"], default="retrieve")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--stub", action="store_true", help="Serve a stub pipeline in-process")
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[5.0],
+                        help="Batching windows to compare (--stub only)")
+    parser.add_argument("--max-generations", type=int, default=8, help="Generation slots (--stub only)")
+    args = parser.parse_args()
+
+    runs = [(None, args.url)] if not args.stub else [(window, None) for window in args.window_ms]
+    print(f"{'window':>8}{'requests':>10}{'ok':>7}{'503':>6}{'errors':>8}{'QPS':>8}"
+          f"{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'batch':>7}")
+    for window, url in runs:
+        server = None
+        if args.stub:
+            server, url = start_stub_server(window / 1000, args.max_generations)
+        try:
+            result = run_load(url, args.endpoint, args.concurrency, args.duration)
+            health = requests.get(f"{url}/health", timeout=10).json()
+        finally:
+            if server is not None:
+                server.shutdown()
+        label = f"{window:g} ms" if window is not None else "-"
+        print(f"{label:>8}{result['requests']:>10}{result['ok']:>7}{result['rejected']:>6}{result['errors']:>8}"
+              f"{result['qps']:>8.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}"
+              f"{health['batching']['mean_batch_size']:>7.1f}")
+
+if __name__ == "__main__":
+    main()
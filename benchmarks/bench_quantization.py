@@ -0,0 +1,110 @@
+"""
+Memory saved vs. recall lost by compressed FAISS indexes, with and without an
+exact rerank over the full-precision vectors.
+
+Runs on the vectors written by the embedding pipeline (``vectors.npy``) and
+holds out a sample of them as queries. Recall is measured against the exact
+flat index; "+ rerank" fetches k * factor candidates from the compressed index
+and re-sorts them with ``exact_rerank``, as ``ComplaintRetriever(vectors_path=...)``
+does. Writes a markdown report.
+
+Usage:
+    python -m benchmarks.bench_quantization --vectors vector_store/vectors.npy --queries 1000 --k 5
+    python -m benchmarks.bench_quantization --synthetic 200000      # no vectors at hand
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import index_megabytes, recall_at_k, synthetic_vectors
+from src.embedding_pipeline import build_faiss_index
+from src.retriever import RERANK_FACTOR, exact_rerank
+
+# (index_type, build params)
+CONFIGS = [
+    ("sq_fp16", {}),
+    ("sq8", {}),
+    ("pq", {"pq_m": 96}),
+    ("pq", {"pq_m": 48}),
+    ("pq", {"pq_m": 16}),
+]
+
+def search(index, queries: np.ndarray, k: int, vectors: np.ndarray = None, factor: int = RERANK_FACTOR) -> tuple:
+    # One query per call, as ComplaintRetriever.retrieve does; reranks when vectors are given
+    found, timings = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k * factor if vectors is not None else k)
+        ids = ids[0][ids[0] >= 0]
+        if vectors is not None:
+            ids, _ = exact_rerank(vectors, q, ids, k)
+        timings.append((time.perf_counter() - start) * 1000)
+        found.append(np.pad(ids, (0, k - len(ids)), constant_values=-1))
+    return np.array(found), np.percentile(timings, 50)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", default="vector_store/vectors.npy")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of --vectors")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=RERANK_FACTOR, help="Candidates per result when reranking")
+    parser.add_argument("--report", default="report/quantization_report.md")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic)
+        source = f"{args.synthetic} synthetic vectors"
+    else:
+        vectors = np.load(args.vectors, mmap_mode="r")
+        source = f"{len(vectors)} vectors from {args.vectors}"
+
+    # Hold out query vectors so no query is its own nearest neighbour
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(vectors), min(args.queries, len(vectors) // 10), replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[query_rows] = False
+    queries = np.ascontiguousarray(vectors[query_rows], dtype=np.float32)
+    base = np.ascontiguousarray(vectors[mask], dtype=np.float32)
+    n, dim = base.shape
+
+    flat = build_faiss_index(base, "flat")
+    truth, p50 = search(flat, queries, args.k)
+    flat_size = index_megabytes(flat)
+    rows = [("flat", flat_size, 1.0, p50, None, None)]
+    print(f"flat: {flat_size:.1f} MB, p50 {p50:.3f} ms")
+
+    for index_type, params in CONFIGS:
+        if params.get("pq_m") and dim % params["pq_m"]:
+            continue
+        index = build_faiss_index(base, index_type, **params)
+        label = index_type + "".join(f" {k}={v}" for k, v in params.items())
+        size = index_megabytes(index)
+        found, p50 = search(index, queries, args.k)
+        reranked, rerank_p50 = search(index, queries, args.k, vectors=base, factor=args.factor)
+        recall, rerank_recall = recall_at_k(found, truth), recall_at_k(reranked, truth)
+        rows.append((label, size, recall, p50, rerank_recall, rerank_p50))
+        print(f"{label}: {size:.1f} MB ({flat_size / size:.1f}x smaller), recall@{args.k} {recall:.3f}, "
+              f"+ rerank {rerank_recall:.3f}")
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        f.write(f"# Index compression: memory vs. recall\n\n{source} ({dim} dims), {len(queries)} held-out "
+                f"queries, k={args.k}, rerank over k x {args.factor} candidates, single-query search, "
+                f"{faiss.omp_get_max_threads()} FAISS threads.\n\n"
+                "Reranking reads the candidates' rows from the memory-mapped full-precision vectors, "
+                "which stay on disk instead of in each serving process's RAM.\n\n")
+        f.write(f"| Index | Size (MB) | Bytes/vector | Saved | Recall@{args.k} | p50 (ms) "
+                f"| Recall@{args.k} + rerank | p50 + rerank (ms) |\n")
+        f.write("|---|---|---|---|---|---|---|---|\n")
+        for label, size, recall, p50, rerank_recall, rerank_p50 in rows:
+            reranked = f"{rerank_recall:.3f} | {rerank_p50:.3f}" if rerank_recall is not None else "- | -"
+            f.write(f"| {label} | {size:.1f} | {size * 2**20 / n:.0f} | {1 - size / flat_size:.0%} "
+                    f"| {recall:.3f} | {p50:.3f} | {reranked} |\n")
+    print(f"📄 Report saved to: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Search throughput of a sharded index vs. number of shards.
+
+Each shard is served by its own worker process with one FAISS thread, a local
+stand-in for one shard server per machine. Every query fans out to all shards
+and the per-shard top-k lists are merged, so with enough cores latency drops
+(and throughput grows) roughly linearly with the shard count until the merge
+and inter-process overhead dominate. Results are checked against the same
+search on a single unsharded index.
+
+Usage:
+    python -m benchmarks.bench_shards --synthetic 400000 --shards 1 2 4 8
+    python -m benchmarks.bench_shards --vectors vector_store/vectors.npy --index-type sq8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_vectors
+from src.sharded_index import ShardedIndex, build_sharded_index
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", default="vector_store/vectors.npy")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of --vectors")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.synthetic) if args.synthetic else np.load(args.vectors, mmap_mode="r")
+    metadata = [{"complaint_id": i} for i in range(len(vectors))]
+    rng = np.random.default_rng(1)
+    queries = np.ascontiguousarray(vectors[rng.choice(len(vectors), args.queries, replace=False)], dtype=np.float32)
+    print(f"{len(vectors)} vectors, {args.index_type} shards, {os.cpu_count()} CPUs, k={args.k}")
+    print(f"{'shards':>7}{'build (s)':>11}{'p50 (ms)':>10}{'QPS':>9}{'speedup':>9}{'efficiency':>12}")
+
+    baseline, reference = None, None
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_shards in args.shards:
+            path = os.path.join(tmp, f"shards_{n_shards}")
+            start = time.perf_counter()
+            build_sharded_index(vectors, metadata, path, n_shards=n_shards, index_type=args.index_type,
+                                workers=min(n_shards, os.cpu_count() or 1))
+            build = time.perf_counter() - start
+
+            index = ShardedIndex(path, executor="process")
+            try:
+                index.search(queries[:1], args.k)  # start the workers and load the shards
+                timings, found = [], []
+                start = time.perf_counter()
+                for q in queries:
+                    t = time.perf_counter()
+                    found.append(index.search(q[None, :], args.k)[1][0])
+                    timings.append((time.perf_counter() - t) * 1000)
+                qps = len(queries) / (time.perf_counter() - start)
+            finally:
+                index.close()
+
+            if baseline is None:
+                baseline, reference = qps, np.array(found)
+            elif args.index_type == "flat" and not np.array_equal(np.array(found), reference):
+                print("⚠️ Sharded results differ from the first configuration.")
+            speedup = qps / baseline
+            print(f"{n_shards:>7}{build:>11.1f}{np.percentile(timings, 50):>10.2f}{qps:>9.0f}"
+                  f"{speedup:>8.1f}x{speedup / (n_shards / args.shards[0]):>11.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+End-to-end benchmark of the ingestion -> indexing -> query path.
+
+Generates synthetic complaints at a given scale and times every stage:
+``run_pipeline``, ``chunk_narratives``, ``embed_chunks``, ``index_to_faiss``,
+single-query ``retrieve``, ``retrieve_batch`` and full answers through
+``RAGPipeline.run``. Each stage records wall time, throughput, latency
+percentiles (query stages) and the process's peak RSS so far.
+
+Runs offline by default: embeddings come from a small whitespace-tokenized
+SentenceTransformer built on the fly (same 384 dimensions as MiniLM, so FAISS
+costs are realistic) and answers from a stub LLM behind ``GeminiGenerator``.
+Pass ``--model all-MiniLM-L6-v2`` to time the real encoder.
+
+Results are written as JSON and compared against a baseline from an earlier
+run; stages slower than ``--threshold`` are flagged as regressions.
+
+Usage:
+    python -m benchmarks.suite --scale 10k --save-baseline     # record a baseline
+    python -m benchmarks.suite --scale 10k --fail-on-regression
+    python -m benchmarks.suite --rows 2000 --output /tmp/bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+from benchmarks.synthetic import WORDS, synthetic_complaints
+from src.data_processing import run_pipeline
+from src.embedding_pipeline import chunk_narratives, embed_chunks, index_to_faiss
+from src.generator import GeminiGenerator
+from src.rag_pipeline import RAGPipeline
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+RESULTS_DIR = "benchmarks/results"
+BASELINES_DIR = "benchmarks/baselines"
+# Metrics compared against the baseline; lower is better for all of them
+TRACKED_METRICS = ("seconds", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+REGRESSION_THRESHOLD = 0.2
+# Stage times below this are mostly noise and are not compared
+MIN_COMPARED_SECONDS = 0.05
+STUB_DIM = 384
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubLLM:
+    """Stand-in for ``genai.GenerativeModel`` with a fixed response time."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        time.sleep(self.delay)
+        text = f"Answer: based on {prompt.count('Excerpt ')} excerpts."
+        return iter([_StubResponse(text)]) if stream else _StubResponse(text)
+
+def stub_encoder(path: str, texts: list, dim: int = STUB_DIM, seed: int = 0) -> str:
+    """
+    Save a small SentenceTransformer (word embeddings + mean pooling) to ``path``.
+
+    Args:
+        path (str): Output directory; pass it as ``model_name``.
+        texts (list): Texts whose words form the vocabulary.
+        dim (int): Embedding dimension.
+        seed (int): Random seed of the embedding weights.
+
+    Returns:
+        str: ``path``.
+    """
+    from sentence_transformers import SentenceTransformer, models
+    from sentence_transformers.models.tokenizer import WhitespaceTokenizer
+
+    vocab = sorted({word for text in texts for word in text.split()})
+    weights = np.random.default_rng(seed).standard_normal((len(vocab) + 1, dim), dtype=np.float32)
+    word_embeddings = models.WordEmbeddings(tokenizer=WhitespaceTokenizer(vocab=vocab, do_lower_case=True),
+                                            embedding_weights=weights)
+    SentenceTransformer(modules=[word_embeddings, models.Pooling(dim)], device="cpu").save(path)
+    return path
+
+def synthetic_queries(n: int, seed: int) -> list:
+    # Distinct queries, so query stages measure cache misses
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+    return [" ".join(words[rng.integers(0, len(words), 6)]) + f" {seed}-{i}" for i in range(n)]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def latency_stats(latencies_ms: list) -> dict:
+    values = np.asarray(latencies_ms, dtype=float)
+    return {f"p{q}_ms": float(np.percentile(values, q)) for q in (50, 95, 99)} | {"mean_ms": float(values.mean())}
+
+@contextmanager
+def stage(results: dict, name: str, unit: str):
+    """
+    Time a stage into ``results[name]``. The body sets ``record["items"]`` (for
+    throughput) and may add latency percentiles or other fields.
+    """
+    record = {"unit": unit}
+    start = time.perf_counter()
+    yield record
+    record["seconds"] = time.perf_counter() - start
+    if record.get("items"):
+        record["throughput"] = record["items"] / record["seconds"]
+    record["peak_rss_mb"] = peak_rss_mb()
+    results[name] = record
+    rate = f", {record['throughput']:,.0f} {unit}/s" if "throughput" in record else ""
+    print(f"⏱️ {name}: {record['seconds']:.2f}s{rate}, peak RSS {record['peak_rss_mb']:.0f} MB")
+
+def _timed_calls(fn, batches: list) -> list:
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run_suite(rows: int, workdir: str, model: str = None, queries: int = 200, batch_size: int = 32,
+              answers: int = 50, llm_delay: float = 0.0, index_type: str = "flat", seed: int = 0) -> dict:
+    """
+    Run every stage once at the given scale.
+
+    Args:
+        rows (int): Synthetic raw complaints.
+        workdir (str): Directory for the index, metadata and stub encoder.
+        model (str, optional): SentenceTransformer to use; None builds the stub encoder.
+        queries (int): Queries timed for ``retrieve`` and ``retrieve_batch``.
+        batch_size (int): Queries per ``retrieve_batch`` call.
+        answers (int): Questions answered end to end.
+        llm_delay (float): Seconds the stub LLM takes per answer.
+        index_type (str): FAISS index layout (see ``build_faiss_index``).
+        seed (int): Random seed of the synthetic data.
+
+    Returns:
+        dict: Run configuration, environment and per-stage results.
+    """
+    results = {}
+    df = synthetic_complaints(rows, seed=seed)
+
+    with stage(results, "run_pipeline", "rows") as record:
+        processed = run_pipeline(df)
+        record["items"] = rows
+        record["rows_out"] = len(processed)
+    del df
+
+    with stage(results, "chunk_narratives", "rows") as record:
+        chunks, metadata = chunk_narratives(processed, text_column="Cleaned_Narrative")
+        record["items"] = len(processed)
+        record["chunks"] = len(chunks)
+    del processed
+
+    model_name = model or stub_encoder(os.path.join(workdir, "stub-encoder"), chunks[:5000] + WORDS)
+    with stage(results, "embed_chunks", "chunks") as record:
+        vectors = embed_chunks(chunks, model_name)
+        record["items"] = len(chunks)
+    del chunks
+
+    index_path, meta_path = os.path.join(workdir, "index.faiss"), os.path.join(workdir, "metadata.pkl")
+    with stage(results, "index_to_faiss", "vectors") as record:
+        index_to_faiss(vectors, metadata, index_path=index_path, meta_path=meta_path, index_type=index_type)
+        record["items"] = len(vectors)
+    del vectors, metadata
+
+    pipeline = RAGPipeline(index_path, meta_path, model_name=model_name,
+                           generator=GeminiGenerator(model=StubLLM(llm_delay), max_retries=0))
+    pipeline.warm_up()
+
+    with stage(results, "retrieve", "queries") as record:
+        single = synthetic_queries(queries, seed=1)
+        record |= latency_stats(_timed_calls(pipeline.retriever.retrieve, single))
+        record["items"] = len(single)
+
+    with stage(results, "retrieve_batch", "queries") as record:
+        batched = synthetic_queries(queries, seed=2)
+        batches = [batched[i:i + batch_size] for i in range(0, len(batched), batch_size)]
+        record |= latency_stats(_timed_calls(pipeline.retriever.retrieve_batch, batches))
+        record["items"] = len(batched)
+        record["batch_size"] = batch_size
+
+    with stage(results, "answer", "queries") as record:
+        questions = synthetic_queries(answers, seed=3)
+        record |= latency_stats(_timed_calls(pipeline.run, questions))
+        record["items"] = len(questions)
+        record["llm_delay_s"] = llm_delay
+
+    return {
+        "config": {"rows": rows, "model": model or f"stub-{STUB_DIM}d", "queries": queries, "batch_size": batch_size,
+                   "answers": answers, "index_type": index_type, "seed": seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "numpy": np.__version__, "faiss": faiss.__version__},
+        "stages": results,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Compare two result files stage by stage.
+
+    Returns:
+        list[dict]: One row per stage and tracked metric present in both, with
+            ``change`` (relative, positive is slower / bigger) and ``regressed``.
+            Stage times under ``MIN_COMPARED_SECONDS`` in both runs are skipped.
+    """
+    rows = []
+    for name, record in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            continue
+        for metric in TRACKED_METRICS:
+            if metric in record and base.get(metric):
+                if metric == "seconds" and max(record[metric], base[metric]) < MIN_COMPARED_SECONDS:
+                    continue
+                change = record[metric] / base[metric] - 1
+                rows.append({"stage": name, "metric": metric, "baseline": base[metric], "current": record[metric],
+                             "change": change, "regressed": change > threshold})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--rows", type=int, default=None, help="Custom row count (overrides --scale)")
+    parser.add_argument("--model", default=None, help="SentenceTransformer to use instead of the stub encoder")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--answers", type=int, default=50)
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="Seconds per stub LLM answer")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--output", default=None, help=f"Results JSON (default {RESULTS_DIR}/<scale>.json)")
+    parser.add_argument("--baseline", default=None, help=f"Baseline JSON (default {BASELINES_DIR}/<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    args = parser.parse_args()
+
+    label = f"{args.rows}" if args.rows else args.scale
+    rows = args.rows or SCALES[args.scale]
+    output = args.output or os.path.join(RESULTS_DIR, f"{label}.json")
+    baseline_path = args.baseline or os.path.join(BASELINES_DIR, f"{label}.json")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_suite(rows, workdir, model=args.model, queries=args.queries, batch_size=args.batch_size,
+                            answers=args.answers, llm_delay=args.llm_delay, index_type=args.index_type)
+
+    for path in [output] + ([baseline_path] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results saved to: {path}")
+
+    if args.save_baseline or not os.path.exists(baseline_path):
+        return
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("⚠️ Baseline was recorded with a different configuration; comparison may be misleading.")
+
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'stage':<18}{'metric':<13}{'baseline':>12}{'current':>12}{'change':>9}")
+    for row in rows:
+        flag = "  ❌ regression" if row["regressed"] else ""
+        print(f"{row['stage']:<18}{row['metric']:<13}{row['baseline']:>12.3f}{row['current']:>12.3f}"
+              f"{row['change']:>+9.0%}{flag}")
+    regressions = [row for row in rows if row["regressed"]]
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} vs {baseline_path}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Vocabulary loosely modelled on CFPB narratives (redactions, amounts, punctuation)
+PRODUCTS = [
+    "Credit card or prepaid card",
+    "Credit card",
+    "Personal loan",
+    "Payday loan, title loan, or personal loan",
+    "Buy Now, Pay Later (BNPL)",
+    "Checking or savings account",
+    "Money transfer, virtual currency, or money service",
+    "Mortgage",
+    "Debt collection",
+    "Credit reporting, credit repair services, or other personal consumer reports",
+]
+WORDS = (
+    "i was charged a late fee on my account even though the payment posted on time "
+    "the bank refused to refund XXXX dollars and customer service hung up twice "
+    "my card was declined at the merchant transfer failed but funds were debited "
+    "they closed my savings account without notice interest rate increased dispute "
+    "unauthorized transaction fraud claim denied loan application approved then cancelled"
+).split()
+PUNCTUATION = ["", "", "", ",", ".", "!!", "?", " {$200.00}", " XX/XX/XXXX"]
+COMPANIES = ["BANK OF AMERICA", "CAPITAL ONE", "JPMORGAN CHASE", "PAYPAL", "AFFIRM", "WELLS FARGO", "CITIBANK"]
+STATES = ["CA", "NY", "TX", "FL", "IL", "GA", "WA", "OH"]
+
+def synthetic_complaints(n_rows: int, seed: int = 0, mean_words: int = 180,
+                         missing_rate: float = 0.3, duplicate_rate: float = 0.01) -> pd.DataFrame:
+    """
+    Generate a raw CFPB-shaped complaints DataFrame for benchmarks.
+
+    Args:
+        n_rows (int): Number of rows to generate.
+        seed (int): Random seed, so runs are reproducible.
+        mean_words (int): Average narrative length in words.
+        missing_rate (float): Share of rows without a narrative.
+        duplicate_rate (float): Share of rows that duplicate an earlier row.
+
+    Returns:
+        pd.DataFrame: Raw complaints with the columns used by the pipeline.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.poisson(mean_words, n_rows), 5, None)
+    words = np.array(WORDS, dtype=object)
+    punctuation = np.array(PUNCTUATION, dtype=object)
+
+    narratives = []
+    for length in lengths:
+        tokens = words[rng.integers(0, len(words), length)] + punctuation[rng.integers(0, len(punctuation), length)]
+        narratives.append(" ".join(tokens).capitalize())
+    narratives = pd.Series(narratives, dtype=object)
+    narratives[rng.random(n_rows) < missing_rate] = None
+
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, n_rows), unit="D")
+    df = pd.DataFrame({
+        "Date received": dates.strftime("%Y-%m-%d"),
+        "Product": np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), n_rows)],
+        "Consumer complaint narrative": narratives,
+        "Company": np.array(COMPANIES, dtype=object)[rng.integers(0, len(COMPANIES), n_rows)],
+        "State": np.array(STATES, dtype=object)[rng.integers(0, len(STATES), n_rows)],
+        "Complaint ID": np.arange(1, n_rows + 1),
+    })
+
+    # Exact duplicates of earlier rows, as found in the raw dump
+    n_dup = int(n_rows * duplicate_rate)
+    if n_dup:
+        targets = rng.choice(np.arange(1, n_rows), n_dup, replace=False)
+        sources = rng.integers(0, targets)
+        df.iloc[targets] = df.iloc[sources].to_numpy()
+    return df
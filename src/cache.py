@@ -0,0 +1,259 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+def normalize_query(query: str) -> str:
+    """Canonical cache form of a query: lower-cased with whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+def file_version(*paths: str) -> str:
+    """
+    Cheap version tag for on-disk artifacts such as the FAISS index.
+
+    Built from each file's size and modification time (for a directory, from
+    its entries), so it changes whenever the index is rebuilt or updated.
+    """
+    parts = []
+    for path in paths:
+        targets = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for target in targets:
+            if os.path.exists(target):
+                stat = os.stat(target)
+                parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry time-to-live and an optional disk tier.
+
+    The in-memory tier holds at most ``maxsize`` entries and evicts the least
+    recently used one. Entries older than ``ttl`` seconds count as misses. If
+    ``disk_path`` is set, entries are also written to a SQLite file, so a restarted
+    process starts warm; a disk hit is promoted back into memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, disk_path: str = None,
+                 namespace: str = "cache", clock=time.time):
+        """
+        Args:
+            maxsize (int): Maximum number of in-memory entries.
+            ttl (float): Seconds an entry stays valid. None disables expiry.
+            disk_path (str, optional): SQLite file for the persistent tier.
+            namespace (str): Table name, so several caches can share one file.
+            clock (callable): Time source, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                f'CREATE TABLE IF NOT EXISTS "{namespace}" (key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            self._db.commit()
+
+    def _expires(self) -> float:
+        return self._clock() + self.ttl if self.ttl is not None else float("inf")
+
+    def _disk_get(self, key: str):
+        row = self._db.execute(f'SELECT value, expires FROM "{self.namespace}" WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= self._clock():
+            self._db.execute(f'DELETE FROM "{self.namespace}" WHERE key = ?', (key,))
+            self._db.commit()
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def get(self, key: str, default=None):
+        """
+        Look up ``key``, counting a hit or a miss.
+
+        Returns:
+            The cached value, or ``default`` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._disk_get(key)
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _store(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def set(self, key: str, value) -> None:
+        """Store ``value`` under ``key`` in memory and, if enabled, on disk."""
+        with self._lock:
+            entry = (value, self._expires())
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    f'INSERT OR REPLACE INTO "{self.namespace}" (key, value, expires) VALUES (?, ?, ?)',
+                    (key, pickle.dumps(value), entry[1]),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute(f'DELETE FROM "{self.namespace}"')
+                self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b("\x1f".join(str(part) for part in parts).encode("utf-8"), digest_size=16).hexdigest()
+
+def prompt_hash(prompt: str) -> str:
+    """
+    Stable hash of a prompt (or prompt template) for answer cache keys.
+
+    Hashing the bare template lets callers invalidate cached answers whenever
+    the template changes.
+    """
+    return _digest(prompt)
+
+def chunk_ids(docs: list) -> list:
+    """
+    Stable IDs of retrieved chunks, from their complaint ID and text.
+
+    Unlike FAISS row IDs these survive full index rebuilds.
+    """
+    return [
+        _digest(doc.get("complaint_id"), doc["text"]) if isinstance(doc, dict) else _digest(doc)
+        for doc in docs
+    ]
+
+class AnswerCache:
+    """
+    Cache of generated answers, so repeated questions skip the LLM call.
+
+    Two tiers, both backed by ``TTLCache`` (LRU + TTL + optional SQLite file):
+        - exact: keyed on the retrieved chunk IDs plus a hash of the full prompt;
+        - semantic (when ``similarity_threshold`` is set): answers grouped by
+          chunk IDs and prompt template. A question hits if it retrieved the same
+          chunks and its embedding has cosine similarity >= the threshold with a
+          question answered before, so rephrasings of a question hit too.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 24 * 3600.0, disk_path: str = None,
+                 similarity_threshold: float = None, max_per_context: int = 16, clock=time.time):
+        """
+        Args:
+            maxsize (int): Entries kept in memory per tier.
+            ttl (float): Seconds an answer stays valid.
+            disk_path (str, optional): SQLite file for a persistent store.
+            similarity_threshold (float, optional): Cosine similarity needed for a
+                semantic hit, e.g. 0.95. None disables the semantic tier.
+            max_per_context (int): Questions remembered per retrieved-chunk set.
+            clock (callable): Time source, in seconds.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_per_context = max_per_context
+        self.exact = TTLCache(maxsize, ttl, disk_path, namespace="answers", clock=clock)
+        self.semantic = TTLCache(maxsize, ttl, disk_path, namespace="answers_semantic", clock=clock)
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, ids: list, prompt: str, template_hash: str, query_vector=None):
+        """
+        Find a cached answer.
+
+        Args:
+            ids (list): Retrieved chunk IDs (see ``chunk_ids``), in rank order.
+            prompt (str): Full prompt that would be sent to the LLM.
+            template_hash (str): Hash of the prompt template without context or question.
+            query_vector (np.ndarray, optional): Query embedding for the semantic tier.
+
+        Returns:
+            str: The cached answer, or None on a miss.
+        """
+        answer = self.exact.get(_digest(*ids, prompt_hash(prompt)))
+        if answer is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return answer
+
+        if self.similarity_threshold is not None and query_vector is not None:
+            entries = self.semantic.get(_digest(*ids, template_hash)) or []
+            query_vector = self._unit(query_vector)
+            best = max(entries, key=lambda entry: float(entry[0] @ query_vector), default=None)
+            if best is not None and float(best[0] @ query_vector) >= self.similarity_threshold:
+                with self._lock:
+                    self.semantic_hits += 1
+                return best[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, ids: list, prompt: str, template_hash: str, answer: str, query_vector=None) -> None:
+        """Remember ``answer`` for this prompt (and, if given, this query embedding)."""
+        self.exact.set(_digest(*ids, prompt_hash(prompt)), answer)
+        if self.similarity_threshold is not None and query_vector is not None:
+            key = _digest(*ids, template_hash)
+            with self._lock:
+                entries = self.semantic.get(key) or []
+                entries = (entries + [(self._unit(query_vector), answer)])[-self.max_per_context:]
+                self.semantic.set(key, entries)
+
+    def stats(self) -> dict:
+        """Exact/semantic hit and miss counters."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "size": len(self.exact),
+        }
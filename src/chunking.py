@@ -0,0 +1,121 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Same defaults as LangChain's RecursiveCharacterTextSplitter
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+def _emit(text: str, start: int, end: int, out: list) -> None:
+    # Stripped chunk [start, end) as offsets; whitespace-only chunks are dropped
+    segment = text[start:end]
+    stripped = segment.lstrip()
+    if not stripped:
+        return
+    start += len(segment) - len(stripped)
+    out.append((start, start + len(stripped.rstrip())))
+
+def _merge(text: str, bounds: list, chunk_size: int, chunk_overlap: int, out: list) -> None:
+    # Greedy merge of contiguous splits [bounds[k], bounds[k+1]) into overlapping
+    # windows. Same decisions as TextSplitter._merge_splits, but each window edge
+    # is found by binary search over the boundaries instead of split by split.
+    n = len(bounds) - 1
+    head = 0
+    while True:
+        # Splits head..i-1 fit; adding split i would exceed chunk_size
+        i = bisect_right(bounds, bounds[head] + chunk_size) - 1
+        if i >= n:
+            _emit(text, bounds[head], bounds[n], out)
+            return
+        _emit(text, bounds[head], bounds[i], out)
+        # Drop splits from the front until at most chunk_overlap is left and split i fits
+        target = max(bounds[i] - chunk_overlap, bounds[i + 1] - chunk_size)
+        head = min(i, max(head, bisect_left(bounds, target)))
+
+def _split(text: str, lo: int, hi: int, separators: tuple, chunk_size: int, chunk_overlap: int, out: list) -> None:
+    # Use the first separator present in text[lo:hi]; "" splits into characters
+    separator, rest = separators[-1], ()
+    for i, sep in enumerate(separators):
+        if sep == "":
+            separator = sep
+            break
+        if text.find(sep, lo, hi) != -1:
+            separator, rest = sep, separators[i + 1:]
+            break
+
+    # Separators stay at the start of the piece that follows them; the split
+    # boundaries come from str.split, so pieces are never built one by one
+    if separator:
+        lengths = np.fromiter(map(len, text[lo:hi].split(separator)), dtype=np.int64)
+        lengths[1:] += len(separator)
+    else:
+        lengths = np.ones(hi - lo, dtype=np.int64)
+    bounds = np.concatenate([[lo], lo + np.cumsum(lengths)])
+    keep = np.concatenate([[True], lengths > 0])
+    bounds, lengths = bounds[keep], lengths[lengths > 0]
+
+    big = np.flatnonzero(lengths >= chunk_size)
+    if not len(big):
+        _merge(text, bounds.tolist(), chunk_size, chunk_overlap, out)
+        return
+
+    # Runs of small splits are merged; splits too long on their own are split further
+    run_start = 0
+    for k in big.tolist():
+        if k > run_start:
+            _merge(text, bounds[run_start:k + 1].tolist(), chunk_size, chunk_overlap, out)
+        start, end = int(bounds[k]), int(bounds[k + 1])
+        if rest:
+            _split(text, start, end, rest, chunk_size, chunk_overlap, out)
+        else:
+            out.append((start, end))
+        run_start = k + 1
+    if run_start < len(lengths):
+        _merge(text, bounds[run_start:].tolist(), chunk_size, chunk_overlap, out)
+
+def split_offsets(text: str, chunk_size: int, chunk_overlap: int, separators: tuple = SEPARATORS) -> list:
+    """
+    Split ``text`` exactly like ``RecursiveCharacterTextSplitter.split_text`` (default
+    separators, ``keep_separator=True``, whitespace stripped), but return chunks as
+    ``(start, end)`` offsets, with ``text[start:end]`` being the chunk.
+
+    Pieces are tracked as offsets and merged with binary searches over their
+    boundaries, so the work per text grows with its number of chunks rather than
+    words, and texts no longer than ``chunk_size`` skip the recursion.
+
+    Args:
+        text (str): Text to split.
+        chunk_size (int): Maximum chunk length in characters.
+        chunk_overlap (int): Maximum overlap between consecutive chunks.
+        separators (tuple): Separators to try, coarsest first.
+
+    Returns:
+        list: ``(start, end)`` pairs in order.
+    """
+    out = []
+    if len(text) <= chunk_size:
+        # Every split fits, and merging contiguous pieces gives back the whole text
+        _emit(text, 0, len(text), out)
+    else:
+        _split(text, 0, len(text), tuple(separators), chunk_size, chunk_overlap, out)
+    return out
+
+def chunk_offsets(texts, chunk_size: int, chunk_overlap: int) -> tuple:
+    """
+    Split many texts into array-backed chunk offsets.
+
+    Args:
+        texts (iterable): Texts to split.
+        chunk_size (int): Maximum chunk length in characters.
+        chunk_overlap (int): Maximum overlap between consecutive chunks.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: int64 ``rows`` (position of the
+            source text), ``starts`` and ``ends``; chunk i is
+            ``texts[rows[i]][starts[i]:ends[i]]``.
+    """
+    rows, starts, ends = [], [], []
+    for row, text in enumerate(texts):
+        for start, end in split_offsets(text, chunk_size, chunk_overlap):
+            rows.append(row)
+            starts.append(start)
+            ends.append(end)
+    return (np.array(rows, dtype=np.int64), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
@@ -1,2 +1,2 @@
 RAW_DATA_PATH = "../data/raw/complaints.csv"
-PROCESSED_DATA_PATH = "data/processed/processed_complaints.csv"
\ No newline at end of file
+PROCESSED_DATA_PATH = "data/processed/processed_complaints.parquet"
\ No newline at end of file
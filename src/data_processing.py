@@ -2,8 +2,14 @@ import pandas as pd
 import numpy as np
 import re
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import matplotlib.pyplot as plt
 import seaborn as sns
+from src.config import RAW_DATA_PATH, PROCESSED_DATA_PATH
+from src.utils import DataWriter
 
 TARGET_KEYWORDS = [
     "credit card",
@@ -13,6 +19,15 @@ TARGET_KEYWORDS = [
     "money transfer"
 ]
 
+# Precompiled patterns shared by the scalar and vectorized cleaners
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TARGET_KEYWORDS_RE = re.compile("|".join(re.escape(keyword) for keyword in TARGET_KEYWORDS))
+# str.translate table doing the _NON_ALNUM_RE substitution for ASCII characters
+_ASCII_NON_ALNUM_TABLE = {
+    i: " " for i in range(128) if not (chr(i).islower() or chr(i).isdigit() or chr(i).isspace())
+}
+
 # ---------- Utility Functions ----------
 
 def duplicate_handling(df: pd.DataFrame) -> pd.DataFrame:
@@ -34,12 +49,12 @@ def date_time_conversion(df: pd.DataFrame) -> pd.DataFrame:
         df[col] = pd.to_datetime(df[col], errors='coerce')
     return df
 
-def outlier_handling(df: pd.DataFrame, column: str, max_words: int = 3000) -> pd.DataFrame:
-    df["NarrativeLength"] = df[column].apply(lambda x: len(x.split()))
+def outlier_handling(df: pd.DataFrame, column: str, max_words: int = 3000, normalized: bool = False) -> pd.DataFrame:
+    word_counts = word_count_series(df[column], normalized=normalized)
     before = df.shape[0]
-    df = df[df["NarrativeLength"] < max_words]
+    df = df[word_counts < max_words]
     print(f"✅ Removed {before - df.shape[0]} extreme outlier narratives (>{max_words} words).")
-    return df.drop(columns=["NarrativeLength"])
+    return df
 
 def categorical_data_standardizing(df: pd.DataFrame) -> pd.DataFrame:
     if 'Product' in df.columns:
@@ -49,13 +64,19 @@ def categorical_data_standardizing(df: pd.DataFrame) -> pd.DataFrame:
 def numerical_data_standardizing(df: pd.DataFrame, columns: list) -> pd.DataFrame:
     for col in columns:
         if col in df.columns:
-            df[col] = df[col].apply(lambda x: np.sign(x) * np.log1p(abs(x)) if x > 0 else 0)
+            values = df[col].to_numpy(dtype=float)
+            positive = values > 0
+            if positive.any():
+                # log1p on positives only; everything else (<= 0 or NaN) maps to 0
+                df[col] = np.where(positive, np.log1p(np.where(positive, values, 0.0)), 0.0)
+            elif len(values):
+                df[col] = np.zeros(len(values), dtype=np.int64)
     return df
 
 def clean_text(text: str) -> str:
     text = text.lower()
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
+    text = _NON_ALNUM_RE.sub(" ", text)
+    text = _WHITESPACE_RE.sub(" ", text)
     return text.strip()
 
 def product_filter(product: str) -> bool:
@@ -64,26 +85,310 @@ def product_filter(product: str) -> bool:
     product = product.lower()
     return any(keyword in product for keyword in TARGET_KEYWORDS)
 
+# ---------- Vectorized Variants ----------
+
+def clean_text_series(texts: pd.Series) -> pd.Series:
+    """
+    Vectorized ``clean_text`` over a whole column.
+
+    Gives exactly the same strings as ``texts.apply(clean_text)``. ASCII
+    punctuation is replaced with a translate table and only rows that still hold
+    non-ASCII characters go through the regex. Whitespace is collapsed with
+    ``split()`` + ``join``, which uses the same whitespace definition as the
+    ``\\s`` regex followed by ``strip()``.
+
+    Args:
+        texts (pd.Series): Raw narratives (no missing values).
+
+    Returns:
+        pd.Series: Cleaned narratives with the same index as ``texts``.
+    """
+    # Object dtype keeps Python's regex and Unicode semantics (the Arrow backend differs)
+    cleaned = texts.astype(object).str.lower().str.translate(_ASCII_NON_ALNUM_TABLE)
+    non_ascii = ~cleaned.map(str.isascii).astype(bool)
+    if non_ascii.any():
+        cleaned[non_ascii] = cleaned[non_ascii].str.replace(_NON_ALNUM_RE, " ", regex=True)
+    return cleaned.str.split().str.join(" ").astype(texts.dtype)
+
+def product_filter_series(products: pd.Series) -> pd.Series:
+    """
+    Vectorized ``product_filter`` over a whole column.
+
+    Product names have very low cardinality, so the combined keyword regex is
+    evaluated once per distinct value and broadcast back to every row.
+
+    Args:
+        products (pd.Series): Product names, possibly with missing values.
+
+    Returns:
+        pd.Series: Boolean mask with the same index as ``products``.
+    """
+    codes, uniques = pd.factorize(products)
+    matches = pd.Series(uniques, dtype=object).str.lower().str.contains(_TARGET_KEYWORDS_RE, na=False)
+    # Missing products get code -1, which picks the trailing False
+    lookup = np.append(matches.to_numpy(dtype=bool), False)
+    return pd.Series(lookup[codes], index=products.index)
+
+def word_count_series(texts: pd.Series, normalized: bool = False) -> pd.Series:
+    """
+    Count whitespace-separated words per row, like ``len(x.split())``.
+
+    Args:
+        texts (pd.Series): Text column.
+        normalized (bool): Set when the text comes from ``clean_text`` (single spaces,
+            no leading/trailing whitespace); words are then counted from the spaces alone.
+
+    Returns:
+        pd.Series: Integer word counts with the same index as ``texts``.
+    """
+    values = texts.astype(object)
+    if normalized:
+        return values.str.count(" ") + (values.str.len() > 0)
+    return values.map(lambda x: len(x.split()))
+
 # ---------- EDA & Processing Pipeline ----------
 
-def run_pipeline(df: pd.DataFrame) -> pd.DataFrame:
+@contextmanager
+def _timed_stage(name: str, timings: dict = None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if timings is None:
+        print(f"⏱️ {name}: {elapsed:.2f}s")
+    else:
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+def _clean_narratives(narratives: pd.Series, max_words: int) -> tuple:
+    """
+    Clean one shard of narratives and flag outliers.
+
+    Runs in worker processes, so it only receives the narrative column and
+    returns plain arrays to keep pickling overhead low.
+
+    Returns:
+        tuple: (cleaned narratives as an object array, keep mask for rows under
+        ``max_words``, dict of stage timings in seconds)
+    """
+    timings = {}
+    with _timed_stage("clean_text", timings):
+        cleaned = clean_text_series(narratives)
+    with _timed_stage("outlier_handling", timings):
+        keep = (word_count_series(cleaned, normalized=True) < max_words).to_numpy()
+    return cleaned.to_numpy(dtype=object), keep, timings
+
+def _parallel_clean(df: pd.DataFrame, workers: int, max_words: int) -> pd.DataFrame:
+    # Several shards per worker so one slow shard doesn't idle the rest of the pool
+    shards = np.array_split(np.arange(len(df)), max(1, workers * 4))
+    narratives = df["Consumer complaint narrative"]
+    worker_timings = {}
+    cleaned, keep = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_clean_narratives, (narratives.iloc[idx] for idx in shards),
+                           [max_words] * len(shards))
+        # map() yields in submission order, so the shards are merged back in row order
+        for shard_cleaned, shard_keep, timings in results:
+            cleaned.append(shard_cleaned)
+            keep.append(shard_keep)
+            for stage, seconds in timings.items():
+                worker_timings[stage] = worker_timings.get(stage, 0.0) + seconds
+
+    df["Cleaned_Narrative"] = np.concatenate(cleaned) if cleaned else np.empty(0, dtype=object)
+    keep = np.concatenate(keep) if keep else np.empty(0, dtype=bool)
+    print(f"✅ Removed {int((~keep).sum())} extreme outlier narratives (>{max_words} words).")
+    print("⏱️ Worker CPU time: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in worker_timings.items()))
+    return df[keep]
 
-    df = duplicate_handling(df)
-    df = missing_value_handling(df)
-    df = date_time_conversion(df)
-    df = categorical_data_standardizing(df)
+def run_pipeline(df: pd.DataFrame, workers: int = 1) -> pd.DataFrame:
+    """
+    Clean the raw complaints and keep the target products.
 
+    Args:
+        df (pd.DataFrame): Raw complaints.
+        workers (int): Number of processes used for narrative cleaning and outlier
+            removal. 1 runs everything in the current process.
+
+    Returns:
+        pd.DataFrame: Processed complaints with a ``Cleaned_Narrative`` column.
+    """
+    with _timed_stage("duplicate_handling"):
+        df = duplicate_handling(df)
+    with _timed_stage("missing_value_handling"):
+        df = missing_value_handling(df)
+    with _timed_stage("date_time_conversion"):
+        df = date_time_conversion(df)
+    with _timed_stage("categorical_data_standardizing"):
+        df = categorical_data_standardizing(df)
+
+    # The product filter only looks at distinct product names, so it stays in this
+    # process and the workers never receive narratives that would be dropped anyway
     print("🔍 Filtering target products...")
-    df = df[df["Product"].apply(product_filter)]
+    with _timed_stage("product_filter"):
+        df = df[product_filter_series(df["Product"])]
 
-    print("🧹 Cleaning narratives...")
-    df["Cleaned_Narrative"] = df["Consumer complaint narrative"].apply(clean_text)
+    if workers > 1:
+        print(f"🧹 Cleaning narratives and handling outliers on {workers} workers...")
+        with _timed_stage("clean_text + outlier_handling"):
+            df = _parallel_clean(df, workers, max_words=3000)
+    else:
+        print("🧹 Cleaning narratives...")
+        with _timed_stage("clean_text"):
+            df["Cleaned_Narrative"] = clean_text_series(df["Consumer complaint narrative"])
 
-    print("📊 Handling outliers...")
-    df = outlier_handling(df, "Cleaned_Narrative", max_words=3000)
+        print("📊 Handling outliers...")
+        with _timed_stage("outlier_handling"):
+            df = outlier_handling(df, "Cleaned_Narrative", max_words=3000, normalized=True)
 
     return df
 
+# ---------- Streaming Pipeline ----------
+
+class _RowHashSet:
+    """
+    Compact set of 64-bit row hashes used to deduplicate rows across chunks.
+
+    Hashes are kept in a single sorted uint64 array (8 bytes per row) instead of
+    a Python set, so memory stays small even for millions of complaints.
+    """
+
+    def __init__(self):
+        self._hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Add a batch of hashes and return a mask of the rows seen for the first time.
+
+        Args:
+            hashes (np.ndarray): uint64 row hashes of one chunk, in row order.
+
+        Returns:
+            np.ndarray: Boolean mask, True for rows not seen in this or any earlier chunk.
+        """
+        # First occurrence of each hash within the chunk
+        _, first_idx = np.unique(hashes, return_index=True)
+        is_new = np.zeros(len(hashes), dtype=bool)
+        is_new[first_idx] = True
+
+        # Drop hashes already seen in earlier chunks
+        if len(self._hashes):
+            pos = np.searchsorted(self._hashes, hashes)
+            pos[pos == len(self._hashes)] = 0
+            is_new &= self._hashes[pos] != hashes
+
+        self._hashes = np.union1d(self._hashes, hashes[is_new])
+        return is_new
+
+def _csv_dtypes(file_path: str) -> dict:
+    # Read every column except the numeric ID as text so all chunks share one schema
+    columns = pd.read_csv(file_path, nrows=0).columns
+    return {col: str for col in columns if col != "Complaint ID"}
+
+def run_pipeline_streaming(input_path: str = RAW_DATA_PATH, output_path: str = PROCESSED_DATA_PATH,
+                           chunksize: int = 100_000, max_words: int = 3000, workers: int = 1) -> int:
+    """
+    Run the preprocessing pipeline over a large CSV without loading it into memory.
+
+    The raw file is read in chunks of ``chunksize`` rows. Each chunk is deduplicated
+    against every row seen so far, cleaned with the same steps as ``run_pipeline``
+    and appended to ``output_path``, so peak memory depends on the chunk size only.
+
+    Args:
+        input_path (str): Path to the raw complaints CSV.
+        output_path (str): Path of the processed file to write (CSV, Parquet or Arrow,
+            picked from the extension).
+        chunksize (int): Number of raw rows processed at a time.
+        max_words (int): Narratives with this many words or more are dropped.
+        workers (int): Number of processes cleaning chunks concurrently. At most
+            ``2 * workers`` chunks are in flight, so memory stays bounded.
+
+    Returns:
+        int: Number of rows written to ``output_path``.
+    """
+    seen = _RowHashSet()
+    totals = {"read": 0, "duplicates": 0, "missing": 0, "products": 0, "outliers": 0, "written": 0}
+    timings = {}
+
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    writer = DataWriter(output_path)
+
+    def write(chunk: pd.DataFrame, result: tuple):
+        cleaned, keep, worker_timings = result
+        for stage, seconds in worker_timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        chunk["Cleaned_Narrative"] = cleaned
+        chunk = chunk[keep]
+        totals["outliers"] += int((~keep).sum())
+
+        with _timed_stage("write", timings):
+            writer.write(chunk)
+        totals["written"] += len(chunk)
+        print(f"📦 {totals['read']} rows read, {totals['written']} rows written so far.")
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = deque()
+    try:
+        reader = pd.read_csv(input_path, chunksize=chunksize, dtype=_csv_dtypes(input_path))
+        while True:
+            with _timed_stage("read_csv", timings):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            totals["read"] += len(chunk)
+
+            # Cross-chunk deduplication on the full raw row
+            with _timed_stage("duplicate_handling", timings):
+                hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+                is_new = seen.add(hashes)
+                totals["duplicates"] += int((~is_new).sum())
+                chunk = chunk[is_new]
+
+            with _timed_stage("missing_value_handling", timings):
+                before = len(chunk)
+                chunk = chunk[chunk["Consumer complaint narrative"].notna()]
+                totals["missing"] += before - len(chunk)
+
+            with _timed_stage("date_time_conversion", timings):
+                chunk = date_time_conversion(chunk)
+            with _timed_stage("categorical_data_standardizing", timings):
+                chunk = categorical_data_standardizing(chunk)
+
+            with _timed_stage("product_filter", timings):
+                before = len(chunk)
+                chunk = chunk[product_filter_series(chunk["Product"])]
+                totals["products"] += before - len(chunk)
+
+            narratives = chunk["Consumer complaint narrative"]
+            if pool is None:
+                write(chunk, _clean_narratives(narratives, max_words))
+                continue
+
+            pending.append((chunk, pool.submit(_clean_narratives, narratives, max_words)))
+            # Write finished chunks in input order, capping how many are held in memory
+            while pending and (len(pending) >= 2 * workers or pending[0][1].done()):
+                done_chunk, future = pending.popleft()
+                write(done_chunk, future.result())
+
+        while pending:
+            done_chunk, future = pending.popleft()
+            write(done_chunk, future.result())
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    print(f"✅ Removed {totals['duplicates']} duplicate rows.")
+    print(f"✅ Dropped {totals['missing']} rows with missing narratives.")
+    print(f"✅ Filtered out {totals['products']} rows outside the target products.")
+    print(f"✅ Removed {totals['outliers']} extreme outlier narratives (>{max_words} words).")
+    print("⏱️ Stage timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    print(f"💾 Saved {totals['written']} processed complaints to {output_path}.")
+    return totals["written"]
+
 # ---------- EDA Visualization ----------
 
 def generate_visuals(df: pd.DataFrame):
@@ -99,7 +404,7 @@ def generate_visuals(df: pd.DataFrame):
     plt.show()
 
     # Narrative length
-    df["NarrativeLength"] = df["Cleaned_Narrative"].apply(lambda x: len(x.split()))
+    df["NarrativeLength"] = word_count_series(df["Cleaned_Narrative"], normalized=True)
     plt.figure(figsize=(10, 5))
     sns.histplot(df["NarrativeLength"], bins=50, kde=True)
     plt.title("Distribution of Cleaned Narrative Lengths")
@@ -1,67 +1,553 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from sentence_transformers import SentenceTransformer
 import faiss
+import hashlib
+import json
+import multiprocessing
+import numpy as np
 import pandas as pd
 import os
 import pickle
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from src.chunking import chunk_offsets
 from src.config import PROCESSED_DATA_PATH
-from src.utils import load_data
+from src.lexical_index import build_lexical_index, update_lexical_index
+from src.metadata_store import update_metadata_store, write_metadata_store
+from src.sharded_index import build_sharded_index
+from src.utils import data_columns, load_data
 
 # CONFIGURABLE
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Only these columns are read from the processed complaints
+EMBEDDING_COLUMNS = ["Complaint ID", "Product", "Cleaned_Narrative"]
+# Extra columns copied into each chunk's metadata (when present) for filtered search
+FILTER_COLUMNS = {"Date received": "date_received", "Company": "company", "State": "state"}
+INDEX_PATH = "../vector_store/index.faiss"
+METADATA_PATH = "../vector_store/metadata.pkl"
+# Memory-mapped columnar copy of the metadata, read by the retriever
+METADATA_STORE_PATH = "../vector_store/metadata"
+# BM25 inverted index over the same chunks, for lexical and hybrid retrieval
+LEXICAL_INDEX_PATH = "../vector_store/lexical"
+# Directory of per-shard indexes, used instead of INDEX_PATH when sharding
+SHARDS_PATH = "../vector_store/shards"
+MANIFEST_PATH = "../vector_store/manifest.pkl"
+VECTORS_PATH = "../vector_store/vectors.npy"
+# Chunks encoded per forward pass / vectors added to FAISS per call
+EMBED_BATCH_SIZE = 256
+INDEX_ADD_BATCH_SIZE = 65_536
+# FAISS index layouts supported by build_faiss_index
+INDEX_TYPES = ("flat", "sq_fp16", "sq8", "pq", "ivf_flat", "ivf_pq", "hnsw")
+# Brute-force index types storing compressed codes instead of float32 vectors
+SCALAR_QUANTIZERS = {"sq_fp16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}
+# Vectors sampled to train IVF coarse quantizers and PQ codebooks
+INDEX_TRAIN_SAMPLE = 100_000
+# Complaints embedded between two commits of an incremental build
+INCREMENTAL_BATCH_SIZE = 20_000
 
 
+def _atomic_write(path: str, write) -> None:
+    # Write to a temp file first so a crash never leaves a half-written file behind
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _atomic_pickle(obj, path: str) -> None:
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(obj, f)
+    _atomic_write(path, write)
+
+def _atomic_json(obj, path: str) -> None:
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(obj, f)
+    _atomic_write(path, write)
+
 # 2. Chunking narratives
-def chunk_narratives(df: pd.DataFrame, text_column: str) -> list:
-    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+def _chunk_shard(texts: list) -> tuple:
+    return chunk_offsets(texts, CHUNK_SIZE, CHUNK_OVERLAP)
+
+def _chunk_offsets(texts: list, workers: int) -> tuple:
+    # (rows, starts, ends) arrays; workers only send offsets back, never chunk strings
+    if workers <= 1 or len(texts) < 2:
+        return _chunk_shard(texts)
+    # Several shards per worker so one slow shard doesn't idle the rest of the pool
+    shards = np.array_split(np.arange(len(texts)), max(1, workers * 4))
+    rows, starts, ends = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_chunk_shard, ([texts[i] for i in idx] for idx in shards))
+        # map() yields in submission order, so shard rows only need their offset added
+        for idx, (shard_rows, shard_starts, shard_ends) in zip(shards, results):
+            rows.append(shard_rows + (idx[0] if len(idx) else 0))
+            starts.append(shard_starts)
+            ends.append(shard_ends)
+    return np.concatenate(rows), np.concatenate(starts), np.concatenate(ends)
+
+def chunk_narratives(df: pd.DataFrame, text_column: str, workers: int = 1) -> tuple:
+    """
+    Split narratives into overlapping chunks with their metadata.
+
+    Boundaries are identical to LangChain's ``RecursiveCharacterTextSplitter``
+    (``CHUNK_SIZE`` / ``CHUNK_OVERLAP``), computed by ``src.chunking`` as offset
+    arrays. Columns are read once instead of row by row, and each chunk string is
+    sliced once and shared by the chunk list and its metadata dict.
+
+    Args:
+        df (pd.DataFrame): Complaints with "Complaint ID", "Product" and ``text_column``.
+        text_column (str): Column holding the narratives.
+        workers (int): Processes splitting texts in parallel.
+
+    Returns:
+        tuple[list, list]: Chunk texts and one metadata dict per chunk.
+    """
+    texts = df[text_column].tolist()
+    rows, starts, ends = _chunk_offsets(texts, workers)
+
+    ids = df["Complaint ID"].tolist()
+    products = df["Product"].tolist()
+    filter_columns = [(key, [_filter_value(v) for v in df[col].tolist()])
+                      for col, key in FILTER_COLUMNS.items() if col in df.columns]
+
     all_chunks = []
     metadata = []
-
-    for _, row in df.iterrows():
-        chunks = splitter.split_text(row[text_column])
-        for chunk in chunks:
-            all_chunks.append(chunk)
-            metadata.append({
-                "complaint_id": row["Complaint ID"],
-                "product": row["Product"],
-                "text": chunk
-            })
+    for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        chunk = texts[row][start:end]
+        all_chunks.append(chunk)
+        meta = {"complaint_id": ids[row], "product": products[row]}
+        for key, values in filter_columns:
+            meta[key] = values[row]
+        meta["text"] = chunk
+        metadata.append(meta)
     return all_chunks, metadata
 
+def _filter_value(value):
+    # Dates become ISO "YYYY-MM-DD" strings, which sort (and range-filter) correctly
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    return value
+
 # 3. Generate vector embeddings
-def embed_chunks(chunks: list, model_name: str):
-    model = SentenceTransformer(model_name)
-    vectors = model.encode(chunks, show_progress_bar=True, convert_to_numpy=True)
-    return vectors
+@lru_cache(maxsize=None)
+def _load_model(model_name: str) -> SentenceTransformer:
+    return SentenceTransformer(model_name)
+
+# Model held by each embedding worker process
+_worker_model = None
+
+def _init_embedding_worker(model_name: str, threads: int) -> None:
+    # Pin intra-op threads so N workers don't oversubscribe the cores
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    global _worker_model
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+def _encode_in_worker(texts: list) -> np.ndarray:
+    return _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+def _encode_batches(batches, model_name: str, workers: int = 1):
+    """
+    Encode an iterable of text batches and yield their vectors in input order.
+
+    With ``workers > 1`` batches are spread over a pool of spawned processes that
+    each load the model once; at most ``2 * workers`` batches are in flight.
+    """
+    if workers <= 1:
+        model = _load_model(model_name)
+        for texts in batches:
+            yield model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # spawn, not fork: forking a process that already initialised torch can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_embedding_worker,
+                             initargs=(model_name, threads)) as pool:
+        pending = deque()
+        for texts in batches:
+            pending.append(pool.submit(_encode_in_worker, texts))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def embed_chunks(chunks: list, model_name: str, workers: int = 1, batch_size: int = EMBED_BATCH_SIZE):
+    if workers <= 1:
+        model = _load_model(model_name)
+        vectors = model.encode(chunks, show_progress_bar=True, convert_to_numpy=True)
+        return vectors
+
+    batches = (chunks[start:start + batch_size] for start in range(0, len(chunks), batch_size))
+    return np.concatenate(list(_encode_batches(batches, model_name, workers)))
+
+def _chunks_fingerprint(chunks: list, model_name: str, batch_size: int, dtype: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{model_name}|{batch_size}|{dtype}|{len(chunks)}".encode("utf-8"))
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def embed_chunks_to_memmap(chunks: list, model_name: str, vectors_path: str = VECTORS_PATH,
+                           batch_size: int = EMBED_BATCH_SIZE, dtype: str = "float32",
+                           workers: int = 1) -> np.ndarray:
+    """
+    Embed chunks in batches straight into a memory-mapped ``.npy`` file.
+
+    Only one batch of vectors is held in RAM at a time. Chunks are encoded in
+    order of length so every batch pads to a similar size, and each vector is
+    written to the row of its chunk, so the file keeps the input order. Progress
+    is checkpointed to ``<vectors_path>.progress`` after every batch; calling the
+    function again with the same chunks resumes after the last finished batch.
+
+    Args:
+        chunks (list): Chunk texts.
+        model_name (str): SentenceTransformer model used for embeddings.
+        vectors_path (str): Output ``.npy`` file.
+        batch_size (int): Chunks per forward pass.
+        dtype (str): Storage type, "float32" or "float16".
+        workers (int): Embedding processes; see ``_encode_batches``.
+
+    Returns:
+        np.ndarray: Read-only memory map of shape (len(chunks), dim).
+    """
+    progress_path = f"{vectors_path}.progress"
+    fingerprint = _chunks_fingerprint(chunks, model_name, batch_size, dtype)
+
+    done = 0
+    if os.path.exists(progress_path) and os.path.exists(vectors_path):
+        with open(progress_path) as f:
+            progress = json.load(f)
+        if progress["fingerprint"] == fingerprint:
+            done = progress["batches_done"]
+            print(f"⏩ Resuming embedding after {done} finished batches.")
+
+    vectors = np.load(vectors_path, mmap_mode="r+") if done else None
+    order = np.argsort([len(chunk) for chunk in chunks], kind="stable")
+    batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+    texts = ([chunks[i] for i in idx] for idx in batches[done:])
+
+    for b, batch_vectors in enumerate(_encode_batches(texts, model_name, workers), start=done):
+        if vectors is None:
+            # The first batch tells us the embedding dimension
+            vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=dtype,
+                                                shape=(len(chunks), batch_vectors.shape[1]))
+        vectors[batches[b]] = batch_vectors
+        vectors.flush()
+        _atomic_json({"fingerprint": fingerprint, "batches_done": b + 1, "batches_total": len(batches)}, progress_path)
+        if (b + 1) % 100 == 0 or b + 1 == len(batches):
+            print(f"🔗 Embedded {min((b + 1) * batch_size, len(chunks))}/{len(chunks)} chunks.")
+
+    if vectors is None:
+        dim = _load_model(model_name).get_sentence_embedding_dimension()
+        vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=dtype, shape=(len(chunks), dim))
+
+    del vectors
+    return np.load(vectors_path, mmap_mode="r")
 
 # 4. Create FAISS index
-def index_to_faiss(vectors, metadata, index_path="../vector_store/index.faiss", meta_path="../vector_store/metadata.pkl"):
-    dim = vectors.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(vectors)
+def _train_sample(vectors, train_size: int, seed: int = 0) -> np.ndarray:
+    n = len(vectors)
+    if n <= train_size:
+        return np.ascontiguousarray(vectors[:], dtype=np.float32)
+    # Sorted rows keep reads from a memory-mapped matrix sequential
+    rows = np.sort(np.random.default_rng(seed).choice(n, train_size, replace=False))
+    return np.ascontiguousarray(vectors[rows], dtype=np.float32)
+
+def build_faiss_index(vectors, index_type: str = "flat", nlist: int = None, pq_m: int = 16, pq_bits: int = 8,
+                      hnsw_m: int = 32, ef_construction: int = 200, train_size: int = INDEX_TRAIN_SAMPLE):
+    """
+    Build a FAISS index of the given type and add all vectors to it.
+
+    Args:
+        vectors (np.ndarray): Embedding matrix, possibly memory-mapped.
+        index_type (str): One of ``INDEX_TYPES``:
+            - "flat": exact brute-force search (``IndexFlatL2``), 4 bytes per dimension
+            - "sq_fp16": brute-force search over float16 vectors, 2 bytes per dimension
+            - "sq8": brute-force search over scalar-quantized int8 codes, 1 byte per dimension
+            - "pq": brute-force search over product-quantized codes (``pq_m`` bytes per vector)
+            - "ivf_flat": inverted lists over ``nlist`` k-means cells, full vectors
+            - "ivf_pq": inverted lists with product-quantized codes (``pq_m`` bytes per vector)
+            - "hnsw": HNSW graph with ``hnsw_m`` links per node
+        nlist (int, optional): IVF cells. Defaults to about 4 * sqrt(n), capped so
+            every cell gets at least 39 training points.
+        pq_m (int): PQ sub-quantizers ("pq" and "ivf_pq"); must divide the embedding dimension.
+        pq_bits (int): Bits per PQ code.
+        hnsw_m (int): HNSW graph degree.
+        ef_construction (int): HNSW build-time search depth.
+        train_size (int): Vectors sampled to train IVF/PQ.
+
+    Returns:
+        faiss.Index: The populated index.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}")
+    n, dim = vectors.shape
 
-    faiss.write_index(index, index_path)
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type in SCALAR_QUANTIZERS or index_type == "pq":
+        if index_type == "pq":
+            index = faiss.IndexPQ(dim, pq_m, pq_bits)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, SCALAR_QUANTIZERS[index_type])
+        # sq8 learns per-dimension ranges and pq its codebooks; fp16 needs no training
+        if not index.is_trained:
+            print(f"🎯 Training {index_type} on {min(n, train_size)} vectors...")
+            index.train(_train_sample(vectors, train_size))
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        if nlist is None:
+            nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+        print(f"🎯 Training {index_type} ({nlist} cells) on {min(n, train_size)} vectors...")
+        index.train(_train_sample(vectors, train_size))
+
+    # Add in slices so a memory-mapped (or float16) matrix is never copied whole
+    for start in range(0, n, INDEX_ADD_BATCH_SIZE):
+        index.add(np.ascontiguousarray(vectors[start:start + INDEX_ADD_BATCH_SIZE], dtype=np.float32))
+    return index
+
+def index_to_faiss(vectors, metadata, index_path=INDEX_PATH, meta_path=METADATA_PATH,
+                   index_type: str = "flat", store_path: str = None, lexical_path: str = None,
+                   shard_by: str = None, n_shards: int = 4, workers: int = 1, **index_params):
+    if shard_by:
+        # index_path is then a directory of shards sharing the same metadata
+        build_sharded_index(vectors, metadata, index_path, by=shard_by, n_shards=n_shards,
+                            index_type=index_type, workers=workers, **index_params)
+    else:
+        index = build_faiss_index(vectors, index_type=index_type, **index_params)
+        faiss.write_index(index, index_path)
 
     with open(meta_path, "wb") as f:
         pickle.dump(metadata, f)
+    if store_path:
+        write_metadata_store(metadata, store_path)
+    if lexical_path:
+        build_lexical_index([meta["text"] for meta in metadata], lexical_path)
 
     print(f"✅ Indexed {len(vectors)} vectors. FAISS index saved to {index_path}.")
 
-# 5. Main runner
-def run_embedding_pipeline():
-    df = load_data(PROCESSED_DATA_PATH)
+# 5. Incremental index updates
+def complaint_hash(product, text: str, filters: tuple = ()) -> str:
+    """
+    Content hash of one complaint; a changed hash means it has to be re-indexed.
+
+    ``filters`` holds the complaint's ``FILTER_COLUMNS`` values, so a changed
+    company, state or date also refreshes the filter fields in its metadata.
+    """
+    fields = [product, text, *(_filter_value(value) for value in filters)]
+    return hashlib.blake2b("\x1f".join(map(str, fields)).encode("utf-8"), digest_size=8).hexdigest()
+
+def _is_flat(index) -> bool:
+    # Incremental updates keep an IndexIDMap2 over an exact IndexFlatL2
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return isinstance(index, faiss.IndexFlat)
+
+def _commit(index, metadata: list, manifest: dict, index_path: str, meta_path: str, manifest_path: str) -> None:
+    # The manifest is written last: it is the commit record that decides what is indexed
+    _atomic_write(index_path, lambda path: faiss.write_index(index, path))
+    _atomic_pickle(metadata, meta_path)
+    _atomic_pickle(manifest, manifest_path)
+
+def _load_incremental_state(index_path: str, meta_path: str, manifest_path: str) -> tuple:
+    """
+    Load the index, metadata and manifest and repair them after an interrupted run.
+
+    Rows that are not fully committed in the manifest (written after the last
+    manifest commit, or belonging to a complaint whose rows are partly gone) are
+    removed, so the index and metadata always match the manifest afterwards.
+    """
+    if not os.path.exists(manifest_path):
+        if os.path.exists(index_path):
+            if not _is_flat(faiss.read_index(index_path)):
+                raise ValueError(f"{index_path} is not a flat index; an incremental update would replace it "
+                                 "with a flat one. Rebuild it with run_embedding_pipeline(incremental=False).")
+            print("⚠️ No manifest found; rebuilding the index in incremental format.")
+        return None, [], {"next_id": 0, "complaints": {}}
+
+    with open(manifest_path, "rb") as f:
+        manifest = pickle.load(f)
+    index = faiss.read_index(index_path)
+    with open(meta_path, "rb") as f:
+        metadata = pickle.load(f)
+
+    next_id = manifest["next_id"]
+    metadata = metadata[:next_id] + [None] * max(0, next_id - len(metadata))
+    indexed = set(faiss.vector_to_array(index.id_map).tolist())
+
+    live_ids = set()
+    for cid, (content_hash, ids) in list(manifest["complaints"].items()):
+        if all(i in indexed and metadata[i] is not None for i in ids):
+            live_ids.update(ids)
+        else:
+            del manifest["complaints"][cid]
+
+    for i in range(next_id):
+        if i not in live_ids:
+            metadata[i] = None
+    stale = np.array(sorted(indexed - live_ids), dtype=np.int64)
+    if len(stale):
+        index.remove_ids(stale)
+        _commit(index, metadata, manifest, index_path, meta_path, manifest_path)
+        print(f"🩹 Rolled back {len(stale)} uncommitted vectors from an interrupted run.")
+    return index, metadata, manifest
+
+def update_faiss_index(df: pd.DataFrame, text_column: str, model_name: str = EMBEDDING_MODEL,
+                       index_path: str = INDEX_PATH, meta_path: str = METADATA_PATH,
+                       manifest_path: str = MANIFEST_PATH, batch_size: int = INCREMENTAL_BATCH_SIZE,
+                       store_path: str = None, lexical_path: str = None) -> dict:
+    """
+    Bring the FAISS index in line with ``df`` by embedding only what changed.
+
+    A manifest maps each indexed ``Complaint ID`` to a content hash and its FAISS
+    row IDs. New or changed complaints are chunked, embedded and appended with
+    fresh IDs; removed or changed complaints are deleted by ID and their metadata
+    entries become ``None`` tombstones, so metadata positions keep matching the
+    FAISS IDs. Work is committed every ``batch_size`` complaints, and a crashed run
+    resumes from the last commit when called again.
+
+    The index is always an exact ``IndexIDMap2(IndexFlatL2)``: compressed and
+    approximate layouts (``INDEX_TYPES`` other than "flat") need training on the
+    full corpus, so they are only built by a full run, and an existing non-flat
+    index is never silently replaced. The metadata store and BM25 index are
+    updated in place: only the appended rows are encoded and removed rows are
+    tombstoned.
+
+    Args:
+        df (pd.DataFrame): Current processed complaints.
+        text_column (str): Column holding the narrative text.
+        model_name (str): SentenceTransformer model used for embeddings.
+        index_path (str): FAISS index file.
+        meta_path (str): Pickled metadata list.
+        manifest_path (str): Pickled manifest.
+        batch_size (int): Complaints embedded between two commits.
+        store_path (str, optional): If set, the columnar metadata store is
+            brought in line with the metadata list once the update is done.
+        lexical_path (str, optional): If set, the BM25 index is brought in line
+            with the metadata list once the update is done.
+
+    Returns:
+        dict: Counts of ``added``, ``changed``, ``removed`` and ``unchanged`` complaints.
+    """
+    index, metadata, manifest = _load_incremental_state(index_path, meta_path, manifest_path)
+    indexed = manifest["complaints"]
+    if index is None:
+        # Fresh incremental index: a store or BM25 index left by a full build numbers rows differently
+        for path in (store_path, lexical_path):
+            if path:
+                shutil.rmtree(path, ignore_errors=True)
+
+    df = df.drop_duplicates(subset="Complaint ID", keep="last")
+    filter_columns = [df[col].tolist() for col in FILTER_COLUMNS if col in df.columns]
+    filter_values = zip(*filter_columns) if filter_columns else [()] * len(df)
+    hashes = {
+        cid: complaint_hash(product, text, filters)
+        for cid, product, text, filters in zip(df["Complaint ID"].tolist(), df["Product"].tolist(),
+                                               df[text_column].tolist(), filter_values)
+    }
+    removed = [cid for cid in indexed if cid not in hashes]
+    changed = [cid for cid, h in hashes.items() if cid in indexed and indexed[cid][0] != h]
+    pending = [cid for cid, h in hashes.items() if cid not in indexed or indexed[cid][0] != h]
+    stats = {
+        "added": len(pending) - len(changed),
+        "changed": len(changed),
+        "removed": len(removed),
+        "unchanged": len(hashes) - len(pending),
+    }
+    print(f"🧾 {stats['added']} new, {stats['changed']} changed, {stats['removed']} removed, "
+          f"{stats['unchanged']} unchanged complaints.")
+
+    # Drop removed complaints and the old version of changed ones
+    stale_ids = [i for cid in removed + changed for i in indexed.pop(cid)[1]]
+    if stale_ids:
+        index.remove_ids(np.array(stale_ids, dtype=np.int64))
+        for i in stale_ids:
+            metadata[i] = None
+        _commit(index, metadata, manifest, index_path, meta_path, manifest_path)
+
+    pending_df = df[df["Complaint ID"].isin(set(pending))]
+    for start in range(0, len(pending_df), batch_size):
+        batch = pending_df.iloc[start:start + batch_size]
+        _, batch_meta = chunk_narratives(batch, text_column=text_column)
+        ids = np.arange(manifest["next_id"], manifest["next_id"] + len(batch_meta), dtype=np.int64)
+        if batch_meta:
+            vectors = embed_chunks([meta["text"] for meta in batch_meta], model_name)
+            if index is None:
+                index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+            index.add_with_ids(vectors, ids)
+            metadata.extend(batch_meta)
+            manifest["next_id"] += len(batch_meta)
+        if index is None:
+            continue
+
+        ids_by_complaint = {}
+        for i, meta in zip(ids.tolist(), batch_meta):
+            ids_by_complaint.setdefault(meta["complaint_id"], []).append(i)
+        # Complaints without any chunk are recorded too, with no row IDs
+        for cid in batch["Complaint ID"].tolist():
+            indexed[cid] = (hashes[cid], ids_by_complaint.get(cid, []))
+
+        _commit(index, metadata, manifest, index_path, meta_path, manifest_path)
+        print(f"✅ Committed {min(start + batch_size, len(pending_df))}/{len(pending_df)} complaints "
+              f"({index.ntotal} vectors in index).")
+
+    # Both are no-ops when already in sync, so rows committed by a crashed run are picked up too
+    if store_path:
+        update_metadata_store(metadata, store_path)
+    if lexical_path:
+        update_lexical_index([meta["text"] if meta is not None else None for meta in metadata], lexical_path)
+    return stats
+
+# 6. Main runner
+def run_embedding_pipeline(products: list = None, incremental: bool = False, workers: int = 1,
+                           index_type: str = "flat", shard_by: str = None, n_shards: int = 4,
+                           **index_params):
+    if incremental and products:
+        # The update treats every indexed complaint missing from df as removed
+        raise ValueError("products cannot be combined with incremental; the update would "
+                         "remove every other product from the index")
+    if incremental and (index_type != "flat" or shard_by or index_params):
+        raise ValueError("incremental updates only maintain a single flat index; build other "
+                         "index types and sharded layouts with incremental=False")
+    # Filter columns are optional: older processed files only have the embedding columns
+    available = set(data_columns(PROCESSED_DATA_PATH))
+    columns = EMBEDDING_COLUMNS + [col for col in FILTER_COLUMNS if col in available]
+    df = load_data(PROCESSED_DATA_PATH, columns=columns, products=products)
     print(f"📄 Loaded {len(df)} complaints.")
 
+    if incremental:
+        print("🔁 Updating FAISS index incrementally...")
+        update_faiss_index(df, text_column="Cleaned_Narrative", store_path=METADATA_STORE_PATH,
+                           lexical_path=LEXICAL_INDEX_PATH)
+        return
+
     print("🔪 Chunking narratives...")
-    chunks, metadata = chunk_narratives(df, text_column="Cleaned_Narrative")
+    chunks, metadata = chunk_narratives(df, text_column="Cleaned_Narrative", workers=workers)
+    print(f"✅ {len(chunks)} chunks.")
 
     print("🔗 Embedding chunks...")
-    vectors = embed_chunks([meta["text"] for meta in metadata], EMBEDDING_MODEL)
+    vectors = embed_chunks_to_memmap(chunks, EMBEDDING_MODEL, workers=workers)
 
     print("📦 Indexing into FAISS...")
-    index_to_faiss(vectors, metadata)
+    index_to_faiss(vectors, metadata, index_path=SHARDS_PATH if shard_by else INDEX_PATH,
+                   index_type=index_type, store_path=METADATA_STORE_PATH, lexical_path=LEXICAL_INDEX_PATH,
+                   shard_by=shard_by, n_shards=n_shards, workers=workers, **index_params)
 
 if __name__ == "__main__":
     run_embedding_pipeline()
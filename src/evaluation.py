@@ -1,7 +1,41 @@
 # Import necessary typing and data handling modules
+import asyncio
+import json
+import os
+import time
 from typing import List, Dict  # For type hints
 import pandas as pd  # For data manipulation and DataFrame operations
 from src.rag_pipeline import RAGPipeline  # Custom RAG pipeline implementation
+from src.cache import AnswerCache  # Optional cache of generated answers
+from src.reranker import Reranker  # Optional post-retrieval reranking
+
+# Columns of the evaluation DataFrame
+RESULT_COLUMNS = [
+    "Question",
+    "Generated Answer",
+    "Retrieved Sources",
+    "Retrieval Time (s)",
+    "Generation Time (s)",
+    "Quality Score (1-5)",
+    "Comments/Analysis",
+]
+
+def _result_row(question: str, answer: str, sources: list, k: int,
+                retrieval_time: float, generation_time: float) -> dict:
+    return {
+        "Question": question,
+        "Generated Answer": answer,
+        "Retrieved Sources": "\n---\n".join(sources[:k]),  # Format sources with separators
+        "Retrieval Time (s)": round(retrieval_time, 4),
+        "Generation Time (s)": round(generation_time, 4),
+        "Quality Score (1-5)": "",  # Placeholder for manual quality assessment
+        "Comments/Analysis": ""     # Placeholder for manual analysis notes
+    }
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
 
 class RAGEvaluator:
     """
@@ -9,54 +43,144 @@ class RAGEvaluator:
     It generates answers to questions, retrieves relevant sources, and creates evaluation reports.
     """
     
-    def __init__(self, index_path: str, metadata_path: str):
+    def __init__(self, index_path: str, metadata_path: str, answer_cache: AnswerCache = None,
+                 reranker: Reranker = None):
         """
         Initialize the RAG evaluator with paths to the search index and metadata.
         
         Args:
             index_path (str): Path to the pre-built vector index for document retrieval
             metadata_path (str): Path to the metadata file containing document information
+            answer_cache (AnswerCache, optional): Cache of generated answers passed to the pipeline
+            reranker (Reranker, optional): Post-retrieval reranking stage passed to the pipeline
         """
         # Initialize the RAG pipeline with the provided index and metadata paths
-        self.pipeline = RAGPipeline(index_path, metadata_path)
+        self.pipeline = RAGPipeline(index_path, metadata_path, answer_cache=answer_cache, reranker=reranker)
 
-    def evaluate_questions(self, questions: List[str], k: int = 2) -> pd.DataFrame:
+    def evaluate_questions(self, questions: List[str], k: int = 2, concurrency: int = 1,
+                           batch_size: int = 32, checkpoint_path: str = None) -> pd.DataFrame:
         """
         Evaluate the RAG pipeline's performance on a list of questions.
+
+        Retrieval runs in batches of ``batch_size`` questions (one embedding +
+        search call each). With ``concurrency > 1`` generation is asynchronous:
+        up to ``concurrency`` Gemini calls are in flight while the next batch is
+        being retrieved. Every finished question is appended to
+        ``checkpoint_path`` (JSON lines), and questions already in that file are
+        not asked again, so a crashed run picks up where it stopped.
         
         Args:
             questions (List[str]): List of questions to evaluate the pipeline on
             k (int, optional): Number of top sources to display. Defaults to 2.
+            concurrency (int, optional): Maximum concurrent generation calls. Defaults to 1.
+            batch_size (int, optional): Questions per retrieval batch. Defaults to 32.
+            checkpoint_path (str, optional): JSONL file used to checkpoint and resume the run.
             
         Returns:
-            pd.DataFrame: Results dataframe containing questions, answers, sources, and evaluation fields
+            pd.DataFrame: Results dataframe containing questions, answers, sources, per-question
+                retrieval/generation timings and evaluation fields, in input order
         """
-        results = []  # Store evaluation results for each question
-        
-        for q in questions:
-            print(f"🔎 Evaluating: {q}")
-            
-            # Run the RAG pipeline to get answer and sources
-            answer, sources = self.pipeline.run(q)
-            
-            # Display evaluation progress in console
-            print("\nGenerated Answer:\n", answer)
-            print("\nTop Retrieved Sources:\n", "\n---\n".join(sources[:k]))
-            print("="*60)  # Separator for readability
-
-            # Store results for this question
-            results.append({
-                "Question": q,
-                "Generated Answer": answer,
-                "Retrieved Sources": "\n---\n".join(sources[:k]),  # Format sources with separators
-                "Quality Score (1-5)": "",  # Placeholder for manual quality assessment
-                "Comments/Analysis": ""     # Placeholder for manual analysis notes
-            })
-
-        # Convert results to DataFrame for easier handling and reporting
-        df = pd.DataFrame(results)
+        # Resume: keep rows that were finished by a previous run of the same questions
+        results = self._load_checkpoint(checkpoint_path, questions)
+        pending = [(i, q) for i, q in enumerate(questions) if i not in results]
+        if results:
+            print(f"♻️ Resuming evaluation: {len(results)} done, {len(pending)} remaining")
+
+        checkpoint = None
+        if checkpoint_path:
+            os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+            checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+            if checkpoint.tell() and not _ends_with_newline(checkpoint_path):
+                checkpoint.write("\n")  # Terminate a line cut short by a crash
+
+        def record(i: int, row: dict) -> None:
+            results[i] = row
+            if checkpoint is not None:
+                checkpoint.write(json.dumps({"index": i, **row}) + "\n")
+                checkpoint.flush()
+
+        try:
+            if concurrency > 1:
+                asyncio.run(self._evaluate_concurrent(pending, k, concurrency, batch_size, record))
+            else:
+                self._evaluate_sequential(pending, k, batch_size, record)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        # Convert results to DataFrame for easier handling and reporting, in input order
+        df = pd.DataFrame([results[i] for i in range(len(questions))], columns=RESULT_COLUMNS)
         return df
 
+    def _retrieve(self, batch: list) -> tuple[list, float]:
+        # Retrieve context for a batch of questions in one embedding + search call;
+        # the batch time is split evenly over its questions
+        start = time.perf_counter()
+        all_docs = self.pipeline.retrieve_batch([q for _, q in batch])
+        return all_docs, (time.perf_counter() - start) / len(batch)
+
+    def _evaluate_sequential(self, pending: list, k: int, batch_size: int, record) -> None:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            all_docs, retrieval_time = self._retrieve(batch)
+
+            for (i, q), docs in zip(batch, all_docs):
+                print(f"🔎 Evaluating: {q}")
+
+                # Run prompt building and generation on the retrieved context
+                gen_start = time.perf_counter()
+                answer, sources = self.pipeline.answer(q, docs)
+                generation_time = time.perf_counter() - gen_start
+
+                # Display evaluation progress in console
+                print("\nGenerated Answer:\n", answer)
+                print("\nTop Retrieved Sources:\n", "\n---\n".join(sources[:k]))
+                print("="*60)  # Separator for readability
+
+                record(i, _result_row(q, answer, sources, k, retrieval_time, generation_time))
+
+    async def _evaluate_concurrent(self, pending: list, k: int, concurrency: int, batch_size: int, record) -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+        done = 0
+
+        async def answer_one(i: int, q: str, docs: list, retrieval_time: float) -> None:
+            nonlocal done
+            async with semaphore:
+                gen_start = time.perf_counter()
+                answer, sources = await self.pipeline.aanswer(q, docs)
+                generation_time = time.perf_counter() - gen_start
+            record(i, _result_row(q, answer, sources, k, retrieval_time, generation_time))
+            done += 1
+            print(f"✅ [{done}/{len(pending)}] {q} ({generation_time:.2f}s)")
+
+        tasks = []
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            # Retrieval runs in a worker thread, overlapping with the in-flight generations
+            all_docs, retrieval_time = await asyncio.to_thread(self._retrieve, batch)
+            tasks.extend(
+                asyncio.create_task(answer_one(i, q, docs, retrieval_time))
+                for (i, q), docs in zip(batch, all_docs)
+            )
+        await asyncio.gather(*tasks)
+
+    @staticmethod
+    def _load_checkpoint(path: str, questions: List[str]) -> Dict[int, dict]:
+        results = {}
+        if not path or not os.path.exists(path):
+            return results
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written last line of a crashed run
+                i = row.pop("index", None)
+                # Only reuse rows that belong to this question list
+                if isinstance(i, int) and 0 <= i < len(questions) and row.get("Question") == questions[i]:
+                    results[i] = row
+        return results
+
     def save_markdown(self, df: pd.DataFrame, path: str = "../report/rag_eval_report.md") -> None:
         """
         Save the evaluation results to a markdown file for documentation and sharing.
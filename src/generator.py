@@ -1,57 +1,226 @@
+import asyncio
+import logging
 import os
+import random
+import threading
+import time
+import weakref
 from dotenv import load_dotenv  # For loading environment variables from .env file
 import google.generativeai as genai  # Google's Gemini AI SDK
+from google.api_core import exceptions as google_exceptions
+
+# Errors worth retrying: rate limits, overload and timeouts
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    TimeoutError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
 
 class GeminiGenerator:
     """
     A class to interact with Google's Gemini AI model for text generation.
-    Handles API configuration, chat session management, and response generation.
+    Handles API configuration, request retries and response generation.
+
+    By default every prompt is sent as an independent single-shot request, so
+    prompt size does not grow with the number of calls and concurrent callers
+    never share state. ``stateless=False`` restores the old behaviour of one
+    chat session that accumulates history.
     """
 
-    def __init__(self, model_name: str = "models/gemini-2.5-pro") -> None:
+    def __init__(self, model_name: str = "models/gemini-2.5-pro", stateless: bool = True,
+                 max_concurrency: int = 8, timeout: float = 60.0, max_retries: int = 3,
+                 backoff: float = 1.0, model=None) -> None:
         """
         Initialize the Gemini generator with API configuration.
-        
+
         Args:
-            model_name (str): Name of the Gemini model to use. 
+            model_name (str): Name of the Gemini model to use.
                             Defaults to "models/gemini-2.5-pro".
-        
+            stateless (bool): Send each prompt on its own instead of into one chat session.
+            max_concurrency (int): Maximum in-flight ``agenerate`` requests per event loop.
+            timeout (float): Per-attempt timeout in seconds.
+            max_retries (int): Retries after a transient error or timeout.
+            backoff (float): Base delay in seconds; doubles on each retry, with jitter.
+            model (optional): Backend exposing ``generate_content`` (and optionally
+                ``generate_content_async``), e.g. a local stub for tests. Defaults to
+                a ``genai.GenerativeModel``, whose client connection is reused across calls.
+
         Raises:
             ValueError: If the API key is not found in environment variables.
         """
-        # Load environment variables from .env file
-        load_dotenv()
-        
-        # Retrieve API key from environment variables
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in .env file")
-        
-        # Configure the Gemini API with the obtained key
-        genai.configure(api_key=api_key)
-        
-        # Initialize the generative model and start a chat session
-        self.model = genai.GenerativeModel(model_name)
-        self.chat = self.model.start_chat()  # Maintains conversation history
+        if model is None:
+            # Load environment variables from .env file
+            load_dotenv()
+
+            # Retrieve API key from environment variables
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found in .env file")
+
+            # Configure the Gemini API with the obtained key
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(model_name)
+
+        self.model = model
+        self.stateless = stateless
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        # Chat mode keeps one conversation; the lock stops concurrent callers interleaving in it
+        self.chat = None if stateless else self.model.start_chat()
+        self._chat_lock = threading.Lock()
+        # asyncio semaphores are bound to one event loop, so keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _request_options(self) -> dict:
+        return {"timeout": self.timeout} if self.timeout else None
+
+    def _send(self, prompt: str):
+        if self.chat is not None:
+            with self._chat_lock:
+                return self.chat.send_message(prompt, request_options=self._request_options())
+        return self.model.generate_content(prompt, request_options=self._request_options())
 
     def generate(self, prompt: str) -> str:
         """
         Generate a response from Gemini based on the given prompt.
-        
+
+        Transient failures (rate limits, overload, timeouts) are retried with
+        exponential backoff.
+
+        Args:
+            prompt (str): The input text/prompt to send to Gemini.
+
+        Returns:
+            str: The generated response text.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Send the prompt to Gemini and return the cleaned response text
+                return self._send(prompt).text.strip()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    logging.error("❌ Error generating with Gemini after %d attempts: %s", attempt + 1, str(e))
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.warning("⚠️ Gemini request failed (%s), retrying in %.1fs", str(e), delay)
+                time.sleep(delay)
+            except Exception as e:
+                # Log the error and re-raise the exception
+                logging.error("❌ Error generating with Gemini: %s", str(e))
+                raise
+
+    def generate_stream(self, prompt: str):
+        """
+        Stream a response from Gemini, yielding text as it arrives.
+
+        Connection errors before the first chunk are retried like in
+        ``generate``; once text has been yielded a failure is raised as is.
+
         Args:
             prompt (str): The input text/prompt to send to Gemini.
-            
+
+        Yields:
+            str: Consecutive pieces of the response text.
+        """
+        options = self._request_options()
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                if self.chat is not None:
+                    # Hold the chat lock until the whole reply has been consumed
+                    with self._chat_lock:
+                        for text in self._chunk_texts(self.chat.send_message(prompt, stream=True, request_options=options)):
+                            started = True
+                            yield text
+                else:
+                    for text in self._chunk_texts(self.model.generate_content(prompt, stream=True, request_options=options)):
+                        started = True
+                        yield text
+                return
+            except RETRYABLE_ERRORS as e:
+                if started or attempt == self.max_retries:
+                    logging.error("❌ Error streaming from Gemini: %s", str(e))
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.warning("⚠️ Gemini request failed (%s), retrying in %.1fs", str(e), delay)
+                time.sleep(delay)
+            except Exception as e:
+                logging.error("❌ Error streaming from Gemini: %s", str(e))
+                raise
+
+    @staticmethod
+    def _chunk_texts(response):
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # Chunk without text parts (e.g. only finish metadata)
+            if text:
+                yield text
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _asend(self, prompt: str):
+        if self.chat is not None:
+            # A shared chat session can only take one message at a time
+            return await asyncio.to_thread(self._send, prompt)
+        if hasattr(self.model, "generate_content_async"):
+            return await self.model.generate_content_async(prompt, request_options=self._request_options())
+        return await asyncio.to_thread(self.model.generate_content, prompt, request_options=self._request_options())
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Async version of ``generate``.
+
+        At most ``max_concurrency`` requests are in flight at once; each attempt
+        is cancelled after ``timeout`` seconds and transient failures are retried
+        with exponential backoff.
+
+        Args:
+            prompt (str): The input text/prompt to send to Gemini.
+
+        Returns:
+            str: The generated response text.
+        """
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await asyncio.wait_for(self._asend(prompt), self.timeout)
+                    return response.text.strip()
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        logging.error("❌ Error generating with Gemini after %d attempts: %s", attempt + 1, str(e))
+                        raise
+                    delay = self._backoff_delay(attempt)
+                    logging.warning("⚠️ Gemini request failed (%s), retrying in %.1fs", str(e) or type(e).__name__, delay)
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    logging.error("❌ Error generating with Gemini: %s", str(e))
+                    raise
+
+    async def agenerate_many(self, prompts: list) -> list:
+        """
+        Generate responses for several prompts concurrently.
+
+        Args:
+            prompts (list): Prompts to send.
+
         Returns:
-            str: The generated response text, or error message if generation fails.
-        """
-        try:
-            # Send the prompt to Gemini and get the response
-            response = self.chat.send_message(prompt)
-            
-            # Return cleaned response text
-            return response.text.strip()
-            
-        except Exception as e:
-            # Log the error and re-raise the exception
-            logging.error("❌ Error generating with Gemini: %s", str(e))
-            raise
\ No newline at end of file
+            list: Response texts, in the order of ``prompts``.
+        """
+        return await asyncio.gather(*(self.agenerate(prompt) for prompt in prompts))
@@ -0,0 +1,293 @@
+import json
+import os
+import re
+import shutil
+from array import array
+from collections import Counter
+import numpy as np
+from src.metadata_store import replace_directory
+
+SCHEMA_FILE = "lexical.json"
+DOCS_FILE = "postings_docs.npy"
+TFS_FILE = "postings_tfs.npy"
+OFFSETS_FILE = "postings_offsets.npy"
+LENGTHS_FILE = "doc_lengths.npy"
+IDF_FILE = "idf.npy"
+MAX_SCORES_FILE = "max_scores.npy"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> list:
+    """Lower-cased word tokens; account numbers, fee and merchant names stay intact."""
+    return _TOKEN_RE.findall(text.lower())
+
+def _bm25(tfs: np.ndarray, lengths: np.ndarray, idf: float, k1: float, b: float, avgdl: float) -> np.ndarray:
+    tfs = tfs.astype(np.float32)
+    return (idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths / avgdl))).astype(np.float32)
+
+def _member(sorted_ids: np.ndarray, ids: np.ndarray) -> tuple:
+    # Positions of ``ids`` in ``sorted_ids`` and whether each one is present
+    pos = np.searchsorted(sorted_ids, ids)
+    found = pos < len(sorted_ids)
+    found[found] = sorted_ids[pos[found]] == ids[found]
+    return pos, found
+
+def build_lexical_index(texts: list, path: str, k1: float = 1.2, b: float = 0.75) -> None:
+    """
+    Build a BM25 inverted index over chunk texts, in the format read by ``LexicalIndex``.
+
+    Layout of the ``path`` directory:
+        - ``postings_docs.npy`` / ``postings_tfs.npy``: int32 doc IDs and uint16 term
+          frequencies of every posting, grouped by term, doc IDs ascending per term
+        - ``postings_offsets.npy``: int64, term t owns ``postings[offsets[t]:offsets[t+1]]``
+        - ``doc_lengths.npy``: int32 token count per doc (0 for removed rows)
+        - ``idf.npy`` / ``max_scores.npy``: float32 IDF and highest BM25 contribution per term
+        - ``lexical.json``: vocabulary and BM25 parameters
+
+    Doc IDs are list positions, i.e. the FAISS row IDs of the chunks.
+
+    Args:
+        texts (list): Chunk text per FAISS row, or None for removed rows.
+        path (str): Output directory.
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalization.
+    """
+    vocab = {}
+    term_ids, doc_ids, tfs = array("i"), array("i"), array("i")
+    lengths = np.zeros(len(texts), dtype=np.int32)
+    for doc_id, text in enumerate(texts):
+        if not text:
+            continue
+        tokens = tokenize(text)
+        lengths[doc_id] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+
+    _write_lexical_index(path, list(vocab), np.asarray(term_ids, dtype=np.int32), np.asarray(doc_ids, dtype=np.int32),
+                         np.asarray(tfs, dtype=np.int64), lengths, k1, b)
+
+def update_lexical_index(texts: list, path: str) -> None:
+    """
+    Bring an index written by ``build_lexical_index`` in line with ``texts``.
+
+    Meant for incremental index updates, where rows are only appended or
+    removed (``None``). Only the appended rows are tokenized; postings of
+    removed rows are dropped and the BM25 statistics are recomputed from the
+    stored postings. Any other change (fewer rows than indexed) rebuilds the
+    index.
+
+    Args:
+        texts (list): Chunk text per FAISS row, or None for removed rows.
+        path (str): Index directory.
+    """
+    schema_path = os.path.join(path, SCHEMA_FILE)
+    if not os.path.exists(schema_path):
+        build_lexical_index(texts, path)
+        return
+    with open(schema_path, encoding="utf-8") as f:
+        schema = json.load(f)
+    old_lengths = np.load(os.path.join(path, LENGTHS_FILE))
+    if len(old_lengths) > len(texts):
+        build_lexical_index(texts, path, k1=schema["k1"], b=schema["b"])
+        return
+    removed = np.array([i for i in np.flatnonzero(old_lengths > 0) if texts[i] is None], dtype=np.int32)
+    if not len(removed) and len(old_lengths) == len(texts):
+        return
+
+    # Stored postings, minus the removed rows
+    doc_ids = np.load(os.path.join(path, DOCS_FILE))
+    tfs = np.load(os.path.join(path, TFS_FILE)).astype(np.int64)
+    offsets = np.load(os.path.join(path, OFFSETS_FILE))
+    term_ids = np.repeat(np.arange(len(schema["terms"]), dtype=np.int32), np.diff(offsets))
+    keep = ~np.isin(doc_ids, removed)
+    lengths = np.zeros(len(texts), dtype=np.int32)
+    lengths[:len(old_lengths)] = old_lengths
+    lengths[removed] = 0
+
+    # Appended rows
+    vocab = {term: i for i, term in enumerate(schema["terms"])}
+    new_terms, new_docs, new_tfs = array("i"), array("i"), array("i")
+    for doc_id in range(len(old_lengths), len(texts)):
+        text = texts[doc_id]
+        if not text:
+            continue
+        tokens = tokenize(text)
+        lengths[doc_id] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            new_terms.append(vocab.setdefault(term, len(vocab)))
+            new_docs.append(doc_id)
+            new_tfs.append(tf)
+
+    _write_lexical_index(path, list(vocab),
+                         np.concatenate([term_ids[keep], np.asarray(new_terms, dtype=np.int32)]),
+                         np.concatenate([doc_ids[keep], np.asarray(new_docs, dtype=np.int32)]),
+                         np.concatenate([tfs[keep], np.asarray(new_tfs, dtype=np.int64)]),
+                         lengths, schema["k1"], schema["b"])
+
+def _write_lexical_index(path: str, vocab: list, term_ids: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                         lengths: np.ndarray, k1: float, b: float) -> None:
+    # Terms left without postings (all their docs removed) are dropped from the vocabulary
+    used = np.bincount(term_ids, minlength=len(vocab)) > 0
+    if not used.all():
+        term_ids = (np.cumsum(used) - 1)[term_ids].astype(np.int32)
+        vocab = [term for term, keep in zip(vocab, used) if keep]
+
+    # Postings grouped by term, doc IDs ascending within each term
+    order = np.lexsort((doc_ids, term_ids))
+    doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+    tfs = np.minimum(np.asarray(tfs, dtype=np.int64)[order], np.iinfo(np.uint16).max).astype(np.uint16)
+    doc_freqs = np.bincount(term_ids, minlength=len(vocab))
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(doc_freqs, out=offsets[1:])
+
+    n_docs = int((lengths > 0).sum())
+    avgdl = float(lengths[lengths > 0].mean()) if n_docs else 1.0
+    idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+    if len(vocab):
+        scores = _bm25(tfs, lengths[doc_ids], np.repeat(idf, doc_freqs), k1, b, avgdl)
+        max_scores = np.maximum.reduceat(scores, offsets[:-1]).astype(np.float32)
+    else:
+        max_scores = np.zeros(0, dtype=np.float32)
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, data in [(DOCS_FILE, doc_ids), (TFS_FILE, tfs), (OFFSETS_FILE, offsets),
+                       (LENGTHS_FILE, lengths), (IDF_FILE, idf), (MAX_SCORES_FILE, max_scores)]:
+        np.save(os.path.join(tmp_path, name), data)
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"k1": k1, "b": b, "avgdl": avgdl, "docs": n_docs, "terms": vocab}, f)
+    replace_directory(tmp_path, path)
+    print(f"✅ Lexical index built: {len(vocab)} terms, {len(doc_ids)} postings.")
+
+class LexicalIndex:
+    """
+    Memory-mapped BM25 index with MaxScore-style top-k pruning.
+
+    Query terms are scored in order of decreasing upper bound. Once the summed
+    upper bounds of the remaining terms can no longer lift an unseen document
+    into the current top k, new documents stop being admitted: the remaining
+    posting lists are only probed for the surviving candidates (binary search)
+    instead of being scored in full, and candidates that can't reach the top k
+    are dropped along the way.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an index written by ``build_lexical_index``.
+
+        Args:
+            path (str): Index directory.
+        """
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), encoding="utf-8") as f:
+            schema = json.load(f)
+        self.k1 = schema["k1"]
+        self.b = schema["b"]
+        self.avgdl = schema["avgdl"]
+        self._terms = {term: i for i, term in enumerate(schema["terms"])}
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+        self._docs = load(DOCS_FILE)
+        self._tfs = load(TFS_FILE)
+        self._offsets = load(OFFSETS_FILE)
+        self._lengths = load(LENGTHS_FILE)
+        self._idf = load(IDF_FILE)
+        self._max_scores = load(MAX_SCORES_FILE)
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _postings(self, term: int) -> tuple:
+        start, end = self._offsets[term], self._offsets[term + 1]
+        return np.asarray(self._docs[start:end], dtype=np.int64), self._tfs[start:end]
+
+    def _scores(self, term: int, ids: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        return _bm25(np.asarray(tfs), self._lengths[ids], self._idf[term], self.k1, self.b, self.avgdl)
+
+    def search(self, query: str, k: int = 10, allowed: np.ndarray = None, prune: bool = True) -> tuple:
+        """
+        Top-k BM25 search.
+
+        Args:
+            query (str): Search query.
+            k (int): Number of results.
+            allowed (np.ndarray, optional): Sorted doc IDs results are restricted to
+                (e.g. from a metadata filter).
+            prune (bool): Use MaxScore pruning. False scores every posting
+                (same results, used as a reference).
+
+        Returns:
+            tuple: (int64 doc IDs, float32 scores), best first; ties by doc ID.
+        """
+        terms = sorted({self._terms[t] for t in tokenize(query) if t in self._terms},
+                       key=lambda t: -self._max_scores[t])
+        cand_ids = np.zeros(0, dtype=np.int64)
+        cand_scores = np.zeros(0, dtype=np.float64)
+        if not terms or k <= 0:
+            return cand_ids, cand_scores.astype(np.float32)
+
+        # remaining[j]: best score the terms after j can still add to a document
+        bounds = np.array([self._max_scores[t] for t in terms], dtype=np.float64)
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1][1:], 0.0)
+        closed = False
+
+        for j, term in enumerate(terms):
+            ids, tfs = self._postings(term)
+            if allowed is not None:
+                _, keep = _member(allowed, ids)
+                ids, tfs = ids[keep], tfs[keep]
+
+            if not closed:
+                # Admit new documents: merge the posting list into the candidates
+                ids = np.concatenate([cand_ids, ids])
+                scores = np.concatenate([cand_scores, self._scores(term, ids[len(cand_ids):], tfs)])
+                cand_ids, inverse = np.unique(ids, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=scores, minlength=len(cand_ids))
+            else:
+                # Only probe the posting list for the surviving candidates
+                pos, found = _member(ids, cand_ids)
+                hit = pos[found]
+                cand_scores[found] += self._scores(term, ids[hit], tfs[hit])
+
+            if prune and len(cand_ids) >= k:
+                theta = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+                if remaining[j] < theta:
+                    closed = True
+                survivors = cand_scores + remaining[j] >= theta
+                cand_ids, cand_scores = cand_ids[survivors], cand_scores[survivors]
+
+        if len(cand_ids) > k:
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+            # Keep every candidate tied with the k-th score so ties resolve by doc ID
+            kth = cand_scores[top].min()
+            top = np.flatnonzero(cand_scores >= kth)
+            cand_ids, cand_scores = cand_ids[top], cand_scores[top]
+        order = np.lexsort((cand_ids, -cand_scores))[:k]
+        return cand_ids[order], cand_scores[order].astype(np.float32)
+
+def reciprocal_rank_fusion(rankings: list, k: int = 10, rrf_k: int = 60) -> tuple:
+    """
+    Merge several ranked ID lists with reciprocal-rank fusion.
+
+    Each list contributes ``1 / (rrf_k + rank)`` to an ID's score, so no score
+    calibration between BM25 and vector distances is needed.
+
+    Args:
+        rankings (list): Ranked ID lists, best first. Ties keep the order of
+            first appearance, so put the preferred ranking first.
+        k (int): Number of fused results.
+        rrf_k (int): Damping constant; 60 is the usual choice.
+
+    Returns:
+        tuple: (IDs, fused scores), best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    fused = sorted(scores.items(), key=lambda item: -item[1])[:k]
+    return [doc_id for doc_id, _ in fused], [score for _, score in fused]
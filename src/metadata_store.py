@@ -0,0 +1,319 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = "schema.json"
+TEXT_FILE = "text.bin"
+OFFSETS_FILE = "text_offsets.npy"
+VALID_FILE = "valid.npy"
+
+def _is_int(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+def _json_value(value):
+    # Vocabulary entries must survive a JSON round trip
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+def match_condition(values, condition) -> np.ndarray:
+    """
+    Evaluate one metadata filter condition over an array of values.
+
+    Args:
+        values (array-like): Field values; None/NaN never match.
+        condition: A scalar (equality), a list/set (membership) or a
+            ``(low, high)`` tuple (inclusive range, either end may be None).
+            ISO date strings compare correctly as plain strings.
+
+    Returns:
+        np.ndarray: Boolean mask over ``values``.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        # Integer columns (complaint IDs, ...): plain NumPy comparisons
+        if isinstance(condition, tuple):
+            low, high = condition
+            mask = np.ones(len(values), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            return mask
+        if isinstance(condition, (list, set, frozenset)):
+            return np.isin(values, list(condition))
+        return values == condition
+
+    values = pd.Series(values, dtype=object)
+    mask = values.notna().to_numpy(dtype=bool, copy=True)
+    present = values[mask]
+    if isinstance(condition, tuple):
+        low, high = condition
+        keep = np.ones(len(present), dtype=bool)
+        if low is not None:
+            keep &= (present >= low).to_numpy(dtype=bool)
+        if high is not None:
+            keep &= (present <= high).to_numpy(dtype=bool)
+    elif isinstance(condition, (list, set, frozenset)):
+        keep = present.isin(list(condition)).to_numpy(dtype=bool)
+    else:
+        keep = (present == condition).to_numpy(dtype=bool)
+    mask[mask] = keep
+    return mask
+
+def replace_directory(tmp_path: str, path: str) -> None:
+    """Swap a freshly written directory in; processes with the old files mapped keep reading them."""
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def write_metadata_store(records: list, path: str, text_field: str = "text") -> None:
+    """
+    Write chunk metadata in the columnar format read by ``MetadataStore``.
+
+    Layout of the ``path`` directory:
+        - ``text.bin``: UTF-8 chunk texts back to back
+        - ``text_offsets.npy``: int64 offsets, row i is ``text[offsets[i]:offsets[i+1]]``
+        - ``valid.npy``: False for tombstoned rows (``None`` records)
+        - ``<field>.npy``: int64 values for integer fields such as the complaint ID,
+          or int32 codes into a vocabulary stored in ``schema.json`` for the rest
+          (product names, ...)
+
+    The directory is written next to ``path`` first and swapped in at the end,
+    so readers never see a half-written store.
+
+    Args:
+        records (list): One dict per FAISS row, or None for removed rows.
+        path (str): Output directory.
+        text_field (str): Key holding the chunk text.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    valid = np.array([record is not None for record in records], dtype=bool)
+    live = [record for record in records if record is not None]
+    fields = [field for field in dict.fromkeys(key for record in live for key in record) if field != text_field]
+
+    # Text blob and offsets
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    with open(os.path.join(tmp_path, TEXT_FILE), "wb") as f:
+        for i, record in enumerate(records):
+            encoded = record[text_field].encode("utf-8") if record is not None else b""
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(os.path.join(tmp_path, OFFSETS_FILE), offsets)
+    np.save(os.path.join(tmp_path, VALID_FILE), valid)
+
+    # Remaining fields: plain integers or dictionary-encoded categories
+    columns = {}
+    for field in fields:
+        values = [record.get(field) if record is not None else None for record in records]
+        present = [v for v in values if v is not None]
+        if present and all(_is_int(v) for v in present):
+            data = np.array([v if v is not None else -1 for v in values], dtype=np.int64)
+            columns[field] = {"kind": "int"}
+        else:
+            codes, vocab = pd.factorize(pd.Series(values, dtype=object))
+            data = codes.astype(np.int32)  # -1 marks a missing value
+            columns[field] = {"kind": "category", "vocab": [_json_value(v) for v in vocab]}
+        np.save(os.path.join(tmp_path, f"{field}.npy"), data)
+
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"text_field": text_field, "rows": len(records), "columns": columns}, f)
+
+    replace_directory(tmp_path, path)
+
+def update_metadata_store(records: list, path: str, text_field: str = "text") -> None:
+    """
+    Bring a store written by ``write_metadata_store`` in line with ``records``.
+
+    Meant for incremental index updates, where rows are only appended or
+    tombstoned (set to None). The existing text blob and columns are copied
+    as they are and only the appended rows are encoded; new category values
+    extend the vocabulary. Anything else (fewer rows than stored, a
+    non-integer value for an integer field) rewrites the whole store.
+
+    Args:
+        records (list): One dict per FAISS row, or None for removed rows.
+        path (str): Store directory.
+        text_field (str): Key holding the chunk text.
+    """
+    schema_path = os.path.join(path, SCHEMA_FILE)
+    if not os.path.exists(schema_path):
+        write_metadata_store(records, path, text_field)
+        return
+    with open(schema_path, encoding="utf-8") as f:
+        schema = json.load(f)
+    n_old = schema["rows"]
+    if n_old > len(records) or schema["text_field"] != text_field:
+        write_metadata_store(records, path, text_field)
+        return
+
+    valid = np.load(os.path.join(path, VALID_FILE))
+    removed = [i for i in np.flatnonzero(valid) if records[i] is None]
+    if not removed and n_old == len(records):
+        return
+    new = records[n_old:]
+    valid = np.concatenate([valid, np.array([record is not None for record in new], dtype=bool)])
+    valid[removed] = False
+
+    # Columns: stored values plus the encoded new rows
+    columns = dict(schema["columns"])
+    new_fields = [field for field in dict.fromkeys(key for record in new if record is not None for key in record)
+                  if field != text_field and field not in columns]
+    data = {}
+    for field in list(columns) + new_fields:
+        values = [record.get(field) if record is not None else None for record in new]
+        present = [v for v in values if v is not None]
+        if field in columns:
+            spec = columns[field]
+            old = np.load(os.path.join(path, f"{field}.npy"))
+        else:
+            spec = {"kind": "int"} if present and all(_is_int(v) for v in present) else {"kind": "category", "vocab": []}
+            old = np.full(n_old, -1, dtype=np.int64 if spec["kind"] == "int" else np.int32)
+        if spec["kind"] == "int":
+            if not all(_is_int(v) for v in present):
+                write_metadata_store(records, path, text_field)
+                return
+            added = np.array([v if v is not None else -1 for v in values], dtype=np.int64)
+        else:
+            codes = {value: i for i, value in enumerate(spec["vocab"])}
+            added = np.array([-1 if v is None or pd.isna(v) else codes.setdefault(_json_value(v), len(codes))
+                              for v in values], dtype=np.int32)
+            spec = {"kind": "category", "vocab": list(codes)}
+        columns[field] = spec
+        data[field] = np.concatenate([old, added])
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    # Text blob: the stored bytes, then the new rows
+    old_offsets = np.load(os.path.join(path, OFFSETS_FILE))
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    offsets[:n_old + 1] = old_offsets
+    shutil.copyfile(os.path.join(path, TEXT_FILE), os.path.join(tmp_path, TEXT_FILE))
+    with open(os.path.join(tmp_path, TEXT_FILE), "ab") as f:
+        for i, record in enumerate(new, start=n_old):
+            encoded = record[text_field].encode("utf-8") if record is not None else b""
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(os.path.join(tmp_path, OFFSETS_FILE), offsets)
+    np.save(os.path.join(tmp_path, VALID_FILE), valid)
+    for field, values in data.items():
+        np.save(os.path.join(tmp_path, f"{field}.npy"), values)
+
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"text_field": text_field, "rows": len(records), "columns": columns}, f)
+
+    replace_directory(tmp_path, path)
+
+class MetadataStore:
+    """
+    Read-only, memory-mapped chunk metadata indexed by FAISS row ID.
+
+    A drop-in replacement for the pickled list of dicts: ``store[i]`` returns the
+    same dict (or None for a tombstone), but only the requested rows are decoded.
+    All arrays are memory-mapped, so every process serving the same store shares
+    one copy through the OS page cache instead of holding its own Python objects.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a store written by ``write_metadata_store``.
+
+        Args:
+            path (str): Store directory.
+        """
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), encoding="utf-8") as f:
+            schema = json.load(f)
+        self.text_field = schema["text_field"]
+        self.columns = schema["columns"]
+
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._valid = np.load(os.path.join(path, VALID_FILE), mmap_mode="r")
+        text_path = os.path.join(path, TEXT_FILE)
+        # np.memmap refuses empty files
+        self._text = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else b""
+        self._data = {field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r") for field in self.columns}
+
+    def __len__(self) -> int:
+        return len(self._valid)
+
+    def _value(self, field: str, i: int):
+        raw = self._data[field][i]
+        spec = self.columns[field]
+        if spec["kind"] == "int":
+            return int(raw)
+        return spec["vocab"][raw] if raw >= 0 else None
+
+    def text(self, i: int) -> str:
+        """Decode the chunk text of row ``i``."""
+        return bytes(self._text[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i: int):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not self._valid[i]:
+            return None
+        record = {field: self._value(field, i) for field in self.columns}
+        record[self.text_field] = self.text(i)
+        return record
+
+    def get_many(self, ids) -> list:
+        """
+        Look up several FAISS row IDs at once.
+
+        Args:
+            ids (iterable): Row IDs; negative IDs (FAISS padding) are skipped.
+
+        Returns:
+            list: One dict (or None for tombstones) per non-negative ID, in order.
+        """
+        return [self[i] for i in ids if i >= 0]
+
+    def column(self, field: str) -> np.ndarray:
+        """Raw memory-mapped array of a field (integer values or category codes)."""
+        return self._data[field]
+
+    def codes_for(self, field: str, condition) -> np.ndarray:
+        """
+        Vocabulary codes of a category field whose value satisfies ``condition``
+        (see ``match_condition``). Only the vocabulary is scanned, not the rows.
+        """
+        vocab = self.columns[field]["vocab"]
+        return np.flatnonzero(match_condition(vocab, condition)).astype(np.int32)
+
+    def filter_ids(self, filters: dict) -> np.ndarray:
+        """
+        Row IDs of live rows matching every filter.
+
+        Args:
+            filters (dict): Field name -> condition (see ``match_condition``).
+
+        Returns:
+            np.ndarray: Sorted int64 row IDs.
+
+        Raises:
+            ValueError: If a field is not stored.
+        """
+        mask = np.array(self._valid, dtype=bool)
+        for field, condition in filters.items():
+            if field not in self.columns:
+                raise ValueError(f"Unknown metadata field: {field}")
+            data = self._data[field]
+            if self.columns[field]["kind"] == "category":
+                mask &= np.isin(data, self.codes_for(field, condition))
+            else:
+                values = np.asarray(data)
+                mask &= (values != -1) & match_condition(values, condition)  # -1 marks a missing value
+        return np.flatnonzero(mask).astype(np.int64)
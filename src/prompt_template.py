@@ -1,7 +1,46 @@
+import re
+from functools import lru_cache
+
+# Static instructions, identical for every request
+PREAMBLE = (
+    "You are a helpful and knowledgeable **financial analyst assistant** for CrediTrust.\n"
+    "You will be shown several excerpts from real customer complaints.\n"
+    "\n"
+    "INSTRUCTIONS:\n"
+    "1. Use only the provided excerpts to answer the user's question.\n"
+    "2. Maintain a professional, analytical tone suitable for financial services.\n"
+    "3. If different excerpts contain conflicting information, note this in your response.\n"
+    "\n"
+    "IMPORTANT LIMITATIONS:\n"
+    "- If the answer cannot be found in the context, respond with:\n"
+    "  \"I'm sorry, but the provided context doesn't contain enough information to answer that.\"\n"
+    "- Never speculate or invent information beyond what's in the excerpts.\n"
+    "\n"
+    "CONTEXT EXCERPTS:\n"
+)
+RESPONSE_FORMAT = (
+    "REQUIRED RESPONSE FORMAT:\n"
+    "Answer: [Your analysis here]"
+)
+
+# Average characters per token for English text; calibrate with TokenCounter.calibrate
+CHARS_PER_TOKEN = 4.0
+# Cleaned narratives have no punctuation, so long "sentences" are cut into word windows
+SENTENCE_WINDOW_WORDS = 20
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+")
+
+def _format_excerpt(i: int, chunk: str) -> str:
+    return f"Excerpt {i+1}:\n\"\"\"\n{chunk.strip()}\n\"\"\""
+
+def _format_prompt(context: str, question: str) -> str:
+    return f"{PREAMBLE}{context}\n\nQUESTION:\n{question}\n\n{RESPONSE_FORMAT}"
+
 def build_prompt(context_chunks: list, question: str) -> str:
     """
     Constructs a structured prompt for financial complaint analysis using provided context chunks.
-    
+
     The prompt is designed to guide a financial analyst assistant in answering questions based on
     customer complaint excerpts while maintaining strict context boundaries.
 
@@ -19,36 +58,144 @@ def build_prompt(context_chunks: list, question: str) -> str:
     """
     # Format each context chunk with clear numbering and delimiters for readability
     context = "\n\n".join(
-        [f"Excerpt {i+1}:\n\"\"\"\n{chunk.strip()}\n\"\"\"" 
-         for i, chunk in enumerate(context_chunks)]
+        [_format_excerpt(i, chunk) for i, chunk in enumerate(context_chunks)]
     )
 
-    # Construct the complete prompt with:
-    # 1. Role definition
-    # 2. Task instructions
-    # 3. Fallback behavior
-    # 4. Formatted context
-    # 5. The question
-    prompt = (
-        "You are a helpful and knowledgeable **financial analyst assistant** for CrediTrust.\n"
-        "You will be shown several excerpts from real customer complaints.\n"
-        "\n"
-        "INSTRUCTIONS:\n"
-        "1. Use only the provided excerpts to answer the user's question.\n"
-        "2. Maintain a professional, analytical tone suitable for financial services.\n"
-        "3. If different excerpts contain conflicting information, note this in your response.\n"
-        "\n"
-        "IMPORTANT LIMITATIONS:\n"
-        "- If the answer cannot be found in the context, respond with:\n"
-        "  \"I'm sorry, but the provided context doesn't contain enough information to answer that.\"\n"
-        "- Never speculate or invent information beyond what's in the excerpts.\n"
-        "\n"
-        "CONTEXT EXCERPTS:\n"
-        f"{context}\n\n"
-        "QUESTION:\n"
-        f"{question}\n\n"
-        "REQUIRED RESPONSE FORMAT:\n"
-        "Answer: [Your analysis here]"
-    )
-    
-    return prompt
\ No newline at end of file
+    # Complete prompt: role definition, task instructions and fallback behavior
+    # (the static preamble), then the formatted context and the question
+    return _format_prompt(context, question)
+
+class TokenCounter:
+    """
+    Fast token counter for prompt budgeting.
+
+    Without a tokenizer, tokens are estimated from the character count
+    (``chars_per_token``, which ``calibrate`` can fit against real counts, e.g.
+    from Gemini's ``count_tokens``). A real tokenizer can be passed instead.
+    Only the static prompt pieces are memoized (``count_static``), so the
+    preamble is tokenized once while request text is never kept around.
+    """
+
+    def __init__(self, chars_per_token: float = CHARS_PER_TOKEN, tokenizer=None):
+        """
+        Args:
+            chars_per_token (float): Estimator ratio.
+            tokenizer (callable, optional): Function returning the token count of a string.
+        """
+        self.chars_per_token = chars_per_token
+        self._count = tokenizer or self._estimate
+        self._count_static = lru_cache(maxsize=32)(self._count)
+
+    def _estimate(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token + 0.5) if text else 0
+
+    def count(self, text: str) -> int:
+        """Token count of ``text``."""
+        return self._count(text)
+
+    def count_static(self, text: str) -> int:
+        """Memoized token count of a fixed prompt piece (preamble, response format, excerpt frame)."""
+        return self._count_static(text)
+
+    def calibrate(self, texts: list, token_counts: list) -> float:
+        """
+        Fit ``chars_per_token`` to texts with known token counts.
+
+        Returns:
+            float: The new ratio.
+        """
+        self.chars_per_token = sum(len(text) for text in texts) / max(1, sum(token_counts))
+        self._count_static.cache_clear()
+        return self.chars_per_token
+
+def _sentences(text: str) -> list:
+    pieces = []
+    for sentence in _SENTENCE_RE.split(text.strip()):
+        words = sentence.split()
+        for start in range(0, len(words), SENTENCE_WINDOW_WORDS):
+            pieces.append(" ".join(words[start:start + SENTENCE_WINDOW_WORDS]))
+    return pieces
+
+def compress_chunk(chunk: str, question: str, max_tokens: int, counter: TokenCounter) -> str:
+    """
+    Shorten a chunk to its sentences most related to the question.
+
+    Sentences are ranked by how many question words they contain (earlier ones
+    win ties), added while they fit in ``max_tokens`` and put back in their
+    original order.
+
+    Returns:
+        str: The compressed chunk, or "" if not even one sentence fits.
+    """
+    question_words = {w for w in _WORD_RE.findall(question.lower()) if len(w) > 2}
+    sentences = _sentences(chunk)
+    overlap = [len(question_words & set(_WORD_RE.findall(s.lower()))) for s in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: -overlap[i])
+
+    chosen, used = [], 0
+    for i in ranked:
+        cost = counter.count(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            chosen.append(i)
+            used += cost
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+def build_packed_prompt(context_chunks: list, question: str, token_budget: int, keep_full: int = 2,
+                        counter: TokenCounter = None) -> tuple:
+    """
+    Build the prompt within a token budget, filling it with context by relevance.
+
+    ``context_chunks`` must be ordered best first. The first ``keep_full`` chunks
+    are kept whole when they fit; lower-ranked chunks, or top chunks that don't
+    fit, are sentence-compressed to the parts that mention the question; chunks
+    with no room left are dropped.
+
+    Args:
+        context_chunks (list): Retrieved chunk texts, best first.
+        question (str): The user's question.
+        token_budget (int): Maximum prompt tokens (instructions, context and question).
+        keep_full (int): Number of top chunks never compressed if they fit.
+        counter (TokenCounter, optional): Token counter; defaults to the character estimator.
+
+    Returns:
+        tuple[str, dict]: The prompt and a report with ``tokens_before`` (unpacked
+            prompt), ``tokens_after``, ``tokens_saved`` and the number of chunks
+            kept ``full``, ``compressed`` and ``dropped``. Token totals are summed
+            from the per-piece counts, so whole prompts are never re-counted.
+    """
+    counter = counter or _default_counter()
+    # The preamble, response format and excerpt frame are static, so their counts come from the cache
+    fixed = (counter.count_static(PREAMBLE) + counter.count_static(RESPONSE_FORMAT)
+             + counter.count(f"\n\nQUESTION:\n{question}\n\n"))
+    excerpt_overhead = counter.count_static(_format_excerpt(99, "")) + 1
+    remaining = token_budget - fixed
+
+    packed = []
+    report = {"full": 0, "compressed": 0, "dropped": 0}
+    tokens_before = tokens_after = fixed
+    for rank, chunk in enumerate(context_chunks):
+        room = remaining - excerpt_overhead
+        full_cost = counter.count(chunk.strip())
+        tokens_before += full_cost + excerpt_overhead
+        if rank < keep_full and full_cost <= room:
+            text, kind, cost = chunk, "full", full_cost
+        else:
+            text = compress_chunk(chunk, question, room, counter) if room > 0 else ""
+            kind = "full" if text.strip() == chunk.strip() else "compressed"
+            cost = full_cost if kind == "full" else counter.count(text.strip())
+        if not text:
+            report["dropped"] += 1
+            continue
+        packed.append(text)
+        remaining -= cost + excerpt_overhead
+        tokens_after += cost + excerpt_overhead
+        report[kind] += 1
+
+    report["tokens_before"] = tokens_before
+    report["tokens_after"] = tokens_after
+    report["tokens_saved"] = tokens_before - tokens_after
+    return build_prompt(packed, question), report
+
+@lru_cache(maxsize=None)
+def _default_counter() -> TokenCounter:
+    return TokenCounter()
@@ -1,6 +1,9 @@
+import asyncio
 from src.retriever import ComplaintRetriever
-from src.prompt_template import build_prompt
+from src.prompt_template import TokenCounter, build_packed_prompt, build_prompt
 from src.generator import GeminiGenerator
+from src.cache import AnswerCache, chunk_ids, prompt_hash
+from src.reranker import Reranker
 
 class RAGPipeline:
     """
@@ -10,26 +13,127 @@ class RAGPipeline:
     to customer service queries using financial complaint data.
     """
 
-    def __init__(self, index_path: str, metadata_path: str):
+    def __init__(self, index_path: str, metadata_path: str, answer_cache: AnswerCache = None,
+                 reranker: Reranker = None, token_budget: int = None, token_counter: TokenCounter = None,
+                 vectors_path: str = None, model_name: str = "all-MiniLM-L6-v2",
+                 generator: GeminiGenerator = None):
         """
         Initialize the RAG pipeline components.
         
         Args:
             index_path (str): Path to the pre-built vector index for document retrieval
             metadata_path (str): Path to the metadata file containing document information
+            answer_cache (AnswerCache, optional): Cache of generated answers; repeated (or, with a
+                similarity threshold, near-duplicate) questions over the same chunks skip Gemini
+            reranker (Reranker, optional): Post-retrieval stage; retrieval then over-fetches
+                ``reranker.fetch_k`` chunks and the reranker picks the ones sent to Gemini
+            token_budget (int, optional): Maximum prompt tokens; context is packed by relevance,
+                compressing or dropping low-ranked chunks. None sends every chunk in full.
+            token_counter (TokenCounter, optional): Counter used for the budget
+            vectors_path (str, optional): Full-precision vectors for exact reranking when the
+                index is compressed (see ``ComplaintRetriever``)
+            model_name (str): SentenceTransformer used to embed queries
+            generator (GeminiGenerator, optional): Answer generator; defaults to a Gemini client
+                (pass one built on a local stub model to run without the API)
         """
+        self.reranker = reranker
+        self.token_budget = token_budget
+        self.token_counter = token_counter or TokenCounter()
+        # Running totals of prompt packing (requests packed, tokens saved)
+        self.packing_stats = {"requests": 0, "tokens_saved": 0}
+        # Optional answer cache, keyed on retrieved chunk IDs + prompt hash
+        self.answer_cache = answer_cache
+        # Hash of the bare prompt template, so a template change never serves old answers
+        self._template_hash = prompt_hash(build_prompt([], ""))
+
         # Initialize the retriever for fetching relevant complaint documents
-        self.retriever = ComplaintRetriever(index_path, metadata_path)
+        self.retriever = ComplaintRetriever(index_path, metadata_path, model_name=model_name,
+                                            vectors_path=vectors_path)
         
         # Initialize the generator (using Gemini model)
-        self.generator = GeminiGenerator()  # ✅ Using Google's Gemini AI
+        self.generator = generator or GeminiGenerator()  # ✅ Using Google's Gemini AI
+
+    def warm_up(self) -> float:
+        """
+        Warm up the retriever (embedding model and index) before the first query.
+        Gemini is not called, so warming up costs no API quota.
+
+        Returns:
+            float: Seconds taken.
+        """
+        return self.retriever.warm_up()
+
+    def retrieve(self, query: str, filters: dict = None) -> list:
+        """
+        Retrieve context for a query, reranked when a reranker is configured.
+
+        Args:
+            query (str): The user's question or search query
+            filters (dict, optional): Metadata conditions for retrieval
+
+        Returns:
+            list: Retrieved documents, best first
+        """
+        if self.reranker is None:
+            return self.retriever.retrieve(query, filters=filters)
+        docs = self.retriever.retrieve(query, k=self.reranker.fetch_k, filters=filters)
+        return self.reranker.rerank(query, docs)
+
+    def retrieve_batch(self, queries: list, filters: dict = None) -> list:
+        """
+        Batched ``retrieve``: one embedding + search call for all queries, then per-query reranking.
+
+        Args:
+            queries (list): Questions or search queries
+            filters (dict, optional): Metadata conditions applied to every query
+
+        Returns:
+            list: One list of retrieved documents per query
+        """
+        all_docs = self.search_batch(queries, filters)
+        return [self.rerank(query, docs) for query, docs in zip(queries, all_docs)]
+
+    def search_batch(self, queries: list, filters: dict = None) -> list:
+        """
+        The batched half of ``retrieve_batch``: one embedding + search call for all
+        queries, returning the candidates before reranking (``reranker.fetch_k``
+        per query when a reranker is configured).
+
+        Args:
+            queries (list): Questions or search queries
+            filters (dict, optional): Metadata conditions applied to every query
 
-    def run(self, query: str) -> tuple[str, list]:
+        Returns:
+            list: One list of candidate documents per query
+        """
+        if self.reranker is None:
+            return self.retriever.retrieve_batch(queries, filters=filters)
+        return self.retriever.retrieve_batch(queries, k=self.reranker.fetch_k, filters=filters)
+
+    def rerank(self, query: str, docs: list) -> list:
+        """
+        The per-query half of ``retrieve_batch``: rerank one query's candidates
+        (returned unchanged without a reranker).
+
+        Args:
+            query (str): The user's question or search query
+            docs (list): Candidates from ``search_batch``
+
+        Returns:
+            list: Retrieved documents, best first
+        """
+        if self.reranker is None:
+            return docs
+        return self.reranker.rerank(query, docs)
+
+    def run(self, query: str, filters: dict = None) -> tuple[str, list]:
         """
         Execute the complete RAG pipeline for a given query.
         
         Args:
             query (str): The user's question or search query
+            filters (dict, optional): Metadata conditions for retrieval, e.g.
+                ``{"product": "credit card"}`` (see ``ComplaintRetriever.filter_ids``)
             
         Returns:
             tuple[str, list]: A tuple containing:
@@ -42,19 +146,121 @@ class RAGPipeline:
         3. Generation: Produce the final answer
         """
         # STAGE 1: DOCUMENT RETRIEVAL
-        # Retrieve relevant complaint documents from the index
-        docs = self.retriever.retrieve(query)
-        
+        # Retrieve relevant complaint documents from the index (and rerank them)
+        docs = self.retrieve(query, filters=filters)
+
+        return self.answer(query, docs)
+
+    def run_stream(self, query: str, filters: dict = None) -> tuple:
+        """
+        Execute the RAG pipeline, streaming the answer as Gemini produces it.
+
+        Retrieval and prompt construction happen up front, so the sources are
+        available before the first token. A cached answer is yielded in one piece;
+        a freshly generated one is added to the answer cache once fully received.
+
+        Args:
+            query (str): The user's question or search query
+            filters (dict, optional): Metadata conditions for retrieval
+
+        Returns:
+            tuple[Iterator[str], list]: A tuple containing:
+                - An iterator over pieces of the answer text
+                - list: Top 2 context chunks used
+        """
+        docs = self.retrieve(query, filters=filters)
+        chunks, prompt = self._prepare(query, docs)
+        answer, cache_key = self._cached_answer(query, docs, prompt)
+
+        def stream():
+            if answer is not None:
+                yield answer
+                return
+            pieces = []
+            for piece in self.generator.generate_stream(prompt):
+                pieces.append(piece)
+                yield piece
+            self._store_answer(cache_key, prompt, "".join(pieces).strip())
+
+        return stream(), chunks[:2]
+
+    def answer(self, query: str, docs: list) -> tuple[str, list]:
+        """
+        Run prompt construction and generation on already retrieved documents.
+
+        Lets callers retrieve for many queries at once (``retriever.retrieve_batch``)
+        and then answer each one.
+
+        Args:
+            query (str): The user's question or search query
+            docs (list): Retrieved documents (metadata dicts or plain strings)
+
+        Returns:
+            tuple[str, list]: The generated answer and the top 2 context chunks
+        """
+        chunks, prompt = self._prepare(query, docs)
+
+        # STAGE 3: RESPONSE GENERATION
+        # Reuse a cached answer when the same (or a near-identical) question was
+        # answered over the same chunks; otherwise generate with Gemini
+        answer, cache_key = self._cached_answer(query, docs, prompt)
+        if answer is None:
+            answer = self.generator.generate(prompt)
+            self._store_answer(cache_key, prompt, answer)
+
+        # Return both the answer and top 2 chunks for transparency and evaluation
+        return answer, chunks[:2]
+
+    async def aanswer(self, query: str, docs: list) -> tuple[str, list]:
+        """
+        Async version of ``answer``; generation goes through ``generator.agenerate``
+        so many questions can be in flight at once.
+
+        Args:
+            query (str): The user's question or search query
+            docs (list): Retrieved documents (metadata dicts or plain strings)
+
+        Returns:
+            tuple[str, list]: The generated answer and the top 2 context chunks
+        """
+        chunks, prompt = self._prepare(query, docs)
+
+        # The semantic cache embeds the query (a model forward pass) and the cache
+        # reads and writes SQLite: keep both off the event loop so in-flight
+        # generations don't stall
+        answer, cache_key = await asyncio.to_thread(self._cached_answer, query, docs, prompt)
+        if answer is None:
+            answer = await self.generator.agenerate(prompt)
+            await asyncio.to_thread(self._store_answer, cache_key, prompt, answer)
+
+        return answer, chunks[:2]
+
+    def _prepare(self, query: str, docs: list) -> tuple[list, str]:
         # Extract text content from documents (handling both dict and string formats)
         chunks = [doc['text'] if isinstance(doc, dict) else doc for doc in docs]
 
         # STAGE 2: PROMPT ENGINEERING
         # Build a structured prompt incorporating the retrieved context
-        prompt = build_prompt(chunks, query)
+        if self.token_budget is None:
+            return chunks, build_prompt(chunks, query)
 
-        # STAGE 3: RESPONSE GENERATION
-        # Generate the final answer using Gemini
-        answer = self.generator.generate(prompt)
+        # Fit the context into the token budget, best chunks first
+        prompt, report = build_packed_prompt(chunks, query, self.token_budget, counter=self.token_counter)
+        self.packing_stats["requests"] += 1
+        self.packing_stats["tokens_saved"] += report["tokens_saved"]
+        print(f"✂️ Prompt packed to {report['tokens_after']} tokens (saved {report['tokens_saved']}; "
+              f"{report['full']} full, {report['compressed']} compressed, {report['dropped']} dropped chunks)")
+        return chunks, prompt
 
-        # Return both the answer and top 2 chunks for transparency and evaluation
-        return answer, chunks[:2]
\ No newline at end of file
+    def _cached_answer(self, query: str, docs: list, prompt: str) -> tuple:
+        # Returns (cached answer or None, key to store a fresh answer under)
+        if self.answer_cache is None:
+            return None, None
+        ids = chunk_ids(docs)
+        query_vec = self.retriever.embed_query(query) if self.answer_cache.similarity_threshold else None
+        return self.answer_cache.lookup(ids, prompt, self._template_hash, query_vec), (ids, query_vec)
+
+    def _store_answer(self, cache_key: tuple, prompt: str, answer: str) -> None:
+        if cache_key is not None:
+            ids, query_vec = cache_key
+            self.answer_cache.store(ids, prompt, self._template_hash, answer, query_vec)
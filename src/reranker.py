@@ -0,0 +1,155 @@
+import time
+from functools import lru_cache
+import numpy as np
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = text.lower().split()
+    if len(words) < size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+@lru_cache(maxsize=None)
+def _load_cross_encoder(model_name: str):
+    # Imported here: only needed when cross-encoder reranking is enabled
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device="cpu")
+
+class Reranker:
+    """
+    Post-retrieval stage between the retriever and prompt building.
+
+    Takes an over-fetched candidate list and, in order:
+        1. keeps at most ``max_per_complaint`` chunks per ``complaint_id``
+           (overlapping chunks of one narrative say the same thing);
+        2. drops near-duplicate texts (word 3-shingle Jaccard >= ``duplicate_threshold``);
+        3. optionally rescores candidates with a small CPU cross-encoder;
+        4. picks ``top_k`` with maximal marginal relevance (MMR), trading
+           relevance against similarity to the chunks already picked.
+
+    Steps 3-4 run against a deadline of ``time_budget`` seconds: the cross-encoder
+    scores candidates best-first in small batches and stops when the budget is
+    spent, and if even that leaves no time, the remaining candidates are taken in
+    retrieval order. The stage therefore never adds much more than the budget to a
+    request.
+    """
+
+    def __init__(self, top_k: int = 5, fetch_k: int = 20, max_per_complaint: int = 1,
+                 duplicate_threshold: float = 0.8, mmr_lambda: float = 0.7, cross_encoder=None,
+                 cross_encoder_batch: int = 8, time_budget: float = 0.15):
+        """
+        Args:
+            top_k (int): Chunks returned.
+            fetch_k (int): Candidates the caller should retrieve (over-fetch).
+            max_per_complaint (int): Chunks kept per complaint ID. None disables this step.
+            duplicate_threshold (float): Shingle Jaccard similarity above which a chunk
+                counts as a near-duplicate of a better-ranked one.
+            mmr_lambda (float): 1.0 ranks by relevance only, lower values favour diversity.
+            cross_encoder (str or object, optional): CrossEncoder model name (e.g.
+                "cross-encoder/ms-marco-MiniLM-L-6-v2") or any object with
+                ``predict(pairs)``. None disables cross-encoder scoring.
+            cross_encoder_batch (int): Pairs scored per cross-encoder call.
+            time_budget (float): Seconds the stage may spend per query.
+        """
+        self.top_k = top_k
+        self.fetch_k = fetch_k
+        self.max_per_complaint = max_per_complaint
+        self.duplicate_threshold = duplicate_threshold
+        self.mmr_lambda = mmr_lambda
+        self.cross_encoder = cross_encoder
+        self.cross_encoder_batch = cross_encoder_batch
+        self.time_budget = time_budget
+
+    def _model(self):
+        if isinstance(self.cross_encoder, str):
+            return _load_cross_encoder(self.cross_encoder)
+        return self.cross_encoder
+
+    def _dedupe(self, docs: list, texts: list) -> tuple:
+        # Indices of docs kept, in rank order, and their shingle sets
+        per_complaint = {}
+        kept, kept_shingles = [], []
+        for i, doc in enumerate(docs):
+            cid = doc.get("complaint_id") if isinstance(doc, dict) else None
+            if self.max_per_complaint is not None and cid is not None:
+                if per_complaint.get(cid, 0) >= self.max_per_complaint:
+                    continue
+            shingles = _shingles(texts[i])
+            if any(_jaccard(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            if cid is not None:
+                per_complaint[cid] = per_complaint.get(cid, 0) + 1
+            kept.append(i)
+            kept_shingles.append(shingles)
+        return kept, kept_shingles
+
+    def _cross_encode(self, query: str, texts: list, deadline: float) -> np.ndarray:
+        # Scores best-first until the deadline; unscored candidates stay NaN
+        model = self._model()
+        scores = np.full(len(texts), np.nan)
+        for start in range(0, len(texts), self.cross_encoder_batch):
+            if time.perf_counter() >= deadline:
+                break
+            batch = texts[start:start + self.cross_encoder_batch]
+            scores[start:start + len(batch)] = np.asarray(model.predict([(query, text) for text in batch]), dtype=float)
+        return scores
+
+    def _mmr(self, relevance: np.ndarray, shingles: list, deadline: float) -> list:
+        selected = []
+        remaining = list(range(len(relevance)))
+        max_sim = np.zeros(len(relevance))
+        while remaining and len(selected) < self.top_k:
+            if time.perf_counter() >= deadline:
+                # Out of time: fill up in current order
+                selected.extend(remaining[:self.top_k - len(selected)])
+                break
+            scores = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * max_sim[remaining]
+            best = remaining.pop(int(np.argmax(scores)))
+            selected.append(best)
+            for i in remaining:
+                max_sim[i] = max(max_sim[i], _jaccard(shingles[i], shingles[best]))
+        return selected
+
+    def rerank(self, query: str, docs: list) -> list:
+        """
+        Rerank retrieved documents.
+
+        Args:
+            query (str): The user's question.
+            docs (list): Retrieved documents (metadata dicts or plain strings), best first.
+
+        Returns:
+            list: At most ``top_k`` documents.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        texts = [doc["text"] if isinstance(doc, dict) else doc for doc in docs]
+
+        kept, shingles = self._dedupe(docs, texts)
+        docs = [docs[i] for i in kept]
+        texts = [texts[i] for i in kept]
+        if len(docs) <= 1:
+            return docs[:self.top_k]
+
+        # Relevance in [0, 1]: retrieval rank, or cross-encoder scores where available
+        relevance = 1.0 - np.arange(len(docs)) / len(docs)
+        if self.cross_encoder is not None:
+            scores = self._cross_encode(query, texts, deadline)
+            scored = ~np.isnan(scores)
+            if scored.any():
+                low, high = scores[scored].min(), scores[scored].max()
+                normalized = (scores[scored] - low) / (high - low) if high > low else np.ones(scored.sum())
+                # Cross-encoded candidates rank above the ones it had no time for
+                relevance = np.where(scored, 1.0, 0.0)
+                relevance[scored] += normalized
+                relevance[~scored] = 1.0 - np.arange((~scored).sum()) / len(docs)
+                order = np.argsort(-relevance, kind="stable")
+                docs = [docs[i] for i in order]
+                shingles = [shingles[i] for i in order]
+                relevance = relevance[order] / relevance.max()
+
+        selected = self._mmr(relevance, shingles, deadline)
+        return [docs[i] for i in selected]
@@ -1,6 +1,65 @@
+import os
+import threading
+import time
+import numpy as np
 import faiss  # Facebook's vector similarity search library
 import pickle  # For serializing/deserializing Python objects
 from sentence_transformers import SentenceTransformer  # For text embedding generation
+from src.metadata_store import MetadataStore, match_condition  # Memory-mapped columnar metadata
+from src.cache import TTLCache, file_version, normalize_query  # Query/result caching
+from src.lexical_index import LexicalIndex, reciprocal_rank_fusion  # BM25 + rank fusion
+from src.sharded_index import ShardedIndex, selector_params  # Fan-out search over index shards
+
+# dense: FAISS only; lexical: BM25 only; hybrid: both, merged with reciprocal-rank fusion
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+# In hybrid mode each retriever contributes max(k * HYBRID_FETCH_FACTOR, HYBRID_MIN_FETCH) candidates
+HYBRID_FETCH_FACTOR = 4
+HYBRID_MIN_FETCH = 20
+# With exact reranking, a compressed index returns k * RERANK_FACTOR candidates per query
+RERANK_FACTOR = 4
+# Index types storing lossy codes, whose distances exact reranking actually changes
+COMPRESSED_INDEX_TYPES = ("sq_fp16", "sq8", "pq", "ivf_pq")
+
+def filters_key(filters: dict) -> str:
+    """Canonical, order-independent string form of a filter dict, for cache and grouping keys."""
+    def canonical(condition):
+        if isinstance(condition, (list, set, frozenset)):
+            return sorted(condition, key=repr)
+        return condition
+    return repr(sorted((field, canonical(condition)) for field, condition in filters.items()))
+
+def is_compressed(index) -> bool:
+    """True if ``index`` stores lossy codes instead of the float32 vectors themselves."""
+    if isinstance(index, ShardedIndex):
+        return index.index_type in COMPRESSED_INDEX_TYPES
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return not isinstance(index, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+def exact_rerank(vectors, query: np.ndarray, ids: np.ndarray, k: int) -> tuple:
+    """
+    Re-sort candidate row IDs by exact squared L2 distance to the query.
+
+    Args:
+        vectors (np.ndarray): Full-precision embeddings by row ID, typically the
+            memory-mapped ``vectors.npy`` written by the embedding pipeline.
+        query (np.ndarray): Query embedding.
+        ids (np.ndarray): Candidate row IDs from a compressed index.
+        k (int): Number of results kept.
+
+    Returns:
+        tuple: (ids, float32 distances) of the k closest candidates, best first.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return ids, np.zeros(0, dtype=np.float32)
+    # Read rows in ascending order so a memory map is scanned forward
+    order = np.argsort(ids)
+    rows = np.asarray(vectors[ids[order]], dtype=np.float32)
+    distances = np.empty(len(ids), dtype=np.float32)
+    distances[order] = ((rows - np.asarray(query, dtype=np.float32)) ** 2).sum(axis=1)
+    top = np.argsort(distances, kind="stable")[:k]
+    return ids[top], distances[top]
 
 class ComplaintRetriever:
     """
@@ -10,55 +69,345 @@ class ComplaintRetriever:
     Designed to work with pre-processed complaint data and metadata.
     """
 
-    def __init__(self, index_path: str, metadata_path: str, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, index_path: str, metadata_path: str, model_name: str = "all-MiniLM-L6-v2",
+                 nprobe: int = None, ef_search: int = None, cache_size: int = 1024,
+                 cache_ttl: float = 3600.0, cache_path: str = None, lexical_path: str = None,
+                 mode: str = "dense", vectors_path: str = None, rerank_factor: int = RERANK_FACTOR,
+                 shard_executor: str = "thread"):
         """
         Initialize the retriever with search index and embedding model.
         
         Args:
-            index_path (str): Path to the FAISS index file
-            metadata_path (str): Path to the pickled metadata file
+            index_path (str): Path to the FAISS index file, or to a shard directory written
+                            by ``build_sharded_index`` (searched shard-parallel, results merged)
+            metadata_path (str): Path to the pickled metadata file, or to a columnar
+                            metadata store directory (memory-mapped, shared across processes)
             model_name (str): Name of the SentenceTransformer model to use. 
                             Defaults to "all-MiniLM-L6-v2" (good balance of speed/accuracy)
+            nprobe (int, optional): IVF cells visited per query (IVF indexes only)
+            ef_search (int, optional): HNSW search depth (HNSW indexes only)
+            cache_size (int): Entries kept in each in-memory cache (query embeddings, results)
+            cache_ttl (float): Seconds a cached embedding or result stays valid
+            cache_path (str, optional): SQLite file for a cache tier that survives restarts
+            lexical_path (str, optional): BM25 index directory built by the embedding pipeline;
+                            needed for the "lexical" and "hybrid" modes
+            mode (str): Default retrieval mode, one of ``RETRIEVAL_MODES``
+            vectors_path (str, optional): Full-precision ``vectors.npy`` matching the index rows.
+                            When given, a compressed index (sq_fp16, sq8, pq, ivf_pq) only
+                            proposes ``k * rerank_factor`` candidates, which are re-sorted
+                            by exact distance from the memory-mapped vectors. Row i of the
+                            file must be index row i, so an incremental (ID-mapped) index
+                            is rejected; other index types ignore the vectors
+            rerank_factor (int): Candidates fetched per result when reranking
+            shard_executor (str): "thread" or "process" fan-out for a sharded index
         
         Initializes:
             - Text embedding model
             - FAISS search index
             - Complaint metadata
+            - Query embedding and retrieval result caches
         """
-        # Initialize the sentence embedding model
+        # Caches: normalized query -> embedding, and (index version, query, k, ...) -> result IDs.
+        # Result keys include the index version, so a rebuilt index never serves stale results.
+        self.model_name = model_name
+        self.index_version = file_version(index_path, metadata_path)
+        self.embedding_cache = TTLCache(cache_size, cache_ttl, cache_path, namespace="query_embeddings")
+        self.result_cache = TTLCache(cache_size, cache_ttl, cache_path, namespace="retrieval_results")
+        self._search_params = {}
+        # Filter -> allowed row IDs, so repeated filters don't rescan the metadata
+        self._filter_cache = TTLCache(maxsize=64, ttl=None, namespace="filters")
+        self._filter_fields = None
+
+        # Optional lexical index for exact-term matches (account numbers, fee names, merchants)
+        self.lexical = LexicalIndex(lexical_path) if lexical_path else None
+        self.mode = self._check_mode(mode)
+
+        # Initialize the sentence embedding model; encode calls from different threads
+        # (e.g. retrieval and the answer cache) take turns instead of running at once
         self.model = SentenceTransformer(model_name)
+        self._encode_lock = threading.Lock()
         
         # Load the FAISS index for efficient similarity search
-        self.index = faiss.read_index(index_path)
+        if os.path.isdir(index_path):
+            self.index = ShardedIndex(index_path, executor=shard_executor)
+        else:
+            self.index = faiss.read_index(index_path)
         
-        # Load the complaint metadata containing original text and additional information
-        with open(metadata_path, "rb") as f:
-            self.metadata = pickle.load(f)
+        # Apply search-time speed/recall knobs for approximate indexes
+        self.set_search_params(nprobe=nprobe, ef_search=ef_search)
+
+        # Optional full-precision vectors for exact reranking; memory-mapped, so
+        # only the candidate rows are paged in
+        self.vectors = np.load(vectors_path, mmap_mode="r") if vectors_path else None
+        self.rerank_factor = rerank_factor
+        if self.vectors is not None:
+            self._check_vectors(vectors_path)
+            if not is_compressed(self.index):
+                # The index already holds the exact vectors: reranking would reproduce its distances
+                self.vectors = None
+
+        # Load the complaint metadata containing original text and additional information.
+        # A store directory is memory-mapped and rows are decoded only when returned.
+        if os.path.isdir(metadata_path):
+            self.metadata = MetadataStore(metadata_path)
+        else:
+            with open(metadata_path, "rb") as f:
+                self.metadata = pickle.load(f)
+
+    def _check_vectors(self, vectors_path: str) -> None:
+        # exact_rerank reads vectors[row ID], so rows must line up with the index
+        if hasattr(self.index, "id_map"):
+            raise ValueError(f"{vectors_path} can't be used with an ID-mapped (incremental) index: "
+                             "its row IDs don't match the rows of the vectors file")
+        if self.vectors.shape[1] != self.index.d:
+            raise ValueError(f"{vectors_path} has dimension {self.vectors.shape[1]}, the index {self.index.d}")
+        if len(self.vectors) != self.index.ntotal:
+            raise ValueError(f"{vectors_path} has {len(self.vectors)} rows, the index {self.index.ntotal}")
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None) -> None:
+        """
+        Tune the speed/recall trade-off of an approximate index.
+
+        Args:
+            nprobe (int, optional): IVF cells visited per query. Higher is slower and more accurate.
+            ef_search (int, optional): HNSW candidate list size. Higher is slower and more accurate.
+        """
+        params = {"nprobe": nprobe, "efSearch": ef_search}
+        for name, value in params.items():
+            if value is None:
+                continue
+            try:
+                if isinstance(self.index, ShardedIndex):
+                    self.index.set_parameter(name, value)
+                else:
+                    faiss.ParameterSpace().set_index_parameter(self.index, name, value)
+                self._search_params[name] = value
+            except RuntimeError:
+                print(f"⚠️ {name} does not apply to this index type; ignored.")
+
+    def _check_mode(self, mode: str) -> str:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {RETRIEVAL_MODES}")
+        if mode != "dense" and self.lexical is None:
+            raise ValueError(f"Retrieval mode {mode!r} needs a lexical index (lexical_path)")
+        return mode
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the query embedding and retrieval result caches."""
+        return {"embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()}
+
+    def warm_up(self) -> float:
+        """
+        Run one uncached encode + search so the first real query doesn't pay for
+        lazy model initialization and cold index pages.
+
+        Returns:
+            float: Seconds taken.
+        """
+        start = time.perf_counter()
+        vector = np.asarray(self.model.encode(["warm up"]), dtype=np.float32)
+        if self.index.ntotal:
+            self.index.search(vector, 1)
+        return time.perf_counter() - start
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding of a query, as used for search (served from the embedding cache when possible)."""
+        return self._embed([query])[0]
+
+    def _embed(self, queries: list) -> np.ndarray:
+        """
+        Embed queries, encoding only those missing from the cache (in one call).
+
+        The normalized query is both the cache key and the text encoded, so a
+        cached embedding is exactly what encoding the query would return.
+        """
+        normalized = [normalize_query(q) for q in queries]
+        keys = [f"{self.model_name}\x1f{q}" for q in normalized]
+        vectors = [self.embedding_cache.get(key) for key in keys]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            with self._encode_lock:
+                encoded = np.asarray(self.model.encode([normalized[i] for i in missing]), dtype=np.float32)
+            for i, vec in zip(missing, encoded):
+                vectors[i] = vec
+                self.embedding_cache.set(keys[i], vec)
+        return np.vstack(vectors)
+
+    @property
+    def filter_fields(self) -> set:
+        """Metadata fields that ``filters`` can refer to."""
+        if self._filter_fields is None:
+            if isinstance(self.metadata, MetadataStore):
+                self._filter_fields = set(self.metadata.columns)
+            else:
+                fields = set()
+                for record in self.metadata:
+                    if record is not None:
+                        fields.update(record)
+                fields.discard("text")
+                self._filter_fields = fields
+        return self._filter_fields
 
-    def retrieve(self, query: str, k: int = 5) -> list:
+    def filter_ids(self, filters: dict) -> np.ndarray:
+        """
+        Row IDs whose metadata matches every filter.
+
+        Args:
+            filters (dict): Metadata field -> condition. A scalar matches by equality,
+                a list/set by membership and a ``(low, high)`` tuple is an inclusive
+                range, e.g. ``{"product": "credit card", "date_received": ("2024-01-01", None)}``.
+
+        Returns:
+            np.ndarray: Sorted int64 row IDs.
+        """
+        key = filters_key(filters)
+        ids = self._filter_cache.get(key)
+        if ids is None:
+            if isinstance(self.metadata, MetadataStore):
+                ids = self.metadata.filter_ids(filters)
+            else:
+                mask = np.array([record is not None for record in self.metadata], dtype=bool)
+                for field, condition in filters.items():
+                    values = [record.get(field) if record is not None else None for record in self.metadata]
+                    mask &= match_condition(values, condition)
+                ids = np.flatnonzero(mask).astype(np.int64)
+            self._filter_cache.set(key, ids)
+        return ids
+
+    def _filtered_params(self, ids: np.ndarray):
+        """FAISS search parameters restricting results to ``ids``, keeping the index's nprobe/efSearch."""
+        return selector_params(self.index, ids)
+
+    def _search(self, queries: list, k: int, filters: dict = None) -> list:
+        """
+        Nearest-neighbour search with result caching.
+
+        With ``filters``, the matching row IDs are passed to FAISS as an ID
+        selector, so non-matching vectors are skipped inside the search rather
+        than over-fetched and dropped afterwards. With full-precision vectors
+        loaded, the index is over-fetched by ``rerank_factor`` and the candidates
+        are re-sorted with ``exact_rerank``.
+
+        Returns:
+            list: One (ids, distances) pair per query
+        """
+        normalized = [normalize_query(q) for q in queries]
+        params = ",".join(f"{name}={value}" for name, value in sorted(self._search_params.items()))
+        scope = filters_key(filters) if filters else ""
+        fetch = k
+        if self.vectors is not None:
+            fetch = k * self.rerank_factor
+            params += f",rerank={self.rerank_factor}"
+        keys = [f"{self.index_version}\x1f{params}\x1f{k}\x1f{scope}\x1f{q}" for q in normalized]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            vectors = self._embed([queries[i] for i in missing])
+            if filters:
+                allowed = self.filter_ids(filters)
+                if len(allowed) and isinstance(self.index, ShardedIndex):
+                    # Each shard maps the IDs to its own rows; product shards are skipped by the filter
+                    D, I = self.index.search(vectors, fetch, allowed=allowed, filters=filters)
+                elif len(allowed):
+                    D, I = self.index.search(vectors, fetch, params=self._filtered_params(allowed))
+                else:
+                    D = np.zeros((len(missing), 0), dtype=np.float32)
+                    I = np.zeros((len(missing), 0), dtype=np.int64)
+            else:
+                D, I = self.index.search(vectors, fetch)
+            for i, vector, distances, ids in zip(missing, vectors, D, I):
+                # FAISS pads with -1 when the index holds fewer than k vectors
+                keep = ids >= 0
+                ids, distances = ids[keep], distances[keep]
+                if self.vectors is not None:
+                    ids, distances = exact_rerank(self.vectors, vector, ids, k)
+                results[i] = (ids.tolist(), distances.tolist())
+                self.result_cache.set(keys[i], results[i])
+        return results
+
+    def _lexical_search(self, queries: list, k: int, filters: dict = None) -> list:
+        """BM25 search with result caching; returns one (ids, scores) pair per query."""
+        allowed = self.filter_ids(filters) if filters else None
+        scope = filters_key(filters) if filters else ""
+        results = []
+        for query in queries:
+            key = f"lexical\x1f{self.index_version}\x1f{k}\x1f{scope}\x1f{normalize_query(query)}"
+            result = self.result_cache.get(key)
+            if result is None:
+                ids, scores = self.lexical.search(query, k, allowed=allowed)
+                result = (ids.tolist(), scores.tolist())
+                self.result_cache.set(key, result)
+            results.append(result)
+        return results
+
+    def _ranked(self, queries: list, k: int, filters: dict, mode: str) -> list:
+        """One (ids, scores) pair per query for the given retrieval mode."""
+        mode = self._check_mode(mode or self.mode)
+        if mode == "dense":
+            return self._search(queries, k, filters)
+        if mode == "lexical":
+            return self._lexical_search(queries, k, filters)
+
+        fetch = max(k * HYBRID_FETCH_FACTOR, HYBRID_MIN_FETCH)
+        dense = self._search(queries, fetch, filters)
+        lexical = self._lexical_search(queries, fetch, filters)
+        return [reciprocal_rank_fusion([d[0], l[0]], k=k) for d, l in zip(dense, lexical)]
+
+    def retrieve(self, query: str, k: int = 5, filters: dict = None, mode: str = None) -> list:
         """
         Retrieve the most relevant complaints for a given query.
         
         Args:
             query (str): The search query (e.g., customer question or complaint topic)
             k (int): Number of results to return. Defaults to 5.
+            filters (dict, optional): Metadata conditions results must match, e.g.
+                ``{"product": "credit card", "date_received": ("2024-01-01", "2024-12-31")}``
+                (see ``filter_ids``)
+            mode (str, optional): "dense", "lexical" or "hybrid"; defaults to the retriever's mode
             
         Returns:
             list: List of relevant complaint documents/metadata, ordered by relevance
             
         Process Flow:
-        1. Encode query into embedding vector
-        2. Search FAISS index for nearest neighbors
+        1. Encode query into embedding vector (skipped on an embedding cache hit)
+        2. Search FAISS index for nearest neighbors (skipped on a result cache hit)
         3. Retrieve corresponding metadata for results
         """
-        # Step 1: Convert query to embedding vector
-        query_vec = self.model.encode([query])  # Returns numpy array
-        
-        # Step 2: Search FAISS index for similar vectors
-        # Returns:
-        # - D: Distances to nearest neighbors
-        # - I: Indices of nearest neighbors
-        _, I = self.index.search(query_vec, k)
-        
+        # Steps 1-2: Embed the query and search FAISS and/or BM25 (cached by normalized query)
+        ids, _ = self._ranked([query], k, filters, mode)[0]
+
         # Step 3: Map indices back to original complaint metadata
-        return [self.metadata[i] for i in I[0]]  # I[0] because we only searched one query
\ No newline at end of file
+        return [self.metadata[i] for i in ids]
+
+    def retrieve_batch(self, queries: list, k: int = 5, filters: dict = None, mode: str = None) -> list:
+        """
+        Retrieve the most relevant complaints for many queries at once.
+
+        All uncached queries are embedded in one ``encode`` call and searched with a
+        single FAISS call over the query matrix, instead of one round trip per query.
+
+        Args:
+            queries (list): Search queries
+            k (int): Number of results per query. Defaults to 5.
+            filters (dict, optional): Metadata conditions applied to every query (see ``filter_ids``)
+            mode (str, optional): "dense", "lexical" or "hybrid"; defaults to the retriever's mode
+
+        Returns:
+            list: One list per query of metadata dicts, ordered by relevance, each
+                  with an extra "distance" key (squared L2 distance to the query) in
+                  dense mode, or "score" (BM25 or fused RRF score) otherwise
+        """
+        if not queries:
+            return []
+
+        # Steps 1-2: Embed the uncached queries in one forward pass and run one
+        # FAISS search over the query matrix
+        mode = mode or self.mode
+        results = self._ranked(list(queries), k, filters, mode)
+        field = "distance" if mode == "dense" else "score"
+
+        # Step 3: Map each row of results back to metadata
+        return [
+            [{**self.metadata[i], field: float(v)} for i, v in zip(ids, values)]
+            for ids, values in results
+        ]
@@ -0,0 +1,300 @@
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from flask import Flask, jsonify, request
+from werkzeug.exceptions import HTTPException
+from src.retriever import filters_key
+
+# Requests arriving within this window of the first one share one embedding + search call
+BATCH_WINDOW = 0.005
+MAX_BATCH_SIZE = 64
+# Retrieval requests waiting for a batch before new ones are turned away (HTTP 503)
+MAX_QUEUED = 1024
+# Gemini calls in flight at once, and how long a request may wait for a free slot
+MAX_GENERATIONS = 8
+GENERATION_WAIT = 2.0
+# Upper bound on one retrieval batch, so a stuck batch fails requests instead of hanging them
+RETRIEVAL_TIMEOUT = 30.0
+
+class Overloaded(Exception):
+    """Raised when the service has no capacity left for a request."""
+
+class InvalidRequest(Exception):
+    """Raised for a malformed request body or filter (HTTP 400)."""
+
+class RetrievalTimeout(Exception):
+    """Raised when a retrieval batch doesn't finish within ``RETRIEVAL_TIMEOUT`` (HTTP 504)."""
+
+class MicroBatcher:
+    """
+    Collects concurrent retrieval requests into batched calls.
+
+    A background thread takes the first waiting request, keeps collecting for
+    ``window`` seconds (or until ``max_batch`` requests), and hands each group
+    of requests with the same filters to ``handler`` in one call, so N
+    concurrent queries cost one ``encode`` and one FAISS search instead of N.
+    Per-query work (reranking) belongs on the request threads, so one slow
+    query doesn't hold up the next batch.
+    """
+
+    def __init__(self, handler, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH_SIZE,
+                 max_queued: int = MAX_QUEUED):
+        """
+        Args:
+            handler (callable): ``handler(queries, filters)`` returning one result per query,
+                e.g. ``RAGPipeline.search_batch``.
+            window (float): Seconds to wait for more requests after the first one.
+            max_batch (int): Requests per batch.
+            max_queued (int): Waiting requests before ``submit`` raises ``Overloaded``.
+        """
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "calls": 0}
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str, filters: dict = None) -> Future:
+        """
+        Queue one query.
+
+        Returns:
+            Future: Resolves to the handler's result for this query.
+
+        Raises:
+            Overloaded: If ``max_queued`` requests are already waiting.
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((query, filters, future))
+        except queue.Full:
+            raise Overloaded("Too many queued retrieval requests") from None
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            # Filters are part of the search, so only requests with equal filters share a call
+            groups = {}
+            for query, filters, future in batch:
+                groups.setdefault(filters_key(filters) if filters else "", []).append((query, filters, future))
+            for items in groups.values():
+                self._run(items)
+            if batch:
+                with self._stats_lock:
+                    self._stats["requests"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._stats["calls"] += len(groups)
+            if stop:
+                break
+
+    def _run(self, items: list) -> None:
+        try:
+            results = self.handler([query for query, _, _ in items], items[0][1])
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        for (_, _, future), result in zip(items, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """Requests, batches and handler calls so far, and the mean batch size."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Stop the batching thread after the requests already queued."""
+        self._queue.put(None)
+        self._thread.join()
+
+def _parse_filters(filters, fields: set):
+    # JSON has no tuples: {"min": a, "max": b} stands for the (a, b) range condition
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise InvalidRequest("filters must be an object")
+    unknown = sorted(set(filters) - fields)
+    if unknown:
+        raise InvalidRequest(f"Unknown filter field(s): {', '.join(unknown)}; expected one of {sorted(fields)}")
+    parsed = {}
+    for field, condition in filters.items():
+        if isinstance(condition, dict):
+            condition = (condition.get("min"), condition.get("max"))
+        parsed[field] = condition
+    return parsed
+
+def _json_safe(doc):
+    # Metadata may hold NumPy scalars (e.g. int64 complaint IDs)
+    if isinstance(doc, dict):
+        return {key: value.item() if hasattr(value, "item") else value for key, value in doc.items()}
+    return doc
+
+def create_app(pipeline, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH_SIZE,
+               max_queued: int = MAX_QUEUED, max_generations: int = MAX_GENERATIONS,
+               generation_wait: float = GENERATION_WAIT) -> Flask:
+    """
+    HTTP API over a ``RAGPipeline``.
+
+    Endpoints:
+        - ``POST /retrieve`` ``{"query": ..., "filters": {...}}``: retrieved chunks
+        - ``POST /answer`` (same body): generated answer and its sources
+        - ``GET /health``: batching, generation and cache counters
+
+    The embedding + search step of concurrent requests is micro-batched
+    (``MicroBatcher`` over ``pipeline.search_batch``); each request then
+    reranks its own candidates. Generation runs on the request thread, at most ``max_generations`` at a
+    time; a request that can't get a slot within ``generation_wait`` seconds,
+    or arrives while ``max_queued`` retrievals are waiting, gets HTTP 503
+    with ``Retry-After`` instead of piling up. Errors are returned as JSON
+    ``{"error": ...}``: 400 for an invalid body or filter (e.g. an unknown
+    filter field), 504 when retrieval exceeds ``RETRIEVAL_TIMEOUT`` and 500
+    for anything else.
+
+    Filters use the retriever's conditions; a ``{"min": a, "max": b}`` object
+    is an inclusive range.
+
+    Args:
+        pipeline (RAGPipeline): Loaded pipeline.
+        window (float): Micro-batching window in seconds.
+        max_batch (int): Retrieval requests per batch.
+        max_queued (int): Retrieval requests waiting before new ones are rejected.
+        max_generations (int): Concurrent generations.
+        generation_wait (float): Seconds a request may wait for a generation slot.
+
+    Returns:
+        Flask: The application; ``app.batcher`` is its ``MicroBatcher``.
+    """
+    app = Flask(__name__)
+    batcher = MicroBatcher(pipeline.search_batch, window=window, max_batch=max_batch, max_queued=max_queued)
+    filter_fields = set(pipeline.retriever.filter_fields)
+    generation_slots = threading.BoundedSemaphore(max_generations)
+    counters = {"generations": 0, "rejected": 0}
+    counters_lock = threading.Lock()
+    app.batcher = batcher
+
+    def count(name: str) -> None:
+        with counters_lock:
+            counters[name] += 1
+
+    def overloaded(message: str):
+        count("rejected")
+        response = jsonify({"error": message})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+
+    def parse_body() -> tuple:
+        body = request.get_json(silent=True) or {}
+        query = body.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise InvalidRequest("query must be a non-empty string")
+        return query, _parse_filters(body.get("filters"), filter_fields)
+
+    def retrieve(query: str, filters: dict) -> list:
+        try:
+            candidates = batcher.submit(query, filters).result(timeout=RETRIEVAL_TIMEOUT)
+        except FutureTimeout:
+            raise RetrievalTimeout(f"Retrieval took longer than {RETRIEVAL_TIMEOUT:g}s") from None
+        # Reranking is per query, so it runs here rather than on the batching thread
+        return pipeline.rerank(query, candidates)
+
+    @app.errorhandler(InvalidRequest)
+    def bad_request(e):
+        return jsonify({"error": str(e)}), 400
+
+    @app.errorhandler(RetrievalTimeout)
+    def timed_out(e):
+        return jsonify({"error": str(e)}), 504
+
+    @app.errorhandler(Exception)
+    def internal_error(e):
+        # Routing errors (404, 405) keep their own status
+        if isinstance(e, HTTPException):
+            return e
+        app.logger.exception("Request failed")
+        return jsonify({"error": f"{type(e).__name__}: {e}"}), 500
+
+    @app.errorhandler(Overloaded)
+    def busy(e):
+        return overloaded(str(e))
+
+    @app.post("/retrieve")
+    def retrieve_endpoint():
+        query, filters = parse_body()
+        start = time.perf_counter()
+        docs = retrieve(query, filters)
+        return jsonify({"results": [_json_safe(doc) for doc in docs],
+                        "retrieval_time": time.perf_counter() - start})
+
+    @app.post("/answer")
+    def answer_endpoint():
+        query, filters = parse_body()
+        start = time.perf_counter()
+        docs = retrieve(query, filters)
+        retrieval_time = time.perf_counter() - start
+
+        # Backpressure: wait briefly for a generation slot, then shed load
+        if not generation_slots.acquire(timeout=generation_wait):
+            return overloaded("Too many answers being generated")
+        try:
+            count("generations")
+            answer, sources = pipeline.answer(query, docs)
+        finally:
+            generation_slots.release()
+        return jsonify({"answer": answer, "sources": sources, "retrieval_time": retrieval_time,
+                        "total_time": time.perf_counter() - start})
+
+    @app.get("/health")
+    def health():
+        with counters_lock:
+            stats = dict(counters)
+        return jsonify({"status": "ok", "batching": batcher.stats(), **stats,
+                        "retrieval_cache": pipeline.retriever.cache_stats()})
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the complaint RAG pipeline over HTTP.")
+    parser.add_argument("--index", default="vector_store/index.faiss")
+    parser.add_argument("--metadata", default="vector_store/metadata")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000)
+    parser.add_argument("--max-generations", type=int, default=MAX_GENERATIONS)
+    args = parser.parse_args()
+
+    from src.cache import AnswerCache
+    from src.rag_pipeline import RAGPipeline
+    from src.reranker import Reranker
+    pipeline = RAGPipeline(args.index, args.metadata, reranker=Reranker(),
+                           answer_cache=AnswerCache(disk_path="vector_store/answer_cache.sqlite",
+                                                    similarity_threshold=0.95))
+    print(f"🚀 Warm-up took {pipeline.warm_up():.2f}s")
+    app = create_app(pipeline, window=args.window_ms / 1000, max_generations=args.max_generations)
+    # One thread per request; the micro-batcher merges their retrievals
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
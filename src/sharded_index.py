@@ -0,0 +1,293 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import faiss
+import numpy as np
+from src.metadata_store import match_condition, replace_directory
+
+SCHEMA_FILE = "shards.json"
+# Ways of assigning chunks to shards: a hash of the complaint ID (even sizes,
+# every query visits every shard) or one shard per product (product filters
+# only visit the matching shards)
+SHARD_KEYS = ("hash", "product")
+EXECUTORS = ("thread", "process")
+
+def _index_file(shard: int) -> str:
+    return f"shard_{shard:03d}.faiss"
+
+def _ids_file(shard: int) -> str:
+    return f"shard_{shard:03d}.ids.npy"
+
+def _hash_shard(complaint_id, n_shards: int) -> int:
+    # Stable across processes and runs, unlike hash()
+    digest = hashlib.blake2b(str(complaint_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n_shards
+
+def shard_assignments(metadata: list, by: str = "hash", n_shards: int = 4) -> tuple:
+    """
+    Shard number of every metadata row.
+
+    All chunks of a complaint land in the same shard either way.
+
+    Args:
+        metadata (list): Chunk metadata dicts by row ID (None for removed rows).
+        by (str): "hash" (of ``complaint_id``, into ``n_shards`` shards) or
+            "product" (one shard per product; ``n_shards`` is ignored).
+        n_shards (int): Number of hash shards.
+
+    Returns:
+        tuple[np.ndarray, list]: int32 shard per row (-1 for removed rows) and
+            the shard keys (shard numbers for "hash", product names for "product").
+    """
+    if by not in SHARD_KEYS:
+        raise ValueError(f"Unknown shard key {by!r}; expected one of {SHARD_KEYS}")
+    assignments = np.full(len(metadata), -1, dtype=np.int32)
+    if by == "hash":
+        for row, meta in enumerate(metadata):
+            if meta is not None:
+                assignments[row] = _hash_shard(meta["complaint_id"], n_shards)
+        return assignments, list(range(n_shards))
+
+    keys = {}
+    for row, meta in enumerate(metadata):
+        if meta is not None:
+            assignments[row] = keys.setdefault(meta["product"], len(keys))
+    return assignments, list(keys)
+
+def selector_params(index, ids: np.ndarray):
+    """FAISS search parameters restricting results to ``ids``, keeping the index's nprobe/efSearch."""
+    selector = faiss.IDSelectorBatch(ids)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def _init_build_worker(threads: int) -> None:
+    # Pin FAISS threads so N workers don't oversubscribe the cores
+    faiss.omp_set_num_threads(threads)
+
+def _build_shard(vectors, rows: np.ndarray, path: str, shard: int, index_type: str, index_params: dict) -> int:
+    # ``vectors`` is the shard's matrix, or the path of the full memory-mapped one
+    from src.embedding_pipeline import build_faiss_index
+    if isinstance(vectors, str):
+        # Rows are sorted, so reads from the memory map stay sequential
+        vectors = np.load(vectors, mmap_mode="r")[rows]
+    index = build_faiss_index(vectors, index_type=index_type, **index_params)
+    faiss.write_index(index, os.path.join(path, _index_file(shard)))
+    np.save(os.path.join(path, _ids_file(shard)), rows.astype(np.int64))
+    return len(rows)
+
+def build_sharded_index(vectors, metadata: list, path: str, by: str = "hash", n_shards: int = 4,
+                        index_type: str = "flat", workers: int = 1, **index_params) -> dict:
+    """
+    Split the vectors into shards and build one FAISS index per shard.
+
+    Layout of the ``path`` directory:
+        - ``shard_NNN.faiss``: the shard's index (any ``INDEX_TYPES`` layout)
+        - ``shard_NNN.ids.npy``: int64 global row IDs of the shard's vectors, ascending
+          (local row i of the shard is global row ``ids[i]``), so results map
+          back to the shared metadata
+        - ``shards.json``: shard key, shard keys and sizes (only non-empty shards are written)
+
+    Args:
+        vectors (np.ndarray): Embedding matrix by row ID; a memory map from
+            ``np.load(..., mmap_mode="r")`` is reopened by each worker instead of copied.
+        metadata (list): Chunk metadata by row ID.
+        path (str): Output directory.
+        by (str): Shard key, one of ``SHARD_KEYS``.
+        n_shards (int): Number of shards for "hash".
+        index_type (str): Index layout of every shard (see ``build_faiss_index``).
+        workers (int): Processes building shards in parallel.
+        **index_params: Passed on to ``build_faiss_index``.
+
+    Returns:
+        dict: The schema written to ``shards.json``.
+    """
+    assignments, keys = shard_assignments(metadata, by=by, n_shards=n_shards)
+    shard_rows = [np.flatnonzero(assignments == shard) for shard in range(len(keys))]
+    # A hash shard can get no complaint at all; it is left out of the layout
+    # instead of training an index on zero vectors
+    non_empty = [shard for shard, rows in enumerate(shard_rows) if len(rows)]
+    keys = [keys[shard] for shard in non_empty]
+    shard_rows = [shard_rows[shard] for shard in non_empty]
+    # Workers reopen a memory-mapped file rather than receive a pickled copy of it
+    mapped = os.fspath(vectors.filename) if isinstance(vectors, np.memmap) and vectors.filename else None
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    jobs = [(mapped or vectors[rows], rows, tmp_path, shard, index_type, index_params)
+            for shard, rows in enumerate(shard_rows)]
+    if workers <= 1:
+        sizes = [_build_shard(*job) for job in jobs]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn, not fork: a forked child can deadlock in FAISS's OpenMP runtime
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_build_worker,
+                                 initargs=(threads,)) as pool:
+            sizes = list(pool.map(_build_shard, *zip(*jobs)))
+
+    schema = {"by": by, "keys": keys, "sizes": sizes, "index_type": index_type, "dim": int(vectors.shape[1])}
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+    replace_directory(tmp_path, path)
+    print(f"✅ Built {len(keys)} {index_type} shards by {by} ({min(sizes, default=0)}-{max(sizes, default=0)} vectors each).")
+    return schema
+
+class _Shard:
+    """One shard's index and its local -> global row ID mapping."""
+
+    def __init__(self, path: str, shard: int):
+        self.index = faiss.read_index(os.path.join(path, _index_file(shard)))
+        self.ids = np.load(os.path.join(path, _ids_file(shard)))
+
+    def set_parameter(self, name: str, value) -> None:
+        faiss.ParameterSpace().set_index_parameter(self.index, name, value)
+
+    def search(self, x: np.ndarray, k: int, allowed: np.ndarray = None) -> tuple:
+        if not len(self.ids):
+            return None
+        params = None
+        if allowed is not None:
+            # Global allowed IDs -> local rows of this shard
+            pos = np.searchsorted(self.ids, allowed)
+            found = pos < len(self.ids)
+            found[found] = self.ids[pos[found]] == allowed[found]
+            local = pos[found]
+            if not len(local):
+                return None
+            params = selector_params(self.index, local.astype(np.int64))
+        D, I = self.index.search(x, k, params=params)
+        return D, np.where(I >= 0, self.ids[np.maximum(I, 0)], -1)
+
+# Shard held by each search worker process
+_worker_shard = None
+
+def _init_search_worker(path: str, shard: int) -> None:
+    faiss.omp_set_num_threads(1)
+    global _worker_shard
+    _worker_shard = _Shard(path, shard)
+
+def _worker_set_parameter(name: str, value) -> None:
+    _worker_shard.set_parameter(name, value)
+
+def _worker_search(x: np.ndarray, k: int, allowed: np.ndarray = None):
+    return _worker_shard.search(x, k, allowed)
+
+def merge_top_k(results: list, k: int) -> tuple:
+    """
+    Merge per-shard (distances, global IDs) results into the overall top k.
+
+    Returns:
+        tuple: (distances, ids) of shape (n_queries, k), padded with inf / -1.
+    """
+    D = np.concatenate([d for d, _ in results], axis=1)
+    I = np.concatenate([i for _, i in results], axis=1)
+    D = np.where(I >= 0, D, np.inf)
+    # Stable sort: ties keep shard order, like a single index keeps row order
+    order = np.argsort(D, axis=1, kind="stable")[:, :k]
+    D, I = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+    if D.shape[1] < k:
+        pad = k - D.shape[1]
+        D = np.pad(D, ((0, 0), (0, pad)), constant_values=np.inf)
+        I = np.pad(I, ((0, 0), (0, pad)), constant_values=-1)
+    return D.astype(np.float32), I.astype(np.int64)
+
+class ShardedIndex:
+    """
+    Fan-out search over a directory written by ``build_sharded_index``.
+
+    Every query is sent to all shards (or, for product shards with a product
+    filter, only to the matching ones) in parallel, and the per-shard top-k
+    lists are merged. With the "thread" executor all shards live in this
+    process (FAISS releases the GIL while searching); with "process" each
+    shard is loaded by its own worker process, a local stand-in for one shard
+    server per machine.
+
+    Exposes the parts of the FAISS index interface the retriever uses
+    (``d``, ``ntotal``, ``search``).
+    """
+
+    def __init__(self, path: str, executor: str = "thread"):
+        """
+        Args:
+            path (str): Shard directory.
+            executor (str): "thread" or "process".
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}; expected one of {EXECUTORS}")
+        self.path = path
+        self.executor = executor
+        with open(os.path.join(path, SCHEMA_FILE), encoding="utf-8") as f:
+            schema = json.load(f)
+        self.by = schema["by"]
+        self.keys = schema["keys"]
+        self.d = schema["dim"]
+        self.index_type = schema.get("index_type", "flat")
+        self.ntotal = int(sum(schema["sizes"]))
+
+        n_shards = len(self.keys)
+        if executor == "thread":
+            self._shards = [_Shard(path, shard) for shard in range(n_shards)]
+            self._pool = ThreadPoolExecutor(max_workers=max(1, n_shards))
+        else:
+            context = multiprocessing.get_context("spawn")
+            self._pools = [ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_search_worker,
+                                               initargs=(path, shard)) for shard in range(n_shards)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set_parameter(self, name: str, value) -> None:
+        """Set a FAISS search parameter (e.g. "nprobe", "efSearch") on every shard."""
+        if self.executor == "thread":
+            for shard in self._shards:
+                shard.set_parameter(name, value)
+        else:
+            for future in [pool.submit(_worker_set_parameter, name, value) for pool in self._pools]:
+                future.result()
+
+    def route(self, filters: dict = None) -> list:
+        """Shards that can hold results for ``filters``: all of them, unless sharded by product."""
+        if self.by != "product" or not filters or "product" not in filters:
+            return list(range(len(self.keys)))
+        return np.flatnonzero(match_condition(self.keys, filters["product"])).tolist()
+
+    def search(self, x: np.ndarray, k: int, allowed: np.ndarray = None, filters: dict = None) -> tuple:
+        """
+        Top-k search across the shards.
+
+        Args:
+            x (np.ndarray): Query matrix.
+            k (int): Results per query.
+            allowed (np.ndarray, optional): Sorted global row IDs results are restricted to.
+            filters (dict, optional): The filters behind ``allowed``, used to skip shards.
+
+        Returns:
+            tuple: (distances, global row IDs), like ``faiss.Index.search``.
+        """
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        shards = self.route(filters)
+        if self.executor == "thread":
+            futures = [self._pool.submit(self._shards[s].search, x, k, allowed) for s in shards]
+        else:
+            futures = [self._pools[s].submit(_worker_search, x, k, allowed) for s in shards]
+        results = [r for r in (future.result() for future in futures) if r is not None]
+        if not results:
+            return np.full((len(x), k), np.inf, dtype=np.float32), np.full((len(x), k), -1, dtype=np.int64)
+        return merge_top_k(results, k)
+
+    def close(self) -> None:
+        """Stop the search threads or worker processes."""
+        if self.executor == "thread":
+            self._pool.shutdown()
+        else:
+            for pool in self._pools:
+                pool.shutdown()
@@ -1,20 +1,75 @@
+import os
 import pandas as pd
 import numpy as np
 import sys
 sys.path.append('../src')
-def load_data(file_path: str):
+
+# File extensions handled by the columnar backends
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+def _file_format(file_path: str) -> str:
+    ext = os.path.splitext(str(file_path))[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return "parquet"
+    if ext in ARROW_EXTENSIONS:
+        return "arrow"
+    return "csv"
+
+def data_columns(file_path: str) -> list:
+    """
+    Column names of a CSV, Parquet or Arrow IPC file, read from its header or schema only.
+
+    Args:
+        file_path (str): Path to the data file.
+
+    Returns:
+        list: Column names, in file order.
+    """
+    fmt = _file_format(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_path).names
+    if fmt == "arrow":
+        import pyarrow.dataset as ds
+        return ds.dataset(file_path, format="ipc").schema.names
+    return pd.read_csv(file_path, nrows=0).columns.tolist()
+
+def load_data(file_path: str, columns: list = None, products: list = None):
     """
-    Load data from a CSV file.
-    
+    Load data from a CSV, Parquet or Arrow IPC file.
+
+    The format is picked from the file extension. Parquet and Arrow files are
+    memory-mapped and only the requested columns are decoded; for Parquet the
+    product filter is pushed down so non-matching row groups are skipped.
+
     Args:
-        file_path (str): Path to the CSV file.
-        
+        file_path (str): Path to the data file.
+        columns (list, optional): Columns to load. Defaults to all columns.
+        products (list, optional): Keep only rows whose ``Product`` is in this list.
+
     Returns:
         pd.DataFrame: Loaded data as a DataFrame.
     """
     try:
         print(file_path)
-        data = pd.read_csv(file_path)
+        fmt = _file_format(file_path)
+        if fmt == "parquet":
+            filters = [("Product", "in", list(products))] if products else None
+            data = pd.read_parquet(file_path, columns=columns, filters=filters, memory_map=True)
+        elif fmt == "arrow":
+            import pyarrow.dataset as ds
+            dataset = ds.dataset(file_path, format="ipc")
+            filter_expr = ds.field("Product").isin(list(products)) if products else None
+            data = dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
+        else:
+            # Read "Product" for the filter even when it isn't projected
+            usecols = list(dict.fromkeys([*columns, "Product"])) if columns and products else columns
+            data = pd.read_csv(file_path, usecols=usecols)
+            if products:
+                data = data[data["Product"].isin(products)].reset_index(drop=True)
+            if columns:
+                data = data[list(columns)]
         print(f"✅ Loaded {len(data)} rows from {file_path}.")
         return data
     except Exception as e:
@@ -23,18 +78,100 @@ def load_data(file_path: str):
 
 def save_data(data: pd.DataFrame, file_path: str):
     """
-    Save DataFrame to a CSV file.
-    
+    Save DataFrame to a CSV, Parquet or Arrow IPC file (picked from the extension).
+
+    Parquet and Arrow keep column dtypes, including the datetimes produced by
+    ``date_time_conversion``, so they don't have to be re-parsed on load.
+
     Args:
         data (pd.DataFrame): Data to save.
-        file_path (str): Path to save the CSV file.
-        
+        file_path (str): Path to save the file.
+
     Returns:
         bool: True if saved successfully, False otherwise.
     """
     try:
-        data.to_csv(file_path, index=False)
+        fmt = _file_format(file_path)
+        if fmt == "parquet":
+            data.to_parquet(file_path, index=False)
+        elif fmt == "arrow":
+            data.reset_index(drop=True).to_feather(file_path, compression="uncompressed")
+        else:
+            data.to_csv(file_path, index=False)
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def _promote_null_fields(schema):
+    # An all-null column is inferred as Arrow's ``null`` type, which no later value can be cast to
+    import pyarrow as pa
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+class DataWriter:
+    """
+    Incrementally write DataFrame chunks to one CSV, Parquet or Arrow IPC file.
+
+    Used by the streaming pipeline so processed chunks go straight to disk. The
+    first chunk fixes the schema; later chunks are cast to it. Columns that are
+    entirely null in the first chunk are typed as strings, so values showing up
+    in later chunks still fit the schema.
+
+    Example:
+        >>> with DataWriter("processed.parquet") as writer:
+        ...     for chunk in chunks:
+        ...         writer.write(chunk)
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path (str): Output path; the format is picked from the extension.
+        """
+        self.file_path = file_path
+        self.format = _file_format(file_path)
+        self.rows_written = 0
+        self._writer = None
+        self._schema = None
+        self._header_written = False
+
+    def write(self, data: pd.DataFrame) -> None:
+        """
+        Append one chunk to the output file.
+
+        Args:
+            data (pd.DataFrame): Chunk to append.
+        """
+        if self.format == "csv":
+            data.to_csv(self.file_path, mode="a" if self._header_written else "w",
+                        header=not self._header_written, index=False)
+            self._header_written = True
+        else:
+            import pyarrow as pa
+            if self._schema is None:
+                self._schema = _promote_null_fields(
+                    pa.Table.from_pandas(data, preserve_index=False).schema)
+            table = pa.Table.from_pandas(data, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                if self.format == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema)
+            self._writer.write_table(table)
+        self.rows_written += len(data)
+
+    def close(self) -> None:
+        """Flush and close the output file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
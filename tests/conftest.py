@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModel:
+    """Local stand-in for genai.GenerativeModel that records concurrency."""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            # Imported here so test modules that don't use the stub run without the Gemini SDK
+            from google.api_core import exceptions as google_exceptions
+            raise google_exceptions.ServiceUnavailable("overloaded")
+        if stream:
+            return iter([StubResponse("answer "), StubResponse(""), StubResponse(f"to {prompt}")])
+        return StubResponse(f" answer to {prompt} ")
+
+    async def generate_content_async(self, prompt, request_options=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.generate_content(prompt)
+        finally:
+            self.in_flight -= 1
+
+    def start_chat(self):
+        raise AssertionError("stateless mode must not open a chat session")
+
+@pytest.fixture
+def stub_model():
+    """Factory for stub Gemini models: ``stub_model(delay=..., failures=...)``."""
+    return StubModel
@@ -0,0 +1,23 @@
+from benchmarks.suite import compare, run_suite
+
+def test_suite_times_every_stage(tmp_path):
+    results = run_suite(300, str(tmp_path), queries=8, batch_size=4, answers=2)
+
+    stages = results["stages"]
+    assert list(stages) == ["run_pipeline", "chunk_narratives", "embed_chunks", "index_to_faiss",
+                            "retrieve", "retrieve_batch", "answer"]
+    assert stages["chunk_narratives"]["chunks"] == stages["embed_chunks"]["items"] > 0
+    assert all(record["seconds"] >= 0 and record["peak_rss_mb"] > 0 for record in stages.values())
+    assert stages["retrieve"]["p50_ms"] <= stages["retrieve"]["p99_ms"]
+    assert results["config"]["model"] == "stub-384d"
+
+def test_compare_flags_slowdowns_beyond_the_threshold():
+    baseline = {"stages": {"embed_chunks": {"seconds": 1.0, "p99_ms": 10.0}, "index_to_faiss": {"seconds": 0.01}}}
+    current = {"stages": {"embed_chunks": {"seconds": 1.5, "p99_ms": 10.5}, "index_to_faiss": {"seconds": 0.03},
+                          "answer": {"seconds": 9.0}}}
+
+    rows = compare(current, baseline, threshold=0.2)
+
+    # Stages missing from the baseline and sub-MIN_COMPARED_SECONDS timings are skipped
+    assert [(r["stage"], r["metric"], r["regressed"]) for r in rows] == [
+        ("embed_chunks", "seconds", True), ("embed_chunks", "p99_ms", False)]
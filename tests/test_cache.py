@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.cache import AnswerCache, TTLCache, chunk_ids, file_version, normalize_query
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)           # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 2, "misses": 1, "disk_hits": 0, "size": 2, "hit_rate": pytest.approx(2 / 3)}
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("q", "answer")
+
+    clock.now += 9
+    assert cache.get("q") == "answer"
+    clock.now += 2
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    TTLCache(disk_path=path, namespace="results").set("q", [1, 2, 3])
+
+    restarted = TTLCache(disk_path=path, namespace="results")
+
+    assert restarted.get("q") == [1, 2, 3]
+    assert restarted.stats()["disk_hits"] == 1
+    assert TTLCache(disk_path=path, namespace="other").get("q") is None
+
+def test_normalize_query_and_file_version(tmp_path):
+    assert normalize_query("  Late   FEES?\n") == "late fees?"
+
+    index = tmp_path / "index.faiss"
+    index.write_bytes(b"v1")
+    before = file_version(str(index))
+    index.write_bytes(b"version 2")
+    assert file_version(str(index)) != before
+
+def test_answer_cache_exact_and_semantic_hits():
+    cache = AnswerCache(similarity_threshold=0.95)
+    ids = chunk_ids([{"complaint_id": 1, "text": "late fee"}, "plain chunk"])
+    cache.store(ids, "prompt about fees", "tmpl", "Fees were unexpected.", np.array([1.0, 0.0]))
+
+    assert cache.lookup(ids, "prompt about fees", "tmpl") == "Fees were unexpected."
+    # Rephrased question: different prompt, near-identical embedding, same chunks
+    assert cache.lookup(ids, "prompt about the fees", "tmpl", np.array([0.99, 0.05])) == "Fees were unexpected."
+    # Dissimilar question, other chunks or a changed template all miss
+    assert cache.lookup(ids, "other prompt", "tmpl", np.array([0.0, 1.0])) is None
+    assert cache.lookup(ids[:1], "prompt about the fees", "tmpl", np.array([1.0, 0.0])) is None
+    assert cache.lookup(ids, "prompt about the fees", "tmpl v2", np.array([1.0, 0.0])) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 3)
+
+def test_answer_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    AnswerCache(disk_path=path).store(["a", "b"], "prompt", "tmpl", "cached answer")
+
+    assert AnswerCache(disk_path=path).lookup(["a", "b"], "prompt", "tmpl") == "cached answer"
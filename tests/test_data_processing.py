@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing import (
+    clean_text,
+    clean_text_series,
+    numerical_data_standardizing,
+    product_filter,
+    product_filter_series,
+    run_pipeline,
+    run_pipeline_streaming,
+    word_count_series,
+)
+
+# Fixture sample raw complaints, with a duplicate that lands in a later chunk
+raw_df = pd.DataFrame({
+    "Date received": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-01", "2024-01-05"],
+    "Product": ["Credit card", "Mortgage", "Personal loan", "Credit card", "Credit card", "Money transfer"],
+    "Consumer complaint narrative": [
+        "I was charged TWICE for the same transaction!!",
+        "My mortgage payment was misapplied.",
+        None,
+        "The late fee on my card was not explained.",
+        "I was charged TWICE for the same transaction!!",
+        "Transfer failed, but my account was debited.",
+    ],
+    "Complaint ID": [1, 2, 3, 4, 1, 6],
+})
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    path = tmp_path / "complaints.csv"
+    raw_df.to_csv(path, index=False)
+    return path
+
+def test_streaming_matches_in_memory_pipeline(raw_csv, tmp_path):
+    out_path = tmp_path / "processed" / "processed.csv"
+
+    written = run_pipeline_streaming(str(raw_csv), str(out_path), chunksize=2)
+    streamed = pd.read_csv(out_path)
+    expected = run_pipeline(pd.read_csv(raw_csv))
+
+    assert written == len(expected) == 3
+    assert streamed["Complaint ID"].tolist() == expected["Complaint ID"].tolist()
+    assert streamed["Cleaned_Narrative"].tolist() == expected["Cleaned_Narrative"].tolist()
+    assert streamed["Product"].tolist() == expected["Product"].tolist()
+
+# Tricky inputs for the vectorized cleaners: Unicode case folding, non-ASCII and
+# control whitespace, punctuation runs and empty results
+tricky_texts = pd.Series([
+    "I was charged TWICE for the same transaction!!",
+    "  Héllo\tWORLD\n\n$200.00 fee  ",
+    "İstanbul ẞ straße ½ ①",
+    "a\x1cb\x1fc d e\u0085f",
+    "!!!",
+    "",
+])
+
+def test_clean_text_series_matches_scalar():
+    expected = tricky_texts.apply(clean_text)
+    result = clean_text_series(tricky_texts)
+
+    assert result.tolist() == expected.tolist()
+    assert result.dtype == expected.dtype
+
+def test_product_filter_series_matches_scalar():
+    products = pd.Series(["Credit card", None, "MONEY TRANSFER, virtual currency", "Mortgage",
+                          "Checking or savings account", "Buy Now, Pay Later", float("nan")])
+
+    assert product_filter_series(products).tolist() == products.apply(product_filter).tolist()
+
+def test_word_count_series_matches_split():
+    expected = tricky_texts.apply(lambda x: len(x.split())).tolist()
+
+    assert word_count_series(tricky_texts).tolist() == expected
+    cleaned = tricky_texts.apply(clean_text)
+    assert word_count_series(cleaned, normalized=True).tolist() == cleaned.apply(lambda x: len(x.split())).tolist()
+
+def test_numerical_data_standardizing_matches_scalar():
+    values = [0, -3, 2.5, 10, float("nan")]
+    legacy = pd.Series(values).apply(lambda x: np.sign(x) * np.log1p(abs(x)) if x > 0 else 0)
+
+    result = numerical_data_standardizing(pd.DataFrame({"Amount": values}), ["Amount"])["Amount"]
+
+    assert result.tolist() == legacy.tolist()
+    assert result.dtype == legacy.dtype
+
+def test_parallel_pipeline_matches_serial(raw_csv, tmp_path):
+    serial = run_pipeline(pd.read_csv(raw_csv))
+    parallel = run_pipeline(pd.read_csv(raw_csv), workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+
+    out_path = tmp_path / "processed.csv"
+    written = run_pipeline_streaming(str(raw_csv), str(out_path), chunksize=2, workers=2)
+    assert written == len(serial)
+    assert pd.read_csv(out_path)["Cleaned_Narrative"].tolist() == serial["Cleaned_Narrative"].tolist()
@@ -6,7 +6,15 @@ import faiss
 import pytest
 import sys
 
-from src.embedding_pipeline import chunk_narratives, embed_chunks, index_to_faiss
+from src.embedding_pipeline import (
+    build_faiss_index,
+    chunk_narratives,
+    embed_chunks,
+    embed_chunks_to_memmap,
+    index_to_faiss,
+    run_embedding_pipeline,
+    update_faiss_index,
+)
 
 # Fixture sample DataFrame
 sample_df = pd.DataFrame({
@@ -28,6 +36,56 @@ def test_chunk_narratives():
         assert "product" in meta
         assert "text" in meta
 
+def test_chunk_narratives_carries_filter_columns():
+    df = sample_df.assign(**{
+        "Date received": pd.to_datetime(["2024-01-05", None]),
+        "Company": ["Acme Bank", "PayFast"],
+        "State": ["CA", None],
+    })
+
+    _, metadata = chunk_narratives(df, text_column="Cleaned_Narrative")
+
+    first = metadata[0]
+    assert (first["date_received"], first["company"], first["state"]) == ("2024-01-05", "Acme Bank", "CA")
+    last = metadata[-1]
+    assert (last["date_received"], last["company"], last["state"]) == (None, "PayFast", None)
+
+def _tricky_narratives(n: int = 60, seed: int = 0) -> list:
+    # Paragraph breaks, runs of whitespace, words longer than a chunk, short texts
+    rng = np.random.default_rng(seed)
+    pieces = ["card", "charged", "xxxx", "dispute", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", "é",
+              "a" * 120, "b" * 700]
+    texts = ["", "   ", "short narrative", "c" * 1200]
+    for _ in range(n):
+        texts.append("".join(rng.choice(pieces, rng.integers(50, 600))))
+    return texts
+
+def test_chunking_matches_langchain_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from src.chunking import split_offsets
+    from src.embedding_pipeline import CHUNK_OVERLAP, CHUNK_SIZE
+
+    for chunk_size, chunk_overlap in [(CHUNK_SIZE, CHUNK_OVERLAP), (40, 10), (7, 0)]:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        for text in _tricky_narratives():
+            expected = splitter.split_text(text)
+            assert [text[s:e] for s, e in split_offsets(text, chunk_size, chunk_overlap)] == expected
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_chunk_narratives_matches_langchain(workers):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from src.embedding_pipeline import CHUNK_OVERLAP, CHUNK_SIZE
+
+    texts = _tricky_narratives()
+    df = pd.DataFrame({"Complaint ID": range(len(texts)), "Product": "Credit card", "Cleaned_Narrative": texts})
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    expected = [(i, chunk) for i, text in enumerate(texts) for chunk in splitter.split_text(text)]
+
+    chunks, metadata = chunk_narratives(df, text_column="Cleaned_Narrative", workers=workers)
+
+    assert chunks == [chunk for _, chunk in expected]
+    assert [(meta["complaint_id"], meta["text"]) for meta in metadata] == expected
+
 def test_embedding_shape():
     chunks, metadata = chunk_narratives(sample_df, text_column="Cleaned_Narrative")
     texts = [meta["text"] for meta in metadata]
@@ -58,3 +116,234 @@ def test_faiss_indexing(tmp_path):
         loaded_meta = pickle.load(f)
         assert isinstance(loaded_meta, list)
         assert loaded_meta[0]["text"] == metadata[0]["text"]
+
+def _fake_embed(chunks, model_name):
+    # Deterministic stand-in for the SentenceTransformer so tests run offline
+    rng = np.random.default_rng(abs(hash(tuple(chunks))) % (2**32))
+    return rng.random((len(chunks), 8), dtype=np.float32)
+
+def _store_paths(tmp_path):
+    return {
+        "index_path": str(tmp_path / "index.faiss"),
+        "meta_path": str(tmp_path / "metadata.pkl"),
+        "manifest_path": str(tmp_path / "manifest.pkl"),
+    }
+
+def test_incremental_update_embeds_only_changes(tmp_path, monkeypatch):
+    embedded = []
+    def fake_embed(chunks, model_name):
+        embedded.extend(chunks)
+        return _fake_embed(chunks, model_name)
+    monkeypatch.setattr("src.embedding_pipeline.embed_chunks", fake_embed)
+    paths = _store_paths(tmp_path)
+
+    stats = update_faiss_index(sample_df, "Cleaned_Narrative", **paths)
+    assert stats == {"added": 2, "changed": 0, "removed": 0, "unchanged": 0}
+
+    refreshed = pd.DataFrame({
+        "Complaint ID": [102, 103],
+        "Product": ["Money transfers", "Credit card"],
+        "Cleaned_Narrative": ["The transfer failed twice.", "A brand new complaint about late fees."],
+    })
+    embedded.clear()
+    stats = update_faiss_index(refreshed, "Cleaned_Narrative", **paths)
+
+    assert stats == {"added": 1, "changed": 1, "removed": 1, "unchanged": 0}
+    assert embedded == ["The transfer failed twice.", "A brand new complaint about late fees."]
+
+    index = faiss.read_index(paths["index_path"])
+    with open(paths["meta_path"], "rb") as f:
+        metadata = pickle.load(f)
+    live = [meta for meta in metadata if meta is not None]
+    assert index.ntotal == len(live) == 2
+    assert sorted(meta["complaint_id"] for meta in live) == [102, 103]
+
+    # Nothing changed: nothing is embedded
+    embedded.clear()
+    assert update_faiss_index(refreshed, "Cleaned_Narrative", **paths)["unchanged"] == 2
+    assert embedded == []
+
+def test_incremental_update_refreshes_changed_filter_fields(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.embedding_pipeline.embed_chunks", _fake_embed)
+    paths = _store_paths(tmp_path)
+    df = sample_df.assign(Company=["Bank A", "Bank B"], State=["CA", "NY"])
+    update_faiss_index(df, "Cleaned_Narrative", **paths)
+
+    stats = update_faiss_index(df.assign(State=["CA", "TX"]), "Cleaned_Narrative", **paths)
+
+    assert stats == {"added": 0, "changed": 1, "removed": 0, "unchanged": 1}
+    with open(paths["meta_path"], "rb") as f:
+        metadata = pickle.load(f)
+    states = {meta["complaint_id"]: meta["state"] for meta in metadata if meta is not None}
+    assert states == {101: "CA", 102: "TX"}
+
+def test_incremental_update_resumes_after_crash(tmp_path, monkeypatch):
+    calls = []
+    def crashing_embed(chunks, model_name):
+        calls.append(chunks)
+        if len(calls) == 2:
+            raise RuntimeError("worker killed")
+        return _fake_embed(chunks, model_name)
+    monkeypatch.setattr("src.embedding_pipeline.embed_chunks", crashing_embed)
+    paths = _store_paths(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        update_faiss_index(sample_df, "Cleaned_Narrative", batch_size=1, **paths)
+
+    stats = update_faiss_index(sample_df, "Cleaned_Narrative", batch_size=1, **paths)
+
+    # The first batch was committed before the crash and is not embedded again
+    assert stats == {"added": 1, "changed": 0, "removed": 0, "unchanged": 1}
+    assert faiss.read_index(paths["index_path"]).ntotal == 2
+
+def test_incremental_update_keeps_non_flat_indexes(tmp_path):
+    paths = _store_paths(tmp_path)
+    vectors = np.random.default_rng(0).random((300, 8), dtype=np.float32)
+    faiss.write_index(build_faiss_index(vectors, "sq8"), paths["index_path"])
+
+    with pytest.raises(ValueError):
+        update_faiss_index(sample_df, "Cleaned_Narrative", **paths)
+    assert faiss.read_index(paths["index_path"]).ntotal == 300
+    with pytest.raises(ValueError):
+        run_embedding_pipeline(incremental=True, index_type="ivf_pq")
+
+def test_incremental_update_keeps_store_and_lexical_index_in_sync(tmp_path, monkeypatch):
+    from src.lexical_index import LexicalIndex
+    from src.metadata_store import MetadataStore
+
+    monkeypatch.setattr("src.embedding_pipeline.embed_chunks", _fake_embed)
+    paths = _store_paths(tmp_path)
+    store_path, lexical_path = str(tmp_path / "metadata"), str(tmp_path / "lexical")
+    update_faiss_index(sample_df, "Cleaned_Narrative", store_path=store_path, lexical_path=lexical_path, **paths)
+
+    refreshed = pd.DataFrame({
+        "Complaint ID": [102, 103],
+        "Product": ["Money transfers", "Credit card"],
+        "Cleaned_Narrative": ["The transfer failed twice.", "A brand new complaint about late fees."],
+    })
+    update_faiss_index(refreshed, "Cleaned_Narrative", store_path=store_path, lexical_path=lexical_path, **paths)
+
+    with open(paths["meta_path"], "rb") as f:
+        metadata = pickle.load(f)
+    store = MetadataStore(store_path)
+    assert [store[i] for i in range(len(store))] == metadata
+    lexical = LexicalIndex(lexical_path)
+    assert [metadata[i]["complaint_id"] for i in lexical.search("late fees", k=5)[0]] == [103]
+    assert lexical.search("charged", k=5)[0].tolist() == []
+
+def test_incremental_update_rejects_product_scope(monkeypatch):
+    loaded = []
+    monkeypatch.setattr("src.embedding_pipeline.load_data", lambda *a, **kw: loaded.append(kw))
+    with pytest.raises(ValueError):
+        run_embedding_pipeline(products=["Credit card"], incremental=True)
+    assert loaded == []
+
+@pytest.mark.parametrize("file_name", ["processed.csv", "processed.parquet"])
+def test_pipeline_embeds_a_file_without_filter_columns(tmp_path, monkeypatch, file_name):
+    from src.utils import save_data
+
+    path = str(tmp_path / file_name)
+    save_data(sample_df, path)
+    indexed = {}
+    monkeypatch.setattr("src.embedding_pipeline.PROCESSED_DATA_PATH", path)
+    monkeypatch.setattr("src.embedding_pipeline.embed_chunks_to_memmap",
+                        lambda chunks, model_name, workers=1: _fake_embed(chunks, model_name))
+    monkeypatch.setattr("src.embedding_pipeline.index_to_faiss",
+                        lambda vectors, metadata, **kwargs: indexed.update(vectors=vectors, metadata=metadata))
+
+    run_embedding_pipeline()
+
+    assert len(indexed["vectors"]) == len(indexed["metadata"]) > 0
+    assert {meta["complaint_id"] for meta in indexed["metadata"]} == {101, 102}
+    assert "company" not in indexed["metadata"][0]
+
+class _FakeModel:
+    """Offline SentenceTransformer stand-in: each vector encodes its text length."""
+
+    def __init__(self, fail_on_call=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        self.calls.append(list(texts))
+        if len(self.calls) == self.fail_on_call:
+            raise RuntimeError("out of memory")
+        return np.array([[len(t), 1.0, 2.0, 3.0] for t in texts], dtype=np.float32)
+
+texts = ["a" * n for n in (7, 3, 12, 1, 5)]
+
+def test_embed_chunks_to_memmap_keeps_input_order(tmp_path, monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr("src.embedding_pipeline._load_model", lambda name: model)
+
+    vectors = embed_chunks_to_memmap(texts, "fake", str(tmp_path / "vectors.npy"), batch_size=2)
+
+    assert isinstance(vectors, np.memmap)
+    assert vectors[:, 0].tolist() == [7, 3, 12, 1, 5]
+    # Batches are formed from length-sorted chunks to reduce padding
+    assert [len(t) for batch in model.calls for t in batch] == [1, 3, 5, 7, 12]
+
+def test_embed_chunks_to_memmap_resumes_from_checkpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / "vectors.npy")
+    monkeypatch.setattr("src.embedding_pipeline._load_model", lambda name: _FakeModel(fail_on_call=2))
+    with pytest.raises(RuntimeError):
+        embed_chunks_to_memmap(texts, "fake", path, batch_size=2)
+
+    model = _FakeModel()
+    monkeypatch.setattr("src.embedding_pipeline._load_model", lambda name: model)
+    vectors = embed_chunks_to_memmap(texts, "fake", path, batch_size=2)
+
+    assert len(model.calls) == 2  # only the two unfinished batches
+    assert vectors[:, 0].tolist() == [7, 3, 12, 1, 5]
+
+    index_to_faiss(vectors, [{"text": t} for t in texts],
+                   index_path=str(tmp_path / "index.faiss"), meta_path=str(tmp_path / "metadata.pkl"))
+    assert faiss.read_index(str(tmp_path / "index.faiss")).ntotal == len(texts)
+
+@pytest.fixture
+def tiny_model_dir(tmp_path):
+    # Small whitespace-tokenized SentenceTransformer saved to disk, so worker
+    # processes can load it without network access
+    from sentence_transformers import SentenceTransformer, models
+    from sentence_transformers.models.tokenizer import WhitespaceTokenizer
+
+    vocab = sorted({word for text in sample_df["Cleaned_Narrative"] for word in text.lower().split()})
+    weights = np.random.default_rng(0).random((len(vocab) + 1, 8), dtype=np.float32)
+    word_embeddings = models.WordEmbeddings(tokenizer=WhitespaceTokenizer(vocab=vocab), embedding_weights=weights)
+    model = SentenceTransformer(modules=[word_embeddings, models.Pooling(8)], device="cpu")
+    model.save(str(tmp_path / "tiny-model"))
+    return str(tmp_path / "tiny-model")
+
+def test_parallel_embedding_matches_single_process(tiny_model_dir):
+    texts = list(sample_df["Cleaned_Narrative"]) * 3
+
+    single = embed_chunks(texts, tiny_model_dir)
+    parallel = embed_chunks(texts, tiny_model_dir, workers=2, batch_size=2)
+
+    assert parallel.shape == single.shape
+    np.testing.assert_allclose(parallel, single, rtol=1e-5, atol=1e-6)
+
+@pytest.mark.parametrize("index_type,params", [
+    ("flat", {}),
+    ("sq_fp16", {}),
+    ("sq8", {}),
+    ("pq", {"pq_m": 4, "pq_bits": 4}),
+    ("ivf_flat", {"nlist": 4}),
+    ("ivf_pq", {"nlist": 4, "pq_m": 4, "pq_bits": 4}),
+    ("hnsw", {"hnsw_m": 8}),
+])
+def test_build_faiss_index_types(index_type, params):
+    vectors = np.random.default_rng(0).random((400, 16), dtype=np.float32)
+
+    index = build_faiss_index(vectors, index_type=index_type, **params)
+
+    assert index.ntotal == 400
+    _, ids = index.search(vectors[:3], 1)
+    assert ids.shape == (3, 1)
+
+def test_build_faiss_index_rejects_unknown_type():
+    with pytest.raises(ValueError):
+        build_faiss_index(np.zeros((4, 4), dtype=np.float32), index_type="lsh")
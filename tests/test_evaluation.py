@@ -0,0 +1,53 @@
+import json
+from unittest.mock import patch
+
+from src.evaluation import RAGEvaluator
+from src.generator import GeminiGenerator
+
+questions = [f"Question {i}?" for i in range(7)]
+
+def make_evaluator(model):
+    with patch("src.rag_pipeline.ComplaintRetriever") as MockRetriever, \
+         patch("src.rag_pipeline.GeminiGenerator"):
+        evaluator = RAGEvaluator("dummy.index", "dummy.pkl")
+    retriever = MockRetriever.return_value
+    retriever.retrieve_batch.side_effect = lambda qs, k=5, **kwargs: [[{"text": f"context for {q}"}] for q in qs]
+    evaluator.pipeline.retriever = retriever
+    evaluator.pipeline.generator = GeminiGenerator(model=model, backoff=0)
+    return evaluator
+
+def test_concurrent_evaluation_keeps_order_and_reports_timings(stub_model):
+    model = stub_model(delay=0.01)
+    evaluator = make_evaluator(model)
+
+    df = evaluator.evaluate_questions(questions, concurrency=4, batch_size=3)
+
+    assert df["Question"].tolist() == questions
+    assert df["Retrieved Sources"].tolist() == [f"context for {q}" for q in questions]
+    assert (df["Generation Time (s)"] > 0).all()
+    assert (df["Retrieval Time (s)"] >= 0).all()
+    assert 1 < model.max_in_flight <= 4
+    assert evaluator.pipeline.retriever.retrieve_batch.call_count == 3
+
+def test_sequential_and_concurrent_modes_agree(stub_model):
+    sequential = make_evaluator(stub_model()).evaluate_questions(questions)
+    concurrent = make_evaluator(stub_model()).evaluate_questions(questions, concurrency=3)
+
+    assert sequential["Generated Answer"].tolist() == concurrent["Generated Answer"].tolist()
+
+def test_checkpointed_run_resumes(tmp_path, stub_model):
+    checkpoint = tmp_path / "eval.jsonl"
+    make_evaluator(stub_model()).evaluate_questions(questions[:4], checkpoint_path=str(checkpoint))
+    # Simulate a crash halfway through writing the next row
+    with open(checkpoint, "a", encoding="utf-8") as f:
+        f.write('{"index": 4, "Question": "Quest')
+
+    model = stub_model()
+    df = make_evaluator(model).evaluate_questions(questions, concurrency=2, checkpoint_path=str(checkpoint))
+
+    assert model.calls == 3  # Only the questions missing from the checkpoint were asked
+    expected = make_evaluator(stub_model()).evaluate_questions(questions)
+    assert df["Generated Answer"].tolist() == expected["Generated Answer"].tolist()
+    # The cut-off line is terminated, so every row written after it stays readable
+    lines = checkpoint.read_text().splitlines()
+    assert sorted(json.loads(line)["index"] for line in lines[:4] + lines[5:]) == list(range(7))
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.generator import GeminiGenerator
+
+def test_generate_is_stateless_and_retries(stub_model):
+    model = stub_model(failures=2)
+    generator = GeminiGenerator(model=model, backoff=0)
+
+    assert generator.generate("q1") == "answer to q1"
+    assert model.calls == 3
+    assert generator.chat is None
+
+def test_generate_gives_up_after_max_retries(stub_model):
+    generator = GeminiGenerator(model=stub_model(failures=10), max_retries=1, backoff=0)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        generator.generate("q")
+
+def test_agenerate_limits_concurrency_and_keeps_order(stub_model):
+    model = stub_model(delay=0.01)
+    generator = GeminiGenerator(model=model, max_concurrency=3)
+
+    answers = asyncio.run(generator.agenerate_many([f"q{i}" for i in range(10)]))
+
+    assert answers == [f"answer to q{i}" for i in range(10)]
+    assert model.max_in_flight == 3
+
+def test_agenerate_times_out_and_retries(stub_model):
+    model = stub_model(delay=1.0)
+    generator = GeminiGenerator(model=model, timeout=0.01, max_retries=1, backoff=0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(generator.agenerate("slow"))
+    assert model.max_in_flight == 1
+
+def test_generate_stream_yields_chunks_and_retries_before_first_token(stub_model):
+    model = stub_model(failures=1)
+    generator = GeminiGenerator(model=model, backoff=0)
+
+    assert list(generator.generate_stream("q")) == ["answer ", "to q"]
+    assert model.calls == 2
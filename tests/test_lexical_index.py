@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.lexical_index import LexicalIndex, build_lexical_index, reciprocal_rank_fusion, update_lexical_index
+
+texts = [
+    "late fee charged on account 4417 without notice",
+    None,  # Tombstoned row
+    "overdraft fee charged twice",
+    "paypal refused to refund the merchant charge",
+    "late payment reported to the credit bureau",
+]
+
+@pytest.fixture
+def index(tmp_path):
+    build_lexical_index(texts, str(tmp_path / "lexical"))
+    return LexicalIndex(str(tmp_path / "lexical"))
+
+def test_bm25_scores_match_the_formula(index):
+    ids, scores = index.search("fee", k=10)
+
+    lengths = [len(t.split()) if t else 0 for t in texts]
+    avgdl = sum(lengths) / 4
+    idf = math.log(1 + (4 - 2 + 0.5) / (2 + 0.5))
+    expected = {i: idf * 2.2 / (1 + 1.2 * (0.25 + 0.75 * lengths[i] / avgdl)) for i in (0, 2)}
+    assert ids.tolist() == sorted(expected, key=lambda i: -expected[i])
+    assert scores.tolist() == pytest.approx([expected[i] for i in ids.tolist()], rel=1e-5)
+
+def test_exact_terms_and_filters(index):
+    assert index.search("account 4417", k=3)[0].tolist() == [0]
+    assert index.search("unknown words", k=3)[0].tolist() == []
+    assert index.search("charged", k=3, allowed=np.array([2, 3]))[0].tolist() == [2]
+
+def test_pruned_search_matches_exhaustive(tmp_path):
+    rng = np.random.default_rng(0)
+    probs = 1 / np.arange(1, 501)
+    probs /= probs.sum()
+    corpus = [" ".join(f"t{w}" for w in rng.choice(500, rng.integers(5, 60), p=probs)) for _ in range(2000)]
+    build_lexical_index(corpus, str(tmp_path / "lexical"))
+    index = LexicalIndex(str(tmp_path / "lexical"))
+
+    for _ in range(50):
+        query = " ".join(f"t{w}" for w in rng.choice(500, 5, p=probs))
+        pruned, exhaustive = index.search(query, k=10), index.search(query, k=10, prune=False)
+        assert pruned[0].tolist() == exhaustive[0].tolist()
+        assert pruned[1] == pytest.approx(exhaustive[1], rel=1e-5)
+
+def test_update_matches_a_full_rebuild(tmp_path):
+    # Rows are only appended or tombstoned, as by an incremental index update
+    updated_texts = [None if i == 2 else text for i, text in enumerate(texts)] + [
+        "zelle transfer 99812 reversed", None, "late fee waived after the dispute"]
+    build_lexical_index(texts, str(tmp_path / "updated"))
+    update_lexical_index(updated_texts, str(tmp_path / "updated"))
+    build_lexical_index(updated_texts, str(tmp_path / "rebuilt"))
+    updated, rebuilt = LexicalIndex(str(tmp_path / "updated")), LexicalIndex(str(tmp_path / "rebuilt"))
+
+    assert len(updated) == len(rebuilt) == len(updated_texts)
+    # "overdraft" only occurred in the removed row
+    assert updated.search("overdraft", k=3)[0].tolist() == []
+    for query in ["late fee", "charged", "zelle 99812", "refund merchant"]:
+        ids, scores = updated.search(query, k=5)
+        expected_ids, expected_scores = rebuilt.search(query, k=5)
+        assert ids.tolist() == expected_ids.tolist()
+        assert scores == pytest.approx(expected_scores, rel=1e-5)
+
+def test_reciprocal_rank_fusion():
+    ids, scores = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=3, rrf_k=60)
+
+    assert ids == [3, 1, 2]
+    assert scores[0] == pytest.approx(1 / 63 + 1 / 61)
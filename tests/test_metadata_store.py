@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.metadata_store import MetadataStore, update_metadata_store, write_metadata_store
+
+# Fixture sample metadata, including a tombstone left by an incremental update
+records = [
+    {"complaint_id": 101, "product": "credit card", "text": "charged twice for the same transaction"},
+    None,
+    {"complaint_id": 102, "product": "money transfers", "text": "transfer failed — account débited"},
+    {"complaint_id": 102, "product": "money transfers", "text": ""},
+]
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "metadata"
+    write_metadata_store(records, str(path))
+    return MetadataStore(str(path))
+
+def test_store_round_trips_records(store):
+    assert len(store) == len(records)
+    assert [store[i] for i in range(len(records))] == records
+    assert store.get_many(np.array([2, -1, 0])) == [records[2], records[0]]
+
+def test_store_encodes_columns_compactly(store):
+    assert store.column("complaint_id").dtype == np.int64
+    assert store.columns["product"] == {"kind": "category", "vocab": ["credit card", "money transfers"]}
+    assert store.column("product").tolist() == [0, -1, 1, 1]
+
+def test_rewriting_store_replaces_it(tmp_path):
+    path = str(tmp_path / "metadata")
+    write_metadata_store(records, path)
+    write_metadata_store(records[:1], path)
+
+    assert len(MetadataStore(path)) == 1
+
+def test_update_appends_and_tombstones_rows(tmp_path):
+    path = str(tmp_path / "metadata")
+    write_metadata_store(records, path)
+    updated = [None] + records[1:] + [
+        {"complaint_id": 103, "product": "mortgage", "state": "CA", "text": "escrow shortage"},
+        None,
+        {"complaint_id": 104, "product": "credit card", "state": None, "text": "card declined"},
+    ]
+
+    update_metadata_store(updated, path)
+    store = MetadataStore(path)
+
+    expected = [record if record is None or "state" in record else {**record, "state": None}
+                for record in updated]
+    assert [store[i] for i in range(len(updated))] == expected
+    assert store.columns["product"]["vocab"] == ["credit card", "money transfers", "mortgage"]
+    assert store.filter_ids({"product": "credit card"}).tolist() == [6]
+    assert store.filter_ids({"state": "CA"}).tolist() == [4]
+
+def test_filter_ids_by_category_range_and_int(tmp_path):
+    dated = [
+        {"complaint_id": 1, "product": "credit card", "date_received": "2023-12-30", "text": "a"},
+        {"complaint_id": 2, "product": "credit card", "date_received": "2024-03-01", "text": "b"},
+        None,
+        {"complaint_id": 3, "product": "personal loan", "date_received": None, "text": "c"},
+        {"complaint_id": 4, "product": "personal loan", "date_received": "2024-07-15", "text": "d"},
+    ]
+    path = str(tmp_path / "metadata")
+    write_metadata_store(dated, path)
+    store = MetadataStore(path)
+
+    assert store.filter_ids({"product": "credit card"}).tolist() == [0, 1]
+    assert store.filter_ids({"date_received": ("2024-01-01", None)}).tolist() == [1, 4]
+    assert store.filter_ids({"product": ["personal loan"], "date_received": ("2024-01-01", "2024-12-31")}).tolist() == [4]
+    assert store.filter_ids({"complaint_id": (2, 3)}).tolist() == [1, 3]
+    assert store.codes_for("product", "mortgage").tolist() == []
+    with pytest.raises(ValueError):
+        store.filter_ids({"company": "Acme"})
@@ -0,0 +1,47 @@
+from src.prompt_template import TokenCounter, build_packed_prompt, build_prompt, compress_chunk
+
+question = "Why was a late fee charged?"
+chunks = [
+    "i was charged a late fee even though my payment posted on time. the bank refused to refund it.",
+    "the app crashed twice. support never called back. a late fee was added to my statement anyway.",
+    "my transfer failed and the account was debited. nobody explained why it took three weeks.",
+]
+
+def test_packing_with_ample_budget_keeps_the_prompt_unchanged():
+    prompt, report = build_packed_prompt(chunks, question, token_budget=10_000)
+
+    assert prompt == build_prompt(chunks, question)
+    assert report["tokens_saved"] == 0
+    assert (report["full"], report["compressed"], report["dropped"]) == (3, 0, 0)
+
+def test_packing_respects_budget_and_reports_savings():
+    counter = TokenCounter()
+    full = counter.count(build_prompt(chunks, question))
+    budget = full - 30
+
+    prompt, report = build_packed_prompt(chunks, question, token_budget=budget, keep_full=1, counter=counter)
+
+    assert counter.count(prompt) <= budget
+    # Summed from per-chunk counts: within rounding of counting the whole prompt
+    assert abs(report["tokens_before"] - full) <= len(chunks) + 2
+    assert report["tokens_saved"] == report["tokens_before"] - report["tokens_after"] > 0
+    assert chunks[0] in prompt  # The best chunk is kept whole
+    assert report["compressed"] + report["dropped"] >= 1
+
+def test_compress_chunk_keeps_question_related_sentences_in_order():
+    compressed = compress_chunk(chunks[1], question, max_tokens=14, counter=TokenCounter())
+
+    assert compressed == "a late fee was added to my statement anyway."
+
+def test_token_counter_calibration_and_tokenizer_cache():
+    counter = TokenCounter()
+    assert counter.calibrate(["abcdef", "abcdef"], [2, 2]) == 3.0
+    assert counter.count("abcdef") == 2
+
+    calls = []
+    cached = TokenCounter(tokenizer=lambda text: calls.append(text) or len(text.split()))
+    assert cached.count_static("one two three") == cached.count_static("one two three") == 3
+    assert len(calls) == 1
+    # Request text is not memoized
+    assert cached.count("four five") == cached.count("four five") == 2
+    assert len(calls) == 3
@@ -0,0 +1,112 @@
+from unittest.mock import patch
+import numpy as np
+
+from src.cache import AnswerCache
+from src.rag_pipeline import RAGPipeline
+
+docs = [
+    {"complaint_id": 1, "text": "I was charged a late fee without notice."},
+    {"complaint_id": 2, "text": "My card was charged twice."},
+]
+
+def make_pipeline(answer_cache):
+    with patch("src.rag_pipeline.ComplaintRetriever") as MockRetriever, \
+         patch("src.rag_pipeline.GeminiGenerator") as MockGenerator:
+        pipeline = RAGPipeline("dummy.index", "dummy.pkl", answer_cache=answer_cache)
+    pipeline.retriever = MockRetriever.return_value
+    pipeline.retriever.retrieve.return_value = docs
+    pipeline.generator = MockGenerator.return_value
+    pipeline.generator.generate.return_value = "Customers report unexpected fees."
+    return pipeline
+
+def test_repeated_question_skips_generation():
+    pipeline = make_pipeline(AnswerCache())
+
+    first = pipeline.run("Why are customers unhappy?")
+    second = pipeline.run("Why are customers unhappy?")
+
+    assert first == second == ("Customers report unexpected fees.", [d["text"] for d in docs])
+    assert pipeline.generator.generate.call_count == 1
+    pipeline.retriever.embed_query.assert_not_called()
+
+def test_similar_question_hits_semantic_cache():
+    pipeline = make_pipeline(AnswerCache(similarity_threshold=0.95))
+    pipeline.retriever.embed_query.side_effect = [np.array([1.0, 0.0]), np.array([0.99, 0.02])]
+
+    pipeline.run("Why are customers unhappy?")
+    answer, _ = pipeline.run("Why are the customers unhappy?")
+
+    assert answer == "Customers report unexpected fees."
+    assert pipeline.generator.generate.call_count == 1
+    assert pipeline.answer_cache.stats()["semantic_hits"] == 1
+
+def test_without_cache_every_call_generates():
+    pipeline = make_pipeline(None)
+
+    pipeline.run("Why are customers unhappy?")
+    pipeline.run("Why are customers unhappy?")
+
+    assert pipeline.generator.generate.call_count == 2
+
+def test_run_stream_yields_tokens_and_fills_cache():
+    pipeline = make_pipeline(AnswerCache())
+    pipeline.generator.generate_stream.return_value = iter(["Customers ", "report ", "fees."])
+
+    tokens, sources = pipeline.run_stream("Why are customers unhappy?")
+    assert sources == [d["text"] for d in docs]
+    assert list(tokens) == ["Customers ", "report ", "fees."]
+
+    # The second run is served from the cache in one piece
+    tokens, _ = pipeline.run_stream("Why are customers unhappy?")
+    assert list(tokens) == ["Customers report fees."]
+    assert pipeline.generator.generate_stream.call_count == 1
+
+def test_reranker_over_fetches_and_trims_context():
+    from src.reranker import Reranker
+
+    with patch("src.rag_pipeline.ComplaintRetriever") as MockRetriever, \
+         patch("src.rag_pipeline.GeminiGenerator") as MockGenerator:
+        pipeline = RAGPipeline("dummy.index", "dummy.pkl", reranker=Reranker(top_k=1, fetch_k=10))
+    pipeline.retriever = MockRetriever.return_value
+    pipeline.retriever.retrieve.return_value = docs
+    pipeline.generator = MockGenerator.return_value
+    pipeline.generator.generate.return_value = "answer"
+
+    _, sources = pipeline.run("Why are customers unhappy?")
+
+    pipeline.retriever.retrieve.assert_called_once_with("Why are customers unhappy?", k=10, filters=None)
+    assert sources == [docs[0]["text"]]
+
+def test_token_budget_packs_prompt_and_tracks_savings():
+    pipeline = make_pipeline(None)
+    pipeline.token_budget = 200
+
+    answer, sources = pipeline.run("Why are customers unhappy?")
+
+    prompt = pipeline.generator.generate.call_args[0][0]
+    assert pipeline.token_counter.count(prompt) <= 200
+    assert sources == [d["text"] for d in docs]  # Sources are reported unshortened
+    assert pipeline.packing_stats["requests"] == 1
+
+def test_aanswer_uses_the_answer_cache_off_the_event_loop():
+    import asyncio
+    import threading
+    from unittest.mock import AsyncMock
+
+    pipeline = make_pipeline(AnswerCache(similarity_threshold=0.95))
+    pipeline.generator.agenerate = AsyncMock(return_value="Customers report unexpected fees.")
+    embed_threads = []
+    def embed_query(query):
+        embed_threads.append(threading.current_thread())
+        return np.array([1.0, 0.0])
+    pipeline.retriever.embed_query.side_effect = embed_query
+
+    store_threads = []
+    store = pipeline.answer_cache.store
+    pipeline.answer_cache.store = lambda *args: store_threads.append(threading.current_thread()) or store(*args)
+
+    answer, _ = asyncio.run(pipeline.aanswer("Why are customers unhappy?", docs))
+
+    assert answer == "Customers report unexpected fees."
+    assert embed_threads and threading.main_thread() not in embed_threads
+    assert store_threads and threading.main_thread() not in store_threads
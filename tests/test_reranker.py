@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+
+from src.reranker import Reranker
+
+docs = [
+    {"complaint_id": 1, "text": "late fee charged on my credit card without any notice from the bank"},
+    {"complaint_id": 1, "text": "without any notice from the bank and the fee was never refunded"},
+    {"complaint_id": 2, "text": "late fee charged on my credit card without any notice from the bank"},
+    {"complaint_id": 3, "text": "money transfer failed but the account was still debited"},
+    {"complaint_id": 4, "text": "late fee charged on my credit card without notice from my bank today"},
+    {"complaint_id": 5, "text": "customer support never answered about the disputed charge"},
+]
+
+class StubCrossEncoder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def predict(self, pairs):
+        self.calls += 1
+        time.sleep(self.delay)
+        # Prefers texts about transfers
+        return np.array([float("transfer" in text) for _, text in pairs])
+
+def test_dedupes_by_complaint_and_near_duplicate_text():
+    result = Reranker(top_k=10, mmr_lambda=1.0).rerank("late fees", docs)
+
+    assert [d["complaint_id"] for d in result] == [1, 3, 4, 5]
+
+def test_mmr_prefers_diverse_chunks():
+    result = Reranker(top_k=2, mmr_lambda=0.3, duplicate_threshold=1.0).rerank("late fees", docs)
+
+    assert [d["complaint_id"] for d in result] == [1, 3]
+
+def test_cross_encoder_reorders_candidates():
+    result = Reranker(top_k=2, mmr_lambda=1.0, cross_encoder=StubCrossEncoder()).rerank("transfers", docs)
+
+    assert result[0]["complaint_id"] == 3
+
+def test_time_budget_limits_cross_encoding():
+    encoder = StubCrossEncoder(delay=0.05)
+    reranker = Reranker(top_k=3, cross_encoder=encoder, cross_encoder_batch=1, time_budget=0.08)
+
+    start = time.perf_counter()
+    result = reranker.rerank("transfers", docs)
+
+    assert len(result) == 3
+    assert encoder.calls == 2  # The remaining candidates were never scored
+    assert time.perf_counter() - start < 0.2
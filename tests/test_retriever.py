@@ -17,7 +17,7 @@ def mock_retriever():
 
         # Mock FAISS index search result
         mock_faiss_index = MagicMock()
-        mock_faiss_index.search.return_value = (None, np.array([[0, 1, 2]]))
+        mock_faiss_index.search.return_value = (np.array([[0.1, 0.2, 0.3]]), np.array([[0, 1, 2]]))
         mock_faiss_read.return_value = mock_faiss_index
 
         # Mock metadata
@@ -46,3 +46,187 @@ def test_retrieve_default_k(mock_retriever):
     # Default k=5, but mock only returns 3 metadata items
     assert len(results) <= 5
     assert results[0]["text"] == "Complaint about credit card charges"
+
+def test_search_params_are_applied_to_ivf_index():
+    import faiss
+    vectors = np.random.default_rng(0).random((200, 8), dtype=np.float32)
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatL2(8), 8, 4)
+    ivf.train(vectors)
+
+    with patch("src.retriever.SentenceTransformer"), \
+         patch("src.retriever.faiss.read_index", return_value=ivf), \
+         patch("builtins.open", create=True), \
+         patch("pickle.load", return_value=[]):
+        retriever = ComplaintRetriever("dummy.index", "dummy.pkl", nprobe=3)
+
+    assert ivf.nprobe == 3
+    retriever.set_search_params(nprobe=4, ef_search=32)  # efSearch doesn't apply to IVF
+    assert ivf.nprobe == 4
+
+def test_retrieve_batch_returns_results_per_query(mock_retriever):
+    mock_retriever.model.encode.return_value = np.random.rand(2, 384)
+    mock_retriever.index.search.return_value = (
+        np.array([[0.1, 0.4], [0.2, 0.0]], dtype=np.float32),
+        np.array([[0, 2], [1, -1]]),
+    )
+
+    results = mock_retriever.retrieve_batch(["credit card fees", "loan delays"], k=2)
+
+    mock_retriever.model.encode.assert_called_once_with(["credit card fees", "loan delays"])
+    assert mock_retriever.index.search.call_count == 1
+    assert [[r["text"] for r in rs] for rs in results] == [
+        ["Complaint about credit card charges", "Complaint about account closure"],
+        ["Complaint about loan applications"],
+    ]
+    assert results[0][1]["distance"] == pytest.approx(0.4)
+
+def test_repeated_queries_hit_the_cache(mock_retriever):
+    first = mock_retriever.retrieve("Late fees on my card", k=3)
+    second = mock_retriever.retrieve("  late FEES on my card ", k=3)
+
+    assert first == second
+    # The model sees the normalized query, so cached and fresh embeddings agree
+    mock_retriever.model.encode.assert_called_once_with(["late fees on my card"])
+    assert mock_retriever.index.search.call_count == 1
+    assert mock_retriever.cache_stats()["results"]["hits"] == 1
+
+    # A different k is a different result, but the query embedding is reused
+    mock_retriever.retrieve("late fees on my card", k=2)
+    assert mock_retriever.model.encode.call_count == 1
+    assert mock_retriever.index.search.call_count == 2
+
+def test_warm_up_encodes_and_searches_without_touching_caches(mock_retriever):
+    mock_retriever.index.ntotal = 3
+
+    assert mock_retriever.warm_up() >= 0
+    mock_retriever.model.encode.assert_called_once()
+    mock_retriever.index.search.assert_called_once()
+    assert len(mock_retriever.embedding_cache) == len(mock_retriever.result_cache) == 0
+
+@pytest.mark.parametrize("as_store", [False, True])
+def test_filtered_retrieval_happens_inside_the_search(tmp_path, as_store):
+    import faiss
+    from src.metadata_store import write_metadata_store
+
+    records = [
+        {"complaint_id": i, "product": "credit card" if i % 2 else "mortgage",
+         "date_received": f"2024-0{1 + i % 9}-01", "text": f"complaint {i}"}
+        for i in range(20)
+    ]
+    vectors = np.arange(20, dtype=np.float32).reshape(20, 1).repeat(4, axis=1)
+    index_path = str(tmp_path / "index.faiss")
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(4))
+    index.add_with_ids(vectors, np.arange(20, dtype=np.int64))
+    faiss.write_index(index, index_path)
+    if as_store:
+        meta_path = str(tmp_path / "metadata")
+        write_metadata_store(records, meta_path)
+    else:
+        import pickle
+        meta_path = str(tmp_path / "metadata.pkl")
+        with open(meta_path, "wb") as f:
+            pickle.dump(records, f)
+
+    with patch("src.retriever.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.return_value = np.zeros((1, 4), dtype=np.float32)
+        retriever = ComplaintRetriever(index_path, meta_path)
+
+        unfiltered = retriever.retrieve("fees", k=3)
+        filtered = retriever.retrieve("fees", k=3, filters={"product": "credit card"})
+        dated = retriever.retrieve("fees", k=3, filters={"product": "credit card", "date_received": ("2024-05-01", None)})
+
+    assert [r["complaint_id"] for r in unfiltered] == [0, 1, 2]
+    assert [r["complaint_id"] for r in filtered] == [1, 3, 5]
+    assert [r["complaint_id"] for r in dated] == [5, 7, 13]
+    assert retriever.retrieve("fees", k=3, filters={"product": "auto loan"}) == []
+    assert retriever.filter_fields == {"complaint_id", "product", "date_received"}
+
+def test_hybrid_mode_fuses_dense_and_lexical_results(tmp_path):
+    import faiss
+    import pickle
+    from src.lexical_index import build_lexical_index
+
+    records = [{"complaint_id": i, "text": f"generic complaint {i}"} for i in range(10)]
+    records[7]["text"] = "charge from merchant zelle ref 99812"
+    index = faiss.IndexFlatL2(2)
+    index.add(np.arange(20, dtype=np.float32).reshape(10, 2))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+    with open(tmp_path / "metadata.pkl", "wb") as f:
+        pickle.dump(records, f)
+    build_lexical_index([r["text"] for r in records], str(tmp_path / "lexical"))
+
+    with patch("src.retriever.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.return_value = np.zeros((1, 2), dtype=np.float32)
+        retriever = ComplaintRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.pkl"),
+                                       lexical_path=str(tmp_path / "lexical"), mode="hybrid")
+
+        dense = retriever.retrieve("zelle 99812", k=2, mode="dense")
+        lexical = retriever.retrieve("zelle 99812", k=2, mode="lexical")
+        hybrid = retriever.retrieve_batch(["zelle 99812"], k=3)[0]
+
+    assert [r["complaint_id"] for r in dense] == [0, 1]
+    assert [r["complaint_id"] for r in lexical] == [7]
+    assert {r["complaint_id"] for r in hybrid} >= {0, 7}
+    assert all("score" in r for r in hybrid)
+    with pytest.raises(ValueError):
+        ComplaintRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.pkl"), mode="lexical")
+
+def test_exact_rerank_restores_full_precision_order(tmp_path):
+    import faiss
+    import pickle
+    from src.embedding_pipeline import build_faiss_index
+
+    rng = np.random.default_rng(0)
+    vectors = rng.random((500, 16), dtype=np.float32)
+    query = rng.random((1, 16), dtype=np.float32)
+    np.save(tmp_path / "vectors.npy", vectors)
+    faiss.write_index(build_faiss_index(vectors, "pq", pq_m=4, pq_bits=4), str(tmp_path / "index.faiss"))
+    with open(tmp_path / "metadata.pkl", "wb") as f:
+        pickle.dump([{"complaint_id": i, "text": f"complaint {i}"} for i in range(500)], f)
+
+    with patch("src.retriever.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.return_value = query
+        retriever = ComplaintRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.pkl"),
+                                       vectors_path=str(tmp_path / "vectors.npy"), rerank_factor=50)
+        results = retriever.retrieve_batch(["fees"], k=5)[0]
+
+    exact = ((vectors - query) ** 2).sum(axis=1)
+    assert [r["complaint_id"] for r in results] == np.argsort(exact)[:5].tolist()
+    np.testing.assert_allclose([r["distance"] for r in results], np.sort(exact)[:5], rtol=1e-5)
+
+    # Vectors of another dimension can't belong to this index
+    np.save(tmp_path / "vectors.npy", vectors[:, :8])
+    with patch("src.retriever.SentenceTransformer"), pytest.raises(ValueError):
+        ComplaintRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.pkl"),
+                           vectors_path=str(tmp_path / "vectors.npy"))
+
+def test_vectors_must_line_up_with_index_rows(tmp_path):
+    import faiss
+    import pickle
+
+    vectors = np.random.default_rng(0).random((10, 4), dtype=np.float32)
+    np.save(tmp_path / "vectors.npy", vectors)
+    with open(tmp_path / "metadata.pkl", "wb") as f:
+        pickle.dump([{"complaint_id": i, "text": f"complaint {i}"} for i in range(10)], f)
+
+    # An incremental index hands out IDs that are not rows of vectors.npy
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatL2(4))
+    mapped.add_with_ids(vectors, np.arange(10, 20, dtype=np.int64))
+    faiss.write_index(mapped, str(tmp_path / "mapped.faiss"))
+    flat = faiss.IndexFlatL2(4)
+    flat.add(vectors)
+    faiss.write_index(flat, str(tmp_path / "flat.faiss"))
+    np.save(tmp_path / "short.npy", vectors[:5])
+
+    with patch("src.retriever.SentenceTransformer") as MockModel:
+        for index_file, vectors_file in [("mapped.faiss", "vectors.npy"), ("flat.faiss", "short.npy")]:
+            with pytest.raises(ValueError):
+                ComplaintRetriever(str(tmp_path / index_file), str(tmp_path / "metadata.pkl"),
+                                   vectors_path=str(tmp_path / vectors_file))
+
+        # A flat index already has exact distances: no over-fetch, no rerank
+        MockModel.return_value.encode.return_value = vectors[:1]
+        retriever = ComplaintRetriever(str(tmp_path / "flat.faiss"), str(tmp_path / "metadata.pkl"),
+                                       vectors_path=str(tmp_path / "vectors.npy"))
+        assert retriever.vectors is None
+        assert retriever.retrieve("fees", k=1)[0]["complaint_id"] == 0
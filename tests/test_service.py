@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.service import MicroBatcher, Overloaded, create_app
+
+def fake_search_batch(queries, filters=None):
+    return [[{"complaint_id": i, "text": f"{q} chunk {i}", "product": (filters or {}).get("product")}
+             for i in range(2)] for q in queries]
+
+def make_pipeline(generation=None):
+    pipeline = MagicMock()
+    pipeline.search_batch.side_effect = fake_search_batch
+    pipeline.rerank.side_effect = lambda query, docs: docs
+    pipeline.retriever.filter_fields = {"product", "date_received"}
+    pipeline.answer.side_effect = generation or (lambda query, docs: (f"answer to {query}", [d["text"] for d in docs]))
+    pipeline.retriever.cache_stats.return_value = {}
+    return pipeline
+
+def test_micro_batcher_merges_concurrent_queries():
+    calls = []
+
+    def handler(queries, filters):
+        calls.append((list(queries), filters))
+        time.sleep(0.01)
+        return [f"result for {q}" for q in queries]
+
+    batcher = MicroBatcher(handler, window=0.05)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(lambda i=i: batcher.submit(f"q{i}", {"product": "mortgage"} if i % 2 else None).result())
+                       for i in range(8)]
+            results = [f.result() for f in futures]
+    finally:
+        batcher.close()
+
+    assert results == [f"result for q{i}" for i in range(8)]
+    # Two filter groups in one window: far fewer handler calls than queries
+    assert len(calls) < 8
+    for queries, filters in calls:
+        assert all((int(q[1:]) % 2 == 1) == (filters is not None) for q in queries)
+    assert batcher.stats()["requests"] == 8
+
+def test_micro_batcher_rejects_when_the_queue_is_full():
+    release = threading.Event()
+    batcher = MicroBatcher(lambda queries, filters: release.wait() and queries, window=0, max_queued=1)
+    first = batcher.submit("busy")
+    time.sleep(0.05)  # the batcher thread is now stuck in the handler
+    batcher.submit("queued")
+    with pytest.raises(Overloaded):
+        batcher.submit("rejected")
+    release.set()
+    assert first.result(timeout=5) == "busy"
+    batcher.close()
+
+def test_endpoints_return_results_and_validate_input():
+    pipeline = make_pipeline()
+    app = create_app(pipeline, window=0)
+    client = app.test_client()
+
+    retrieved = client.post("/retrieve", json={"query": "late fees", "filters": {"product": "credit card",
+                                                                                 "date_received": {"min": "2024-01-01"}}})
+    answered = client.post("/answer", json={"query": "late fees"})
+
+    assert retrieved.status_code == 200
+    assert [r["text"] for r in retrieved.get_json()["results"]] == ["late fees chunk 0", "late fees chunk 1"]
+    assert pipeline.search_batch.call_args_list[0].args == (
+        ["late fees"], {"product": "credit card", "date_received": ("2024-01-01", None)})
+    assert [call.args[0] for call in pipeline.rerank.call_args_list] == ["late fees", "late fees"]
+    assert answered.get_json()["answer"] == "answer to late fees"
+    assert client.post("/answer", json={"query": " "}).status_code == 400
+    assert client.get("/health").get_json()["generations"] == 1
+    app.batcher.close()
+
+def test_reranking_runs_on_the_request_threads():
+    batch_threads, rerank_threads = set(), set()
+
+    def search_batch(queries, filters=None):
+        batch_threads.add(threading.get_ident())
+        return fake_search_batch(queries, filters)
+
+    def rerank(query, docs):
+        rerank_threads.add(threading.get_ident())
+        return docs[:1]
+
+    pipeline = make_pipeline()
+    pipeline.search_batch.side_effect = search_batch
+    pipeline.rerank.side_effect = rerank
+    app = create_app(pipeline, window=0.02)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda i: app.test_client().post("/retrieve", json={"query": f"q{i}"}), range(4)))
+
+    assert all(len(r.get_json()["results"]) == 1 for r in responses)
+    assert batch_threads == {app.batcher._thread.ident}
+    assert not rerank_threads & batch_threads
+    app.batcher.close()
+
+def test_generation_backpressure_returns_503():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_answer(query, docs):
+        started.set()
+        release.wait(5)
+        return "done", []
+
+    app = create_app(make_pipeline(slow_answer), window=0, max_generations=1, generation_wait=0.05)
+    client = app.test_client()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(client.post, "/answer", json={"query": "first"})
+        assert started.wait(5)
+        rejected = app.test_client().post("/answer", json={"query": "second"})
+        release.set()
+        assert first.result().status_code == 200
+
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert app.test_client().get("/health").get_json()["rejected"] == 1
+    app.batcher.close()
+
+def test_retrieval_errors_are_json(monkeypatch):
+    release = threading.Event()
+    errors = {"internal": ValueError("operands could not be broadcast"), "broken": RuntimeError("index gone")}
+
+    def search_batch(queries, filters=None):
+        if queries[0] == "slow":
+            release.wait(5)
+        if queries[0] in errors:
+            raise errors[queries[0]]
+        return fake_search_batch(queries, filters)
+
+    pipeline = make_pipeline()
+    pipeline.search_batch.side_effect = search_batch
+    monkeypatch.setattr("src.service.RETRIEVAL_TIMEOUT", 0.05)
+    app = create_app(pipeline, window=0)
+    client = app.test_client()
+
+    bad = client.post("/retrieve", json={"query": "bad field", "filters": {"colour": "red"}})
+    internal = client.post("/retrieve", json={"query": "internal"})
+    broken = client.post("/retrieve", json={"query": "broken"})
+    slow = client.post("/retrieve", json={"query": "slow"})
+    release.set()
+
+    # Unknown fields are rejected before retrieval; a ValueError from inside it is a server error
+    assert bad.status_code == 400 and "colour" in bad.get_json()["error"]
+    assert all(call.args[0] != ["bad field"] for call in pipeline.search_batch.call_args_list)
+    assert internal.status_code == 500
+    assert broken.status_code == 500 and "index gone" in broken.get_json()["error"]
+    assert slow.status_code == 504 and "error" in slow.get_json()
+    assert client.get("/missing").status_code == 404
+    app.batcher.close()
@@ -0,0 +1,112 @@
+import pickle
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+import pytest
+
+from src.sharded_index import ShardedIndex, build_sharded_index, merge_top_k, shard_assignments
+
+PRODUCTS = ["credit card", "mortgage", "personal loan"]
+
+def make_corpus(n: int = 300, dim: int = 8, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((n, dim), dtype=np.float32)
+    # Three chunks per complaint, so hashing must keep them together
+    metadata = [{"complaint_id": i // 3, "product": PRODUCTS[(i // 3) % 3], "text": f"chunk {i}"} for i in range(n)]
+    return vectors, metadata
+
+def test_shard_assignments_keep_complaints_together():
+    _, metadata = make_corpus()
+    metadata[5] = None
+
+    by_hash, keys = shard_assignments(metadata, by="hash", n_shards=4)
+    by_product, products = shard_assignments(metadata, by="product")
+
+    assert keys == [0, 1, 2, 3] and products == PRODUCTS
+    assert by_hash[5] == by_product[5] == -1
+    for assignments in (by_hash, by_product):
+        shards = {}
+        for meta, shard in zip(metadata, assignments):
+            if meta is not None:
+                assert shards.setdefault(meta["complaint_id"], shard) == shard
+    with pytest.raises(ValueError):
+        shard_assignments(metadata, by="state")
+
+@pytest.mark.parametrize("by", ["hash", "product"])
+def test_fan_out_search_matches_a_single_index(tmp_path, by):
+    vectors, metadata = make_corpus()
+    queries = np.random.default_rng(1).random((5, 8), dtype=np.float32)
+    flat = faiss.IndexFlatL2(8)
+    flat.add(vectors)
+    expected_D, expected_I = flat.search(queries, 10)
+
+    build_sharded_index(vectors, metadata, str(tmp_path / "shards"), by=by, n_shards=3)
+    index = ShardedIndex(str(tmp_path / "shards"))
+    D, I = index.search(queries, 10)
+    index.close()
+
+    assert index.ntotal == 300 and index.d == 8
+    np.testing.assert_array_equal(I, expected_I)
+    np.testing.assert_allclose(D, expected_D, rtol=1e-5)
+
+def test_merge_top_k_pads_missing_results():
+    D, I = merge_top_k([(np.array([[0.5, 0.0]]), np.array([[7, -1]])),
+                        (np.array([[0.1]]), np.array([[3]]))], k=4)
+
+    assert I.tolist() == [[3, 7, -1, -1]]
+    assert D[0, :2].tolist() == pytest.approx([0.1, 0.5]) and np.isinf(D[0, 2:]).all()
+
+def test_retriever_routes_product_filters_to_matching_shards(tmp_path):
+    from src.retriever import ComplaintRetriever
+
+    vectors, metadata = make_corpus()
+    query = vectors[:1] + 0.01
+    build_sharded_index(vectors, metadata, str(tmp_path / "shards"), by="product")
+    flat = faiss.IndexFlatL2(8)
+    flat.add(vectors)
+    faiss.write_index(flat, str(tmp_path / "index.faiss"))
+    with open(tmp_path / "metadata.pkl", "wb") as f:
+        pickle.dump(metadata, f)
+
+    with patch("src.retriever.SentenceTransformer") as MockModel:
+        MockModel.return_value.encode.return_value = query
+        single = ComplaintRetriever(str(tmp_path / "index.faiss"), str(tmp_path / "metadata.pkl"))
+        sharded = ComplaintRetriever(str(tmp_path / "shards"), str(tmp_path / "metadata.pkl"))
+        filters = {"product": ["mortgage", "personal loan"]}
+
+        assert sharded.index.route(filters) == [1, 2]
+        assert sharded.retrieve("fees", k=5) == single.retrieve("fees", k=5)
+        assert sharded.retrieve("fees", k=5, filters=filters) == single.retrieve("fees", k=5, filters=filters)
+        assert all(r["product"] != "credit card" for r in sharded.retrieve("fees", k=5, filters=filters))
+
+def test_parallel_build_and_process_fan_out(tmp_path):
+    vectors, metadata = make_corpus()
+    np.save(tmp_path / "vectors.npy", vectors)
+    mapped = np.load(tmp_path / "vectors.npy", mmap_mode="r")
+    queries = vectors[:4]
+
+    build_sharded_index(mapped, metadata, str(tmp_path / "serial"), n_shards=2)
+    build_sharded_index(mapped, metadata, str(tmp_path / "parallel"), n_shards=2, workers=2)
+    threaded = ShardedIndex(str(tmp_path / "serial"))
+    processes = ShardedIndex(str(tmp_path / "parallel"), executor="process")
+    try:
+        expected = threaded.search(queries, 5)
+        result = processes.search(queries, 5)
+    finally:
+        threaded.close()
+        processes.close()
+
+    np.testing.assert_array_equal(result[1], expected[1])
+    assert result[1][:, 0].tolist() == [0, 1, 2, 3]
+
+def test_more_shards_than_complaints(tmp_path):
+    vectors, metadata = make_corpus(n=6)  # two complaints
+    build_sharded_index(vectors, metadata, str(tmp_path / "shards"), n_shards=8, index_type="sq8")
+    index = ShardedIndex(str(tmp_path / "shards"))
+    D, I = index.search(vectors[:1], 4)
+    index.close()
+
+    # Empty hash shards are left out of the layout
+    assert 1 <= len(index) <= 2 and index.ntotal == 6
+    assert I[0, 0] == 0 and sorted(I[0].tolist()) == sorted(set(I[0].tolist()))
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from src.utils import DataWriter, load_data, save_data
+
+# Fixture sample processed complaints
+sample_df = pd.DataFrame({
+    "Date received": pd.to_datetime(["2024-01-01", "2024-02-15", "2024-03-30"]),
+    "Product": ["credit card", "money transfers", "credit card"],
+    "Complaint ID": [101, 102, 103],
+    "Cleaned_Narrative": ["charged twice", "transfer failed", "late fee"],
+})
+
+@pytest.mark.parametrize("file_name", ["processed.parquet", "processed.arrow", "processed.csv"])
+def test_round_trip_with_projection_and_product_filter(tmp_path, file_name):
+    path = tmp_path / file_name
+    assert save_data(sample_df, str(path))
+
+    loaded = load_data(str(path), columns=["Complaint ID", "Product"], products=["credit card"])
+
+    assert loaded.columns.tolist() == ["Complaint ID", "Product"]
+    assert loaded["Complaint ID"].tolist() == [101, 103]
+
+@pytest.mark.parametrize("file_name", ["processed.parquet", "processed.arrow", "processed.csv"])
+def test_product_filter_without_projecting_product(tmp_path, file_name):
+    path = tmp_path / file_name
+    save_data(sample_df, str(path))
+
+    loaded = load_data(str(path), columns=["Complaint ID"], products=["credit card"])
+
+    assert loaded.columns.tolist() == ["Complaint ID"]
+    assert loaded["Complaint ID"].tolist() == [101, 103]
+
+@pytest.mark.parametrize("file_name", ["processed.parquet", "processed.arrow"])
+def test_columnar_formats_keep_datetimes(tmp_path, file_name):
+    path = tmp_path / file_name
+    save_data(sample_df, str(path))
+
+    loaded = load_data(str(path))
+
+    assert pd.api.types.is_datetime64_any_dtype(loaded["Date received"])
+    assert loaded["Date received"].tolist() == sample_df["Date received"].tolist()
+
+@pytest.mark.parametrize("file_name", ["processed.parquet", "processed.arrow", "processed.csv"])
+def test_data_writer_appends_chunks(tmp_path, file_name):
+    path = tmp_path / file_name
+    with DataWriter(str(path)) as writer:
+        writer.write(sample_df.iloc[:2])
+        writer.write(sample_df.iloc[2:])
+
+    assert writer.rows_written == 3
+    assert load_data(str(path))["Complaint ID"].tolist() == [101, 102, 103]
+
+@pytest.mark.parametrize("file_name", ["processed.parquet", "processed.arrow"])
+def test_data_writer_accepts_values_in_column_null_in_first_chunk(tmp_path, file_name):
+    path = tmp_path / file_name
+    df = sample_df.assign(**{"Consumer disputed?": [None, None, "Yes"]})
+    df["Consumer disputed?"] = df["Consumer disputed?"].astype(object)
+    with DataWriter(str(path)) as writer:
+        writer.write(df.iloc[:2])
+        writer.write(df.iloc[2:])
+
+    loaded = load_data(str(path))
+    assert writer.rows_written == 3
+    assert loaded["Consumer disputed?"].tolist()[2] == "Yes"
+    assert loaded["Consumer disputed?"].isna().tolist() == [True, True, False]